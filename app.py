@@ -5,6 +5,7 @@ Versão 2.0 - Interface Melhorada
 """
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
@@ -14,12 +15,33 @@ from utils.data_loader import (
     obter_marcas, 
     obter_localizacoes,
     obter_datas_referencia,
-    filtrar_por_data
+    filtrar_por_data,
+    construir_indice_datas,
+    construir_catalogo,
+    relatorio_memoria,
+    versao_dados
 )
-from utils.calculations import (
-    calcular_produtos_abaixo_minimo,
-    calcular_valor_total_estoque,
-    identificar_produtos_abaixo_minimo
+from utils.filtros import STATUS_TODOS, MotorFiltros
+from utils.busca import IndiceBusca, MODO_CONTEM, MODO_PREFIXO, MODO_APROXIMADO
+from utils.cubo import CuboEstoque, agregar_linhas
+from utils.calculations import calcular_kpis, planejar_reposicao, selecionar_mais_criticos
+from utils.series_temporais import JANELA_PADRAO, construir_serie
+from utils.comparacao import TRANSICAO_ENTROU, TRANSICAO_SAIU, comparar_datas
+from utils.fragmentos import obter_fragmentos_configurados
+from utils.atualizacao import ServicoAtualizacao, obter_intervalo_configurado
+from utils.colunar import carregar_compartilhado
+from utils.banco_sql import BACKEND_SQLITE, BancoEstoque, construir_banco, obter_backend
+from utils.instrumentacao import Instrumentacao
+from utils.memo import CacheFiltros, ResultadoFiltro, normalizar_filtros
+from utils.exportacao import FORMATOS, exportacao_sob_demanda, formatos_disponiveis
+from utils.apresentacao import (
+    ROTULOS_STATUS_TABELA,
+    cores_status,
+    formatar_moeda,
+    formatar_moeda_lote,
+    mascara_abaixo_minimo,
+    ordem_criticidade,
+    rotular_status
 )
 
 # Configuração da página
@@ -71,42 +93,148 @@ st.markdown("""
 st.markdown('<h1 class="main-header">📦 Dashboard de Controle de Estoque</h1>', unsafe_allow_html=True)
 st.markdown("---")
 
-# Carregar dados com cache
-@st.cache_data
-def load_data():
-    """Carrega os dados dos CSVs com cache"""
+def mostrar_erro_arquivos(e):
+    """Exibe o erro de arquivos CSV não encontrados e interrompe a execução"""
+    st.error(f"❌ **Erro ao carregar arquivos CSV:**\n\n{str(e)}\n\n"
+            "**Solução:**\n"
+            "1. Verifique se os arquivos `FCD_PRODUTOS.csv` e `FCD_ESTOQUE.csv` estão na pasta `data/`\n"
+            "2. Se estiver fazendo deploy no Streamlit Cloud, certifique-se de que os arquivos foram commitados no repositório GitHub\n"
+            "3. Verifique se a estrutura de pastas está correta")
+    st.stop()
+
+def construir_recursos(usar_sql, estoque, versao):
+    """
+    Carrega os dados e monta todas as estruturas derivadas (índices, catálogo,
+    cubo, série histórica; no backend SQL a série é consultada por filtro, ver
+    load_serie_filtrada). Executada pelo serviço de atualização, fora do
+    caminho das requisições (exceto na primeira carga).
+    """
+    if usar_sql:
+        banco = BancoEstoque(construir_banco('data', estoque=estoque))
+        # Pré-calcula o que o banco guarda em memória
+        banco.catalogo
+        banco.total_linhas()
+        banco.indice_busca
+        return {'banco': banco}
+    
+    # Colunas somente leitura em memória mapeada, compartilhadas por todos os
+    # processos do servidor; os CSVs só são lidos se nenhum processo tiver
+    # gravado esta versão ainda (data_referencia já vem como datetime64)
+    df = carregar_compartilhado('data', versao, lambda: carregar_dados('data', estoque=estoque))
+    indice_datas = construir_indice_datas(df)
+    return {
+        'df': df,
+        'indice_datas': indice_datas,
+        'catalogo': construir_catalogo(df, indice_datas),
+        'indice_busca': IndiceBusca.de_dataframe(df),
+        'cubo': CuboEstoque(df),
+        'serie': construir_serie(df),
+    }
+
+@st.cache_resource
+def load_servico_atualizacao(usar_sql):
+    """
+    Serviço compartilhado entre as sessões que mantém a versão atual dos
+    dados e a reconstrói em segundo plano quando os CSVs mudam
+    """
+    estoque = obter_fragmentos_configurados()
+    servico = ServicoAtualizacao(
+        obter_versao=lambda: versao_dados('data', estoque=estoque),
+        construir=lambda versao: construir_recursos(usar_sql, estoque, versao),
+        intervalo=obter_intervalo_configurado(),
+    )
+    servico.iniciar()
+    return servico
+
+@st.cache_resource
+def load_cache_filtros():
+    """Cache LRU dos resultados de filtro, compartilhado entre as sessões"""
+    return CacheFiltros()
+
+@st.cache_resource(max_entries=128)
+def load_motor_filtros(versao, chave_data, _df_data, _indice_busca):
+    """Constrói uma única vez, por versão dos dados e data, o motor de filtros pré-indexado"""
+    return MotorFiltros(_df_data, indice_busca=_indice_busca)
+
+@st.cache_resource(max_entries=32)
+def load_velocidade_consumo(versao, chave_data, _serie, _data):
+    """
+    Calcula uma única vez, por versão dos dados e data, a velocidade de
+    consumo de cada chave da série até a data (somente leitura, compartilhada
+    entre as sessões); os filtros só escolhem posições desse vetor
+    """
+    velocidade = _serie.ate(_data).velocidade_consumo(JANELA_PADRAO)
+    velocidade.flags.writeable = False
+    return velocidade
+
+@st.cache_resource(max_entries=8)
+def load_serie_filtrada(chave_filtros, fim, _motor_filtros, _filtros):
+    """
+    Backend SQL: monta, por combinação de filtros, a série histórica apenas
+    das chaves filtradas e das datas até `fim` (None = todas), consultada no
+    banco somente quando uma visualização precisa dela
+    """
+    return construir_serie(_motor_filtros.consultar_historico(fim=fim, **_filtros))
+
+# Backend de consulta, escolhido pela variável de ambiente DASHBOARD_BACKEND:
+# 'pandas' (padrão) carrega tudo em memória; 'sqlite' deixa os filtros, os
+# indicadores e as agregações para o banco e traz apenas o resultado
+usar_sql = obter_backend() == BACKEND_SQLITE
+
+# Instrumentação desta execução: tempo, linhas e memória de cada etapa,
+# exibidos no painel de diagnóstico da sidebar e registrados no log
+instrumentacao = Instrumentacao()
+
+# Versão dos dados usada em toda esta execução: obtida uma única vez, de modo
+# que uma atualização publicada no meio da execução só vale na próxima
+servico_atualizacao = load_servico_atualizacao(usar_sql)
+with instrumentacao.etapa("construir_banco" if usar_sql else "carregar_dados") as medicao:
     try:
-        df = carregar_dados('data')
-        # Converter data_referencia para datetime se existir
-        if 'data_referencia' in df.columns:
-            df['data_referencia'] = pd.to_datetime(df['data_referencia'], errors='coerce')
-        return df
+        if servico_atualizacao.numero == 0:
+            with st.spinner("Carregando dados..."):
+                conjunto_dados = servico_atualizacao.atual()
+        else:
+            conjunto_dados = servico_atualizacao.atual()
     except FileNotFoundError as e:
-        st.error(f"❌ **Erro ao carregar arquivos CSV:**\n\n{str(e)}\n\n"
-                "**Solução:**\n"
-                "1. Verifique se os arquivos `FCD_PRODUTOS.csv` e `FCD_ESTOQUE.csv` estão na pasta `data/`\n"
-                "2. Se estiver fazendo deploy no Streamlit Cloud, certifique-se de que os arquivos foram commitados no repositório GitHub\n"
-                "3. Verifique se a estrutura de pastas está correta")
-        st.stop()
-        return pd.DataFrame()
+        mostrar_erro_arquivos(e)
     except Exception as e:
         st.error(f"❌ **Erro inesperado ao carregar os dados:**\n\n{str(e)}")
         st.stop()
-        return pd.DataFrame()
-
-df_original = load_data()
+    recursos = conjunto_dados.dados
+    versao_atual = conjunto_dados.versao
+    
+    if usar_sql:
+        banco = recursos['banco']
+        total_registros = banco.total_linhas()
+        catalogo = banco.catalogo
+        medicao.linhas_saida = total_registros
+    else:
+        df_original = recursos['df']
+        indice_datas = recursos['indice_datas']
+        catalogo = recursos['catalogo']
+        medicao.linhas_saida = len(df_original)
 
-if df_original.empty:
-    st.error("❌ Não foi possível carregar os dados. Verifique os erros acima.")
-    st.stop()
+if usar_sql:
+    colunas_disponiveis = banco.colunas
+else:
+    
+    if df_original.empty:
+        st.error("❌ Não foi possível carregar os dados. Verifique os erros acima.")
+        st.stop()
+    colunas_disponiveis = df_original.columns
+    total_registros = len(df_original)
 
 # ============================================
 # SIDEBAR - FILTROS AVANÇADOS
 # ============================================
 st.sidebar.header("🔍 Filtros Avançados")
 
-# Filtro por Data de Referência
-datas_disponiveis = obter_datas_referencia(df_original)
+# Filtro por Data de Referência. As opções dos filtros e os limites de preço
+# são consultas ao catálogo calculado uma única vez na carga dos dados
+if usar_sql:
+    datas_disponiveis = banco.obter_datas_referencia()
+else:
+    datas_disponiveis = obter_datas_referencia(df_original, indice_datas, catalogo)
 if datas_disponiveis:
     # Converter datas para formato string para exibição
     datas_formatadas = [d.strftime('%d/%m/%Y') if isinstance(d, pd.Timestamp) else str(d) for d in datas_disponiveis]
@@ -122,38 +250,57 @@ if datas_disponiveis:
     
     # Converter string selecionada de volta para datetime
     data_selecionada = pd.to_datetime(data_selecionada_str, format='%d/%m/%Y', errors='coerce')
-    df_filtrado_data = filtrar_por_data(df_original, data_selecionada)
+    chave_data = data_selecionada_str
 else:
-    df_filtrado_data = df_original.copy()
+    data_selecionada = None
+    chave_data = None
     st.sidebar.info("⚠️ Nenhuma data de referência encontrada nos dados")
 
+catalogo_data = catalogo.recorte(data_selecionada)
+if usar_sql:
+    motor_filtros = banco.motor_filtros(data_selecionada)
+    with instrumentacao.etapa("opcoes_sidebar"):
+        categorias = banco.obter_categorias(data_selecionada)
+        marcas = banco.obter_marcas(data_selecionada)
+        localizacoes = banco.obter_localizacoes(data_selecionada)
+else:
+    with instrumentacao.etapa("filtrar_por_data", len(df_original)) as medicao:
+        if data_selecionada is not None:
+            df_filtrado_data = filtrar_por_data(df_original, data_selecionada, indice_datas)
+        else:
+            df_filtrado_data = df_original
+        medicao.linhas_saida = len(df_filtrado_data)
+    with instrumentacao.etapa("motor_filtros", len(df_filtrado_data)):
+        motor_filtros = load_motor_filtros(versao_atual, chave_data, df_filtrado_data, recursos['indice_busca'])
+    with instrumentacao.etapa("opcoes_sidebar", len(df_filtrado_data)):
+        categorias = obter_categorias(df_filtrado_data, catalogo_data)
+        marcas = obter_marcas(df_filtrado_data, catalogo_data)
+        localizacoes = obter_localizacoes(df_filtrado_data, catalogo_data)
+
 st.sidebar.markdown("---")
 
-# Filtro por Categoria
-categorias = obter_categorias(df_filtrado_data)
-categoria_selecionada = st.sidebar.selectbox(
+# Filtro por Categoria (vazio = todas)
+categorias_selecionadas = st.sidebar.multiselect(
     "📂 Categoria:",
-    options=["Todas"] + categorias,
-    index=0,
-    help="Filtre produtos por categoria"
+    options=categorias,
+    placeholder="Todas",
+    help="Filtre produtos por uma ou mais categorias"
 )
 
-# Filtro por Marca
-marcas = obter_marcas(df_filtrado_data)
-marca_selecionada = st.sidebar.selectbox(
+# Filtro por Marca (vazio = todas)
+marcas_selecionadas = st.sidebar.multiselect(
     "🏷️ Marca:",
-    options=["Todas"] + marcas,
-    index=0,
-    help="Filtre produtos por marca"
+    options=marcas,
+    placeholder="Todas",
+    help="Filtre produtos por uma ou mais marcas"
 )
 
-# Filtro por Localização
-localizacoes = obter_localizacoes(df_filtrado_data)
-localizacao_selecionada = st.sidebar.selectbox(
+# Filtro por Localização (vazio = todas)
+localizacoes_selecionadas = st.sidebar.multiselect(
     "📍 Localização:",
-    options=["Todas"] + localizacoes,
-    index=0,
-    help="Filtre produtos por localização"
+    options=localizacoes,
+    placeholder="Todas",
+    help="Filtre produtos por uma ou mais localizações"
 )
 
 # Filtro por Status do Estoque
@@ -168,8 +315,7 @@ status_selecionado = st.sidebar.selectbox(
 st.sidebar.markdown("---")
 st.sidebar.subheader("💰 Faixa de Preço (R$)")
 
-preco_min = float(df_filtrado_data['preco_unitario'].min()) if 'preco_unitario' in df_filtrado_data.columns else 0
-preco_max = float(df_filtrado_data['preco_unitario'].max()) if 'preco_unitario' in df_filtrado_data.columns else 1000
+preco_min, preco_max = catalogo_data.limites_preco()
 
 preco_range = st.sidebar.slider(
     "Selecione a faixa de preço:",
@@ -184,8 +330,20 @@ preco_range = st.sidebar.slider(
 st.sidebar.markdown("---")
 busca_nome = st.sidebar.text_input(
     "🔍 Buscar por Nome:",
-    placeholder="Digite o nome do produto...",
-    help="Busque produtos pelo nome (busca parcial)"
+    placeholder="Digite o nome ou SKU do produto...",
+    help="Busque produtos pelo nome ou SKU (busca parcial, sem diferenciar acentos e maiúsculas)"
+)
+modos_busca = {
+    "Contém": MODO_CONTEM,
+    "Início da palavra": MODO_PREFIXO,
+    "Aproximada": MODO_APROXIMADO,
+}
+modo_busca_selecionado = st.sidebar.radio(
+    "Tipo de busca:",
+    options=list(modos_busca.keys()),
+    index=0,
+    horizontal=True,
+    help="Aproximada tolera pequenos erros de digitação"
 )
 
 # Botão para limpar filtros
@@ -196,49 +354,68 @@ if st.sidebar.button("🔄 Limpar Todos os Filtros"):
 # ============================================
 # APLICAÇÃO DOS FILTROS
 # ============================================
-df_filtrado = df_filtrado_data.copy()
-
-# Aplicar filtro de categoria
-if categoria_selecionada != "Todas":
-    df_filtrado = df_filtrado[df_filtrado['categoria'] == categoria_selecionada]
-
-# Aplicar filtro de marca
-if marca_selecionada != "Todas":
-    df_filtrado = df_filtrado[df_filtrado['marca'] == marca_selecionada]
-
-# Aplicar filtro de localização
-if localizacao_selecionada != "Todas":
-    df_filtrado = df_filtrado[df_filtrado['localizacao'] == localizacao_selecionada]
-
-# Aplicar filtro de status
-if status_selecionado == "Abaixo do Mínimo":
-    df_filtrado = df_filtrado[df_filtrado['quantidade_estoque'] < df_filtrado['estoque_minimo']]
-elif status_selecionado == "Adequado":
-    df_filtrado = df_filtrado[df_filtrado['quantidade_estoque'] >= df_filtrado['estoque_minimo']]
-
-# Aplicar filtro de faixa de preço
-df_filtrado = df_filtrado[
-    (df_filtrado['preco_unitario'] >= preco_range[0]) & 
-    (df_filtrado['preco_unitario'] <= preco_range[1])
-]
-
-# Aplicar busca por nome
-if busca_nome:
-    df_filtrado = df_filtrado[
-        df_filtrado['produto_nome'].str.contains(busca_nome, case=False, na=False)
-    ]
+# Filtros de categoria, marca, localização, status, faixa de preço e busca por
+# nome/SKU pelo motor pré-indexado (apenas os filtros ativos são avaliados e o
+# DataFrame é materializado uma vez)
+filtros = dict(
+    categorias=categorias_selecionadas,
+    marcas=marcas_selecionadas,
+    localizacoes=localizacoes_selecionadas,
+    status=status_selecionado,
+    faixa_preco=preco_range,
+    busca=busca_nome,
+    modo_busca=modos_busca[modo_busca_selecionado]
+)
+
+# Chave normalizada da combinação de filtros, usada pelo cache de resultados
+# de filtro (compartilhado entre sessões) e pelos caches de cada visualização
+# (o DataFrame filtrado em si não é hasheado). A versão dos dados faz parte
+# da chave: depois de uma atualização nenhum resultado antigo é reaproveitado
+chave_filtros = (versao_atual,) + normalizar_filtros(chave_data, **filtros)
+cache_filtros = load_cache_filtros()
+chave_cache = chave_filtros
+resultado_filtro = cache_filtros.obter(chave_cache)
+
+if usar_sql:
+    # No backend SQL as linhas só são buscadas pelas visualizações que as exibem
+    df_filtrado = None
+else:
+    if resultado_filtro is not None:
+        posicoes = resultado_filtro.posicoes
+    else:
+        # Cada filtro ativo é registrado como uma etapa (linhas de entrada e saída)
+        posicoes = motor_filtros.filtrar(**filtros, instrumentacao=instrumentacao)
+    with instrumentacao.etapa("materializar", len(posicoes)) as medicao:
+        df_filtrado = motor_filtros.materializar(posicoes)
+        medicao.linhas_saida = len(df_filtrado)
+
+def obter_linhas_filtradas():
+    """Retorna o DataFrame filtrado (no backend SQL, consultado no banco)"""
+    if df_filtrado is None:
+        return motor_filtros.aplicar(**filtros)
+    return df_filtrado
 
 # ============================================
 # MÉTRICAS PRINCIPAIS
 # ============================================
 st.header("📊 Métricas Principais")
 
-# Calcular métricas
-produtos_abaixo_minimo = calcular_produtos_abaixo_minimo(df_filtrado)
-valor_total = calcular_valor_total_estoque(df_filtrado)
-total_produtos = len(df_filtrado)
-total_produtos_unicos = df_filtrado['produto_id'].nunique() if 'produto_id' in df_filtrado.columns else total_produtos
-percentual_alerta = (produtos_abaixo_minimo / total_produtos * 100) if total_produtos > 0 else 0
+# Calcular métricas (todas em uma única passada sobre as colunas, ou em uma
+# única consulta agregada no backend SQL), reaproveitando o cache quando a
+# combinação de filtros já foi calculada
+if resultado_filtro is not None:
+    kpis = resultado_filtro.kpis
+else:
+    with instrumentacao.etapa("calcular_kpis", None if df_filtrado is None else len(df_filtrado)):
+        if usar_sql:
+            kpis = motor_filtros.calcular_kpis(**filtros)
+        else:
+            kpis = calcular_kpis(df_filtrado)
+    cache_filtros.guardar(chave_cache, ResultadoFiltro(None if usar_sql else posicoes, kpis))
+produtos_abaixo_minimo = kpis.produtos_abaixo_minimo
+valor_total = kpis.valor_total
+total_produtos_unicos = kpis.total_produtos_unicos
+percentual_alerta = kpis.percentual_alerta
 
 # Exibir métricas em colunas
 col1, col2, col3, col4 = st.columns(4)
@@ -263,7 +440,7 @@ with col2:
 with col3:
     st.metric(
         label="💰 Valor Total do Estoque",
-        value=f"R$ {valor_total:,.2f}".replace(",", "."),
+        value=formatar_moeda(valor_total),
         help="Valor total do estoque (quantidade × preço unitário)"
     )
 
@@ -282,189 +459,427 @@ st.markdown("---")
 # VISUALIZAÇÕES E GRÁFICOS
 # ============================================
 
-# Criar abas para organizar melhor as visualizações
-tab1, tab2, tab3, tab4 = st.tabs(["📊 Visão Geral", "🚨 Alertas", "📈 Análises", "📋 Tabela de Produtos"])
+# Busca por nome e faixa de preço não são dimensões do cubo: nesses casos
+# as análises são agregadas diretamente a partir das linhas filtradas
+usar_cubo = not busca_nome.strip() and preco_range[0] <= preco_min and preco_range[1] >= preco_max
+
+# Cada visualização tem a preparação dos seus dados em uma unidade com cache
+# própria, executada apenas quando a visualização é exibida
+
+@st.cache_data(max_entries=64)
+def preparar_visao_geral(chave_filtros, limite_grafico, _obter_linhas):
+    """Seleciona os N produtos mais críticos exibidos no gráfico de barras"""
+    df = _obter_linhas()
+    # Seleção parcial dos N mais críticos (abaixo do mínimo primeiro, depois
+    # pela diferença) em vez de ordenar tudo
+    ordem = selecionar_mais_criticos(df, limite_grafico)
+    return df.take(ordem).reset_index(drop=True)
+
+@st.cache_data(max_entries=64)
+def preparar_plano_reposicao(chave_filtros, cobertura_alvo, prazo_entrega, transferir, _obter_linhas):
+    """Calcula o plano de reposição das linhas filtradas com o consumo histórico até a data selecionada"""
+    df = _obter_linhas()
+    if usar_sql:
+        serie = load_serie_filtrada(chave_filtros, data_selecionada, motor_filtros, filtros)
+        velocidade = serie.velocidade_consumo(JANELA_PADRAO)
+    else:
+        serie = recursos['serie']
+        velocidade = load_velocidade_consumo(versao_atual, chave_data, serie, data_selecionada)
+    posicoes = serie.posicoes_linhas(df)
+    velocidade_linhas = np.where(posicoes >= 0, velocidade[np.maximum(posicoes, 0)], np.nan)
+    plano = planejar_reposicao(
+        df, velocidade_linhas,
+        cobertura_alvo=cobertura_alvo, prazo_entrega=prazo_entrega, transferir=transferir
+    )
+    
+    itens = plano.itens
+    for coluna in ('produto_nome', 'categoria'):
+        if coluna in df.columns:
+            itens[coluna] = df[coluna].to_numpy()
+    itens = itens[(itens['quantidade_pedido'] > 0) | (itens['recebido_transferencia'] > 0)]
+    itens = itens.sort_values('custo_pedido', ascending=False, kind='stable')
+    itens = itens.assign(**{'Custo do Pedido (R$)': formatar_moeda_lote(itens['custo_pedido'])})
+    itens = itens.rename(columns={
+        'produto_id': 'ID',
+        'produto_nome': 'Nome do Produto',
+        'categoria': 'Categoria',
+        'localizacao': 'Localização',
+        'quantidade_estoque': 'Qtd. Atual',
+        'velocidade_dia': 'Consumo/Dia',
+        'ponto_pedido': 'Ponto de Pedido',
+        'nivel_alvo': 'Nível Alvo',
+        'recebido_transferencia': 'Transferência',
+        'quantidade_pedido': 'Comprar',
+    })
+    colunas = ['ID', 'Nome do Produto', 'Categoria', 'Localização', 'Qtd. Atual', 'Consumo/Dia',
+               'Ponto de Pedido', 'Nível Alvo', 'Transferência', 'Comprar', 'Custo do Pedido (R$)']
+    itens = itens[[c for c in colunas if c in itens.columns]].reset_index(drop=True)
+    
+    transferencias = plano.transferencias.assign(
+        **{'Valor (R$)': formatar_moeda_lote(plano.transferencias['valor'])}
+    ).rename(columns={
+        'produto_id': 'ID', 'origem': 'Origem', 'destino': 'Destino', 'quantidade': 'Quantidade'
+    }).drop(columns='valor')
+    return plano, itens, transferencias
+
+@st.cache_data(max_entries=64)
+def preparar_alertas(chave_filtros, _obter_linhas, _mascara_abaixo):
+    """Monta a distribuição por categoria e a tabela dos produtos em alerta"""
+    df = _obter_linhas()
+    if _mascara_abaixo is None:
+        _mascara_abaixo = mascara_abaixo_minimo(df)
+    produtos_abaixo = df[_mascara_abaixo]
+    
+    alertas_por_categoria = None
+    if 'categoria' in produtos_abaixo.columns:
+        alertas_por_categoria = produtos_abaixo['categoria'].value_counts()
+        alertas_por_categoria = alertas_por_categoria[alertas_por_categoria > 0]
+    
+    # Tabela de produtos em alerta
+    colunas_alerta = ['produto_id', 'produto_nome', 'categoria', 'marca', 'quantidade_estoque', 
+                     'estoque_minimo', 'preco_unitario', 'localizacao']
+    colunas_alerta = [col for col in colunas_alerta if col in produtos_abaixo.columns]
+    
+    df_alerta = produtos_abaixo[colunas_alerta].copy()
+    df_alerta['Déficit'] = (
+        df_alerta['estoque_minimo'].astype('int64') - df_alerta['quantidade_estoque'].astype('int64')
+    )
+    df_alerta['Preço Unitário (R$)'] = formatar_moeda_lote(df_alerta['preco_unitario'])
+    
+    # Renomear colunas
+    df_alerta = df_alerta.rename(columns={
+        'produto_id': 'ID',
+        'produto_nome': 'Nome do Produto',
+        'categoria': 'Categoria',
+        'marca': 'Marca',
+        'quantidade_estoque': 'Qtd. Atual',
+        'estoque_minimo': 'Qtd. Mínima',
+        'localizacao': 'Localização'
+    })
+    
+    # Reordenar colunas
+    ordem_colunas = ['ID', 'Nome do Produto', 'Categoria', 'Marca', 'Qtd. Atual', 
+                    'Qtd. Mínima', 'Déficit', 'Preço Unitário (R$)', 'Localização']
+    ordem_colunas = [col for col in ordem_colunas if col in df_alerta.columns]
+    return alertas_por_categoria, df_alerta[ordem_colunas]
+
+@st.cache_data(max_entries=64)
+def preparar_analises(chave_filtros, usar_cubo, _obter_linhas):
+    """Calcula as análises por categoria e por localização"""
+    def agregar_analise(por):
+        if por not in colunas_disponiveis or kpis.total_linhas == 0:
+            return None
+        if usar_sql:
+            return motor_filtros.agregar(por, **filtros)
+        if usar_cubo:
+            return recursos['cubo'].agregar(
+                por,
+                data=data_selecionada,
+                categorias=categorias_selecionadas,
+                marcas=marcas_selecionadas,
+                localizacoes=localizacoes_selecionadas,
+                status=status_selecionado
+            )
+        return agregar_linhas(_obter_linhas(), por)
+    
+    analise_categoria = agregar_analise('categoria')
+    if analise_categoria is not None:
+        analise_categoria = analise_categoria[
+            ['n_linhas', 'quantidade_estoque', 'estoque_minimo', 'valor_total']
+        ].rename(columns={
+            'n_linhas': 'Total Produtos',
+            'quantidade_estoque': 'Estoque Total',
+            'estoque_minimo': 'Mínimo Total',
+            'valor_total': 'Valor Total (R$)'
+        })
+        analise_categoria['Valor Total (R$)'] = formatar_moeda_lote(analise_categoria['Valor Total (R$)'])
+    
+    analise_localizacao = agregar_analise('localizacao')
+    if analise_localizacao is not None:
+        analise_localizacao = analise_localizacao[
+            ['n_linhas', 'quantidade_estoque', 'estoque_minimo']
+        ].rename(columns={
+            'n_linhas': 'Total Produtos',
+            'quantidade_estoque': 'Estoque Total',
+            'estoque_minimo': 'Mínimo Total'
+        })
+    return analise_categoria, analise_localizacao
+
+@st.cache_data(max_entries=64)
+def preparar_tabela(chave_filtros, _obter_linhas):
+    """Monta a tabela completa de produtos, ordenada por criticidade"""
+    df = _obter_linhas()
+    # Selecionar colunas para exibição
+    colunas_tabela = ['produto_id', 'produto_nome', 'categoria', 'marca', 'quantidade_estoque', 
+                      'estoque_minimo', 'preco_unitario', 'localizacao']
+    colunas_tabela = [col for col in colunas_tabela if col in df.columns]
+    
+    # Criar DataFrame para tabela, já ordenado por status (abaixo do mínimo
+    # primeiro) e diferença, usando chaves numéricas
+    df_tabela = df[colunas_tabela].take(ordem_criticidade(df))
+    
+    # Adicionar coluna de status (categórica, sem laço por linha)
+    df_tabela['Status'] = rotular_status(
+        mascara_abaixo_minimo(df_tabela), ROTULOS_STATUS_TABELA, index=df_tabela.index
+    )
+    
+    # Calcular diferença
+    df_tabela['Diferença'] = (
+        df_tabela['quantidade_estoque'].astype('int64') - df_tabela['estoque_minimo'].astype('int64')
+    )
+    
+    # Formatação de valores monetários
+    df_tabela['Preço Unitário (R$)'] = formatar_moeda_lote(df_tabela['preco_unitario'])
+    
+    # Renomear colunas
+    df_tabela = df_tabela.rename(columns={
+        'produto_id': 'ID',
+        'produto_nome': 'Nome do Produto',
+        'categoria': 'Categoria',
+        'marca': 'Marca',
+        'quantidade_estoque': 'Qtd. Atual',
+        'estoque_minimo': 'Qtd. Mínima',
+        'localizacao': 'Localização'
+    })
+    
+    # Reordenar colunas
+    ordem_colunas = ['ID', 'Nome do Produto', 'Categoria', 'Marca', 'Qtd. Atual', 
+                     'Qtd. Mínima', 'Diferença', 'Status', 'Preço Unitário (R$)', 'Localização']
+    ordem_colunas = [col for col in ordem_colunas if col in df_tabela.columns]
+    return df_tabela[ordem_colunas]
+
+AGRUPAMENTO_PRODUTO = "Produto"
+AGRUPAMENTO_PRODUTO_LOCAL = "Produto × Localização"
+
+@st.cache_data(max_entries=64)
+def preparar_tendencias(chave_filtros, agrupamento, janela, _obter_linhas):
+    """Calcula a evolução do estoque e os indicadores de tendência das chaves filtradas"""
+    if usar_sql:
+        # O banco já traz apenas as chaves filtradas
+        serie = load_serie_filtrada(chave_filtros, None, motor_filtros, filtros)
+    else:
+        serie = recursos['serie']
+        serie = serie.subconjunto(serie.posicoes_chaves(_obter_linhas()))
+    if agrupamento == AGRUPAMENTO_PRODUTO:
+        serie = serie.por_produto()
+    
+    evolucao = serie.total_por_data(janela=janela)
+    
+    resumo = serie.resumo(janela=janela).sort_values(
+        ['dias_cobertura', 'velocidade_dia'], ascending=[True, False], na_position='last', kind='stable'
+    )
+    resumo = resumo.rename(columns={
+        'produto_id': 'ID',
+        'produto_nome': 'Nome do Produto',
+        'categoria': 'Categoria',
+        'localizacao': 'Localização',
+        'quantidade_atual': 'Qtd. Atual',
+        'estoque_minimo': 'Qtd. Mínima',
+        'velocidade_dia': 'Consumo/Dia',
+        'dias_cobertura': 'Dias de Cobertura',
+        'minimo_movel': 'Mín. Móvel',
+        'maximo_movel': 'Máx. Móvel',
+        'media_movel': 'Média Móvel',
+    })
+    colunas = ['ID', 'Nome do Produto', 'Categoria', 'Localização', 'Qtd. Atual', 'Qtd. Mínima',
+               'Consumo/Dia', 'Dias de Cobertura', 'Mín. Móvel', 'Máx. Móvel', 'Média Móvel']
+    return evolucao, resumo[[c for c in colunas if c in resumo.columns]].reset_index(drop=True)
+
+def obter_motor_filtros_data(data, chave):
+    """Motor de filtros de outra data de referência (no backend SQL, consultas ao banco)"""
+    if usar_sql:
+        return banco.motor_filtros(data)
+    return load_motor_filtros(
+        versao_atual, chave, filtrar_por_data(df_original, data, indice_datas), recursos['indice_busca']
+    )
+
+@st.cache_data(max_entries=64)
+def preparar_comparacao(chave_filtros, chave_base, por_localizacao, _data_base):
+    """
+    Compara a data selecionada com a data base, aplicando às duas os mesmos
+    filtros da sidebar (exceto o de status, para que as transições de status
+    apareçam)
+    """
+    filtros_comparacao = dict(filtros, status=STATUS_TODOS)
+    df_base = obter_motor_filtros_data(_data_base, chave_base).aplicar(**filtros_comparacao)
+    df_comparada = motor_filtros.aplicar(**filtros_comparacao)
+    comparacao = comparar_datas(df_base, df_comparada, por_localizacao=por_localizacao)
+    
+    por_categoria = None
+    if 'categoria' in comparacao.itens.columns:
+        por_categoria = comparacao.por_dimensao('categoria')
+    
+    itens = comparacao.itens
+    itens = itens[itens['transicao'].isin([TRANSICAO_ENTROU, TRANSICAO_SAIU])].sort_values(
+        'delta_quantidade', kind='stable'
+    )
+    colunas_itens = {
+        'produto_id': 'ID',
+        'produto_nome': 'Nome do Produto',
+        'categoria': 'Categoria',
+        'localizacao': 'Localização',
+        'quantidade_base': 'Qtd. Base',
+        'quantidade_comparada': 'Qtd. Atual',
+        'delta_quantidade': 'Variação',
+        'minimo_comparada': 'Qtd. Mínima',
+        'transicao': 'Transição',
+    }
+    def formatar_itens(df):
+        df = df[[c for c in colunas_itens if c in df.columns]].rename(columns=colunas_itens)
+        return df.reset_index(drop=True)
+    return comparacao, por_categoria, formatar_itens(itens), formatar_itens(comparacao.mais_alterados(30))
 
-with tab1:
+# Seletor de visualização: somente a visualização escolhida é calculada e
+# renderizada a cada interação (st.tabs executaria todas)
+VISAO_GERAL = "📊 Visão Geral"
+VISAO_ALERTAS = "🚨 Alertas"
+VISAO_ANALISES = "📈 Análises"
+VISAO_TABELA = "📋 Tabela de Produtos"
+VISAO_TENDENCIAS = "📉 Tendências"
+VISAO_COMPARACAO = "🔀 Comparação"
+
+visao_selecionada = st.radio(
+    "Visualização:",
+    options=[VISAO_GERAL, VISAO_ALERTAS, VISAO_ANALISES, VISAO_TABELA, VISAO_TENDENCIAS, VISAO_COMPARACAO],
+    index=0,
+    horizontal=True,
+    label_visibility="collapsed",
+    key="visao_selecionada"
+)
+
+if visao_selecionada == VISAO_GERAL:
     st.subheader("📊 Visão Geral do Estoque")
     
     # Gráfico de Barras: Estoque Atual vs Estoque Mínimo
-    if not df_filtrado.empty:
-        # Limitar a 30 produtos para melhor visualização
-        df_plot = df_filtrado.copy()
-        
-        # Primeiro, criar coluna de status e calcular diferença
-        df_plot['Status'] = df_plot.apply(
-            lambda row: 'Abaixo do Mínimo' if row['quantidade_estoque'] < row['estoque_minimo'] else 'Adequado',
-            axis=1
+    if kpis.total_linhas > 0:
+        # Quantidade de produtos exibidos no gráfico
+        limite_grafico = st.slider(
+            "Produtos exibidos no gráfico:",
+            min_value=10,
+            max_value=100,
+            value=30,
+            step=5,
+            help="Quantidade dos produtos mais críticos exibidos no gráfico"
         )
-        df_plot['Diferenca'] = df_plot['quantidade_estoque'] - df_plot['estoque_minimo']
-        
-        # Ordenar: produtos abaixo do mínimo primeiro, depois por diferença (mais críticos primeiro)
-        df_plot = df_plot.sort_values(['Status', 'Diferenca'], ascending=[True, True])
         
-        # Limitar a 30 produtos para melhor visualização
-        if len(df_plot) > 30:
-            # Priorizar produtos em alerta
-            produtos_abaixo = df_plot[df_plot['Status'] == 'Abaixo do Mínimo']
-            produtos_ok = df_plot[df_plot['Status'] == 'Adequado']
-            
-            if len(produtos_abaixo) >= 30:
-                df_plot = produtos_abaixo.head(30)
-            else:
-                df_plot = pd.concat([
-                    produtos_abaixo,
-                    produtos_ok.head(30 - len(produtos_abaixo))
-                ])
-            
-            st.info(f"⚠️ Exibindo os 30 produtos mais críticos de {len(df_filtrado)} produtos totais.")
+        if kpis.total_linhas > limite_grafico:
+            st.info(f"⚠️ Exibindo os {limite_grafico} produtos mais críticos de {kpis.total_linhas} produtos totais.")
         
-        # Resetar índice para melhor visualização
-        df_plot = df_plot.reset_index(drop=True)
+        with instrumentacao.etapa("visao_geral:preparar", kpis.total_linhas) as medicao:
+            df_plot = preparar_visao_geral(chave_filtros, limite_grafico, obter_linhas_filtradas)
+            medicao.linhas_saida = len(df_plot)
+        with instrumentacao.etapa("visao_geral:grafico", len(df_plot)):
+            abaixo_plot = mascara_abaixo_minimo(df_plot)
         
-        # Criar gráfico de barras
-        fig_barras = go.Figure()
+            # Criar gráfico de barras
+            fig_barras = go.Figure()
         
-        # Adicionar barras de estoque atual
-        cores_atual = ['#DC143C' if status == 'Abaixo do Mínimo' else '#28A745' 
-                      for status in df_plot['Status']]
+            # Cores das barras de estoque atual conforme o status
+            cores_atual = cores_status(abaixo_plot)
         
-        # Adicionar barras de estoque atual
-        fig_barras.add_trace(go.Bar(
-            x=df_plot['produto_nome'],
-            y=df_plot['quantidade_estoque'],
-            name='Estoque Atual',
-            marker_color=cores_atual,
-            text=df_plot['quantidade_estoque'],
-            textposition='outside',
-            textfont=dict(size=9, color='#1f1f1f'),
-            hovertemplate='<b>%{x}</b><br>Estoque Atual: %{y}<br>Estoque Mínimo: %{customdata}<extra></extra>',
-            customdata=df_plot['estoque_minimo'],
-            width=0.4
-        ))
+            # Adicionar barras de estoque atual
+            fig_barras.add_trace(go.Bar(
+                x=df_plot['produto_nome'],
+                y=df_plot['quantidade_estoque'],
+                name='Estoque Atual',
+                marker_color=cores_atual,
+                text=df_plot['quantidade_estoque'],
+                textposition='outside',
+                textfont=dict(size=9, color='#1f1f1f'),
+                hovertemplate='<b>%{x}</b><br>Estoque Atual: %{y}<br>Estoque Mínimo: %{customdata}<extra></extra>',
+                customdata=df_plot['estoque_minimo'],
+                width=0.4
+            ))
         
-        # Adicionar barras de estoque mínimo (agrupadas)
-        fig_barras.add_trace(go.Bar(
-            x=df_plot['produto_nome'],
-            y=df_plot['estoque_minimo'],
-            name='Estoque Mínimo',
-            marker_color='#FF8C00',
-            marker_pattern_shape="x",
-            opacity=0.7,
-            text=df_plot['estoque_minimo'],
-            textposition='outside',
-            textfont=dict(size=9, color='#1f1f1f'),
-            hovertemplate='<b>%{x}</b><br>Estoque Mínimo: %{y}<extra></extra>',
-            width=0.4
-        ))
+            # Adicionar barras de estoque mínimo (agrupadas)
+            fig_barras.add_trace(go.Bar(
+                x=df_plot['produto_nome'],
+                y=df_plot['estoque_minimo'],
+                name='Estoque Mínimo',
+                marker_color='#FF8C00',
+                marker_pattern_shape="x",
+                opacity=0.7,
+                text=df_plot['estoque_minimo'],
+                textposition='outside',
+                textfont=dict(size=9, color='#1f1f1f'),
+                hovertemplate='<b>%{x}</b><br>Estoque Mínimo: %{y}<extra></extra>',
+                width=0.4
+            ))
         
-        fig_barras.update_layout(
-            title={
-                'text': "Comparação: Estoque Atual vs Estoque Mínimo",
-                'x': 0.5,
-                'xanchor': 'center',
-                'font': {'size': 18, 'color': '#1f1f1f'}
-            },
-            xaxis_title="Produtos",
-            yaxis_title="Quantidade",
-            height=600,
-            barmode='group',
-            hovermode='x unified',
-            xaxis=dict(
-                tickangle=-45,
-                showticklabels=True,
-                tickfont=dict(size=9, color='#1f1f1f'),
-                title_font=dict(size=14, color='#1f1f1f')
-            ),
-            yaxis=dict(
-                title_font=dict(size=14, color='#1f1f1f'),
-                tickfont=dict(size=12, color='#1f1f1f'),
-                gridcolor='rgba(128, 128, 128, 0.2)'
-            ),
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="right",
-                x=1,
-                font=dict(size=12, color='#1f1f1f'),
-                bgcolor='rgba(255, 255, 255, 0.8)'
-            ),
-            template="plotly_white",
-            plot_bgcolor='white',
-            paper_bgcolor='white',
-            font=dict(color='#1f1f1f')
-        )
+            fig_barras.update_layout(
+                title={
+                    'text': "Comparação: Estoque Atual vs Estoque Mínimo",
+                    'x': 0.5,
+                    'xanchor': 'center',
+                    'font': {'size': 18, 'color': '#1f1f1f'}
+                },
+                xaxis_title="Produtos",
+                yaxis_title="Quantidade",
+                height=600,
+                barmode='group',
+                hovermode='x unified',
+                xaxis=dict(
+                    tickangle=-45,
+                    showticklabels=True,
+                    tickfont=dict(size=9, color='#1f1f1f'),
+                    title_font=dict(size=14, color='#1f1f1f')
+                ),
+                yaxis=dict(
+                    title_font=dict(size=14, color='#1f1f1f'),
+                    tickfont=dict(size=12, color='#1f1f1f'),
+                    gridcolor='rgba(128, 128, 128, 0.2)'
+                ),
+                legend=dict(
+                    orientation="h",
+                    yanchor="bottom",
+                    y=1.02,
+                    xanchor="right",
+                    x=1,
+                    font=dict(size=12, color='#1f1f1f'),
+                    bgcolor='rgba(255, 255, 255, 0.8)'
+                ),
+                template="plotly_white",
+                plot_bgcolor='white',
+                paper_bgcolor='white',
+                font=dict(color='#1f1f1f')
+            )
         
-        st.plotly_chart(fig_barras, use_container_width=True)
+            st.plotly_chart(fig_barras, use_container_width=True)
         
-        # Estatísticas rápidas
-        produtos_abaixo_plot = df_plot[df_plot['Status'] == 'Abaixo do Mínimo']
-        produtos_ok_plot = df_plot[df_plot['Status'] == 'Adequado']
+        # Estatísticas rápidas dos produtos exibidos no gráfico
+        kpis_plot = calcular_kpis(df_plot)
         
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Produtos em Alerta", len(produtos_abaixo_plot))
+            st.metric("Produtos em Alerta", kpis_plot.produtos_abaixo_minimo)
         with col2:
-            st.metric("Produtos Adequados", len(produtos_ok_plot))
+            st.metric("Produtos Adequados", kpis_plot.total_linhas - kpis_plot.produtos_abaixo_minimo)
         with col3:
-            if not produtos_abaixo_plot.empty:
-                deficit_total = (produtos_abaixo_plot['estoque_minimo'] - 
-                                produtos_abaixo_plot['quantidade_estoque']).sum()
-                st.metric("Déficit Total", f"{int(deficit_total)} unidades")
-            else:
-                st.metric("Déficit Total", "0 unidades")
+            st.metric("Déficit Total", f"{kpis_plot.deficit_total} unidades")
     else:
         st.warning("Nenhum dado disponível para exibição com os filtros selecionados.")
 
-with tab2:
+elif visao_selecionada == VISAO_ALERTAS:
     st.subheader("🚨 Produtos que Precisam de Reposição")
     
-    produtos_abaixo = identificar_produtos_abaixo_minimo(df_filtrado)
-    
-    if not produtos_abaixo.empty:
-        st.warning(f"⚠️ **{len(produtos_abaixo)} produto(s) abaixo do estoque mínimo:**")
-        
-        # Criar gráfico de pizza para distribuição de alertas por categoria
-        if 'categoria' in produtos_abaixo.columns:
-            alertas_por_categoria = produtos_abaixo['categoria'].value_counts()
-            
-            fig_pizza = px.pie(
-                values=alertas_por_categoria.values,
-                names=alertas_por_categoria.index,
-                title="Distribuição de Alertas por Categoria",
-                color_discrete_sequence=px.colors.sequential.Reds_r
-            )
-            fig_pizza.update_traces(textposition='inside', textinfo='percent+label')
-            st.plotly_chart(fig_pizza, use_container_width=True)
+    if kpis.produtos_abaixo_minimo > 0:
+        st.warning(f"⚠️ **{kpis.produtos_abaixo_minimo} produto(s) abaixo do estoque mínimo:**")
         
-        # Tabela de produtos em alerta
-        colunas_alerta = ['produto_id', 'produto_nome', 'categoria', 'marca', 'quantidade_estoque', 
-                         'estoque_minimo', 'preco_unitario', 'localizacao']
-        colunas_alerta = [col for col in colunas_alerta if col in produtos_abaixo.columns]
-        
-        df_alerta = produtos_abaixo[colunas_alerta].copy()
-        df_alerta['Déficit'] = df_alerta['estoque_minimo'] - df_alerta['quantidade_estoque']
-        df_alerta['Preço Unitário (R$)'] = df_alerta['preco_unitario'].apply(
-            lambda x: f"R$ {x:,.2f}".replace(",", ".")
-        )
-        
-        # Renomear colunas
-        df_alerta = df_alerta.rename(columns={
-            'produto_id': 'ID',
-            'produto_nome': 'Nome do Produto',
-            'categoria': 'Categoria',
-            'marca': 'Marca',
-            'quantidade_estoque': 'Qtd. Atual',
-            'estoque_minimo': 'Qtd. Mínima',
-            'localizacao': 'Localização'
-        })
+        with instrumentacao.etapa("alertas:preparar", kpis.total_linhas) as medicao:
+            alertas_por_categoria, df_alerta = preparar_alertas(chave_filtros, obter_linhas_filtradas, kpis.mascara_abaixo)
+            medicao.linhas_saida = len(df_alerta)
         
-        # Reordenar colunas
-        ordem_colunas = ['ID', 'Nome do Produto', 'Categoria', 'Marca', 'Qtd. Atual', 
-                        'Qtd. Mínima', 'Déficit', 'Preço Unitário (R$)', 'Localização']
-        ordem_colunas = [col for col in ordem_colunas if col in df_alerta.columns]
-        df_alerta = df_alerta[ordem_colunas]
+        # Criar gráfico de pizza para distribuição de alertas por categoria
+        if alertas_por_categoria is not None:
+            with instrumentacao.etapa("alertas:grafico", len(alertas_por_categoria)):
+                fig_pizza = px.pie(
+                    values=alertas_por_categoria.values,
+                    names=alertas_por_categoria.index,
+                    title="Distribuição de Alertas por Categoria",
+                    color_discrete_sequence=px.colors.sequential.Reds_r
+                )
+                fig_pizza.update_traces(textposition='inside', textinfo='percent+label')
+                st.plotly_chart(fig_pizza, use_container_width=True)
         
         st.dataframe(
             df_alerta,
@@ -472,128 +887,113 @@ with tab2:
             hide_index=True
         )
         
-        # Calcular valor necessário para reposição
-        # Usar os dados originais antes do rename
-        valor_reposicao = ((produtos_abaixo['estoque_minimo'] - produtos_abaixo['quantidade_estoque']) * produtos_abaixo['preco_unitario']).sum()
-        st.info(f"💰 **Valor estimado para reposição:** R$ {valor_reposicao:,.2f}".replace(",", "."))
+        # Valor necessário para reposição (já calculado junto com as métricas)
+        valor_reposicao = kpis.valor_reposicao
+        st.info(f"💰 **Valor estimado para reposição (a custo):** {formatar_moeda(valor_reposicao)}")
     else:
         st.success("✅ Todos os produtos estão com estoque adequado!")
+    
+    if kpis.total_linhas > 0:
+        st.markdown("#### 📦 Plano de Reposição")
+        st.caption(
+            "Quantidades sugeridas para cada produto × localização a partir do consumo "
+            "histórico, do prazo de entrega e da cobertura desejada. Localizações com "
+            "sobra podem ceder unidades às lojas do mesmo produto antes da compra."
+        )
+        col_cobertura, col_prazo, col_transferir = st.columns(3)
+        with col_cobertura:
+            cobertura_alvo = st.slider("Cobertura alvo (dias):", min_value=7, max_value=90, value=30, step=1)
+        with col_prazo:
+            prazo_entrega = st.number_input("Prazo de entrega (dias):", min_value=0, max_value=60, value=7, step=1)
+        with col_transferir:
+            transferir = st.checkbox("Sugerir transferências entre lojas", value=True)
+        
+        with instrumentacao.etapa("alertas:plano_reposicao", kpis.total_linhas) as medicao:
+            plano, df_plano, df_transferencias = preparar_plano_reposicao(
+                chave_filtros, cobertura_alvo, int(prazo_entrega), transferir, obter_linhas_filtradas
+            )
+            medicao.linhas_saida = len(df_plano)
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric(
+                label="🛒 Unidades a Comprar",
+                value=f"{plano.quantidade_pedido:,}".replace(',', '.'),
+                help=f"{len(df_plano)} produto(s) × localização no plano"
+            )
+        with col2:
+            st.metric(
+                label="💰 Custo do Pedido",
+                value=formatar_moeda(plano.valor_pedido),
+                help="Compra valorizada pelo custo unitário"
+            )
+        with col3:
+            st.metric(
+                label="🔁 Unidades Transferidas",
+                value=f"{plano.quantidade_transferida:,}".replace(',', '.'),
+                help=f"Compra evitada: {formatar_moeda(plano.valor_transferido)}"
+            )
+        
+        if len(df_plano) > 0:
+            st.dataframe(df_plano.round({'Consumo/Dia': 2, 'Ponto de Pedido': 1}), use_container_width=True, hide_index=True)
+        else:
+            st.success("✅ Nenhuma compra necessária para a cobertura alvo.")
+        if len(df_transferencias) > 0:
+            st.markdown("##### 🔁 Transferências Sugeridas")
+            st.dataframe(df_transferencias, use_container_width=True, hide_index=True)
 
-with tab3:
+elif visao_selecionada == VISAO_ANALISES:
     st.subheader("📈 Análises Detalhadas")
     
+    with instrumentacao.etapa("analises:preparar", kpis.total_linhas):
+        analise_categoria, analise_localizacao = preparar_analises(chave_filtros, usar_cubo, obter_linhas_filtradas)
+    
     # Análise por Categoria
-    if 'categoria' in df_filtrado.columns and not df_filtrado.empty:
+    if analise_categoria is not None:
         st.markdown("#### 📂 Análise por Categoria")
         
-        # Calcular valor total por categoria
-        df_filtrado['valor_total'] = df_filtrado['quantidade_estoque'] * df_filtrado['preco_unitario']
-        
-        analise_categoria = df_filtrado.groupby('categoria').agg({
-            'produto_id': 'count',
-            'quantidade_estoque': 'sum',
-            'estoque_minimo': 'sum',
-            'valor_total': 'sum'
-        }).rename(columns={
-            'produto_id': 'Total Produtos',
-            'quantidade_estoque': 'Estoque Total',
-            'estoque_minimo': 'Mínimo Total',
-            'valor_total': 'Valor Total (R$)'
-        })
-        analise_categoria['Valor Total (R$)'] = analise_categoria['Valor Total (R$)'].apply(
-            lambda x: f"R$ {x:,.2f}".replace(",", ".")
-        )
-        
         st.dataframe(analise_categoria, use_container_width=True)
         
         # Gráfico de barras por categoria
-        fig_categoria = px.bar(
-            analise_categoria.reset_index(),
-            x='categoria',
-            y='Estoque Total',
-            title="Estoque Total por Categoria",
-            labels={'Estoque Total': 'Quantidade em Estoque', 'categoria': 'Categoria'},
-            color='categoria',
-            color_discrete_sequence=px.colors.qualitative.Set3
-        )
-        fig_categoria.update_layout(template="plotly_white", showlegend=False)
-        st.plotly_chart(fig_categoria, use_container_width=True)
+        with instrumentacao.etapa("analises:grafico_categoria", len(analise_categoria)):
+            fig_categoria = px.bar(
+                analise_categoria.reset_index(),
+                x='categoria',
+                y='Estoque Total',
+                title="Estoque Total por Categoria",
+                labels={'Estoque Total': 'Quantidade em Estoque', 'categoria': 'Categoria'},
+                color='categoria',
+                color_discrete_sequence=px.colors.qualitative.Set3
+            )
+            fig_categoria.update_layout(template="plotly_white", showlegend=False)
+            st.plotly_chart(fig_categoria, use_container_width=True)
     
     # Análise por Localização
-    if 'localizacao' in df_filtrado.columns and not df_filtrado.empty:
+    if analise_localizacao is not None:
         st.markdown("#### 📍 Análise por Localização")
         
-        analise_localizacao = df_filtrado.groupby('localizacao').agg({
-            'produto_id': 'count',
-            'quantidade_estoque': 'sum',
-            'estoque_minimo': 'sum'
-        }).rename(columns={
-            'produto_id': 'Total Produtos',
-            'quantidade_estoque': 'Estoque Total',
-            'estoque_minimo': 'Mínimo Total'
-        })
-        
         st.dataframe(analise_localizacao, use_container_width=True)
         
         # Gráfico de barras por localização
-        fig_localizacao = px.bar(
-            analise_localizacao.reset_index(),
-            x='localizacao',
-            y='Estoque Total',
-            title="Estoque Total por Localização",
-            labels={'Estoque Total': 'Quantidade em Estoque', 'localizacao': 'Localização'},
-            color='localizacao',
-            color_discrete_sequence=px.colors.qualitative.Pastel
-        )
-        fig_localizacao.update_layout(template="plotly_white", showlegend=False)
-        st.plotly_chart(fig_localizacao, use_container_width=True)
+        with instrumentacao.etapa("analises:grafico_localizacao", len(analise_localizacao)):
+            fig_localizacao = px.bar(
+                analise_localizacao.reset_index(),
+                x='localizacao',
+                y='Estoque Total',
+                title="Estoque Total por Localização",
+                labels={'Estoque Total': 'Quantidade em Estoque', 'localizacao': 'Localização'},
+                color='localizacao',
+                color_discrete_sequence=px.colors.qualitative.Pastel
+            )
+            fig_localizacao.update_layout(template="plotly_white", showlegend=False)
+            st.plotly_chart(fig_localizacao, use_container_width=True)
 
-with tab4:
+elif visao_selecionada == VISAO_TABELA:
     st.subheader("📋 Tabela Completa de Produtos")
     
-    # Selecionar colunas para exibição
-    colunas_tabela = ['produto_id', 'produto_nome', 'categoria', 'marca', 'quantidade_estoque', 
-                      'estoque_minimo', 'preco_unitario', 'localizacao']
-    colunas_tabela = [col for col in colunas_tabela if col in df_filtrado.columns]
-    
-    # Criar DataFrame para tabela
-    df_tabela = df_filtrado[colunas_tabela].copy()
-    
-    # Adicionar coluna de status
-    df_tabela['Status'] = df_tabela.apply(
-        lambda row: '⚠️ Abaixo do Mínimo' if row['quantidade_estoque'] < row['estoque_minimo'] else '✅ OK',
-        axis=1
-    )
-    
-    # Calcular diferença
-    df_tabela['Diferença'] = df_tabela['quantidade_estoque'] - df_tabela['estoque_minimo']
-    
-    # Formatação de valores monetários
-    df_tabela['Preço Unitário (R$)'] = df_tabela['preco_unitario'].apply(
-        lambda x: f"R$ {x:,.2f}".replace(",", ".")
-    )
-    
-    # Renomear colunas
-    df_tabela = df_tabela.rename(columns={
-        'produto_id': 'ID',
-        'produto_nome': 'Nome do Produto',
-        'categoria': 'Categoria',
-        'marca': 'Marca',
-        'quantidade_estoque': 'Qtd. Atual',
-        'estoque_minimo': 'Qtd. Mínima',
-        'localizacao': 'Localização'
-    })
-    
-    # Reordenar colunas
-    ordem_colunas = ['ID', 'Nome do Produto', 'Categoria', 'Marca', 'Qtd. Atual', 
-                     'Qtd. Mínima', 'Diferença', 'Status', 'Preço Unitário (R$)', 'Localização']
-    ordem_colunas = [col for col in ordem_colunas if col in df_tabela.columns]
-    df_tabela = df_tabela[ordem_colunas]
-    
-    # Ordenar por status (abaixo do mínimo primeiro)
-    df_tabela['Status_Order'] = df_tabela['Status'].apply(lambda x: 0 if '⚠️' in str(x) else 1)
-    df_tabela = df_tabela.sort_values(['Status_Order', 'Diferença'], ascending=[True, True])
-    df_tabela = df_tabela.drop('Status_Order', axis=1)
+    with instrumentacao.etapa("tabela:preparar", kpis.total_linhas) as medicao:
+        df_tabela = preparar_tabela(chave_filtros, obter_linhas_filtradas)
+        medicao.linhas_saida = len(df_tabela)
     
     # Exibir tabela
     st.dataframe(
@@ -602,16 +1002,246 @@ with tab4:
         hide_index=True
     )
     
-    # Botão para exportar dados
+    # Exportação: o arquivo só é gerado quando o usuário clica em Download
     st.markdown("---")
-    csv = df_tabela.to_csv(index=False).encode('utf-8-sig')
+    col_formato, col_conteudo = st.columns(2)
+    with col_formato:
+        formato_exportacao = st.radio(
+            "Formato",
+            options=formatos_disponiveis(),
+            format_func=str.upper,
+            horizontal=True,
+            key="formato_exportacao"
+        )
+    with col_conteudo:
+        conteudo_exportacao = st.radio(
+            "Conteúdo",
+            options=["Tabela formatada", "Dados brutos filtrados"],
+            horizontal=True,
+            key="conteudo_exportacao",
+            help="A tabela formatada é a exibida acima; os dados brutos trazem todas as colunas"
+        )
+    
+    if conteudo_exportacao == "Tabela formatada":
+        obter_dados_exportacao = lambda: df_tabela
+    else:
+        obter_dados_exportacao = obter_linhas_filtradas
+    extensao, mime = FORMATOS[formato_exportacao]
     st.download_button(
-        label="📥 Download CSV",
-        data=csv,
-        file_name=f"estoque_filtrado_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-        mime="text/csv",
-        help="Baixe os dados filtrados em formato CSV"
+        label=f"📥 Download {formato_exportacao.upper()}",
+        data=exportacao_sob_demanda(obter_dados_exportacao, formato_exportacao),
+        file_name=f"estoque_filtrado_{datetime.now().strftime('%Y%m%d_%H%M%S')}{extensao}",
+        mime=mime,
+        on_click="ignore",
+        help="Baixe os dados filtrados no formato escolhido"
+    )
+
+elif visao_selecionada == VISAO_TENDENCIAS:
+    st.subheader("📉 Tendências do Estoque")
+    st.caption(
+        "Histórico de todas as datas de referência para os produtos e localizações "
+        "selecionados pelos filtros. O consumo por dia considera apenas as quedas de "
+        "quantidade entre registros consecutivos (aumentos são reposições)."
     )
+    
+    if kpis.total_linhas > 0:
+        col_agrupamento, col_janela = st.columns(2)
+        with col_agrupamento:
+            agrupamento = st.radio(
+                "Agrupar por:",
+                options=[AGRUPAMENTO_PRODUTO, AGRUPAMENTO_PRODUTO_LOCAL],
+                horizontal=True,
+                key="agrupamento_tendencias"
+            )
+        with col_janela:
+            janela = st.slider(
+                "Janela (datas de referência):",
+                min_value=2,
+                max_value=max(3, min(24, len(datas_disponiveis))),
+                value=min(JANELA_PADRAO, max(3, len(datas_disponiveis))),
+                help="Datas usadas no consumo médio e nas estatísticas móveis"
+            )
+        
+        with instrumentacao.etapa("tendencias:preparar", kpis.total_linhas) as medicao:
+            evolucao, df_tendencias = preparar_tendencias(chave_filtros, agrupamento, janela, obter_linhas_filtradas)
+            medicao.linhas_saida = len(df_tendencias)
+        
+        cobertura = df_tendencias['Dias de Cobertura']
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric(
+                label="📉 Consumo Total por Dia",
+                value=f"{df_tendencias['Consumo/Dia'].sum():,.1f}".replace(',', '.'),
+                help="Soma do consumo médio diário na janela escolhida"
+            )
+        with col2:
+            cobertura_finita = cobertura[np.isfinite(cobertura)]
+            st.metric(
+                label="⏳ Cobertura Mediana",
+                value=f"{cobertura_finita.median():.0f} dias" if len(cobertura_finita) else "—",
+                help="Mediana dos dias de cobertura (itens com consumo)"
+            )
+        with col3:
+            st.metric(
+                label="⚠️ Cobertura < 30 dias",
+                value=int((cobertura < 30).sum()),
+                help="Itens cujo estoque atual dura menos de 30 dias no ritmo de consumo"
+            )
+        
+        with instrumentacao.etapa("tendencias:grafico", len(evolucao)):
+            fig_evolucao = go.Figure()
+            # Faixa entre o mínimo e o máximo móveis do estoque total
+            fig_evolucao.add_trace(go.Scatter(
+                x=evolucao.index, y=evolucao['maximo_movel'],
+                mode='lines', name=f'Máx. Móvel ({janela} datas)', line=dict(color='#ff7f0e', width=0)
+            ))
+            fig_evolucao.add_trace(go.Scatter(
+                x=evolucao.index, y=evolucao['minimo_movel'],
+                mode='lines', name=f'Mín. Móvel ({janela} datas)', line=dict(color='#ff7f0e', width=0),
+                fill='tonexty', fillcolor='rgba(255, 127, 14, 0.15)'
+            ))
+            fig_evolucao.add_trace(go.Scatter(
+                x=evolucao.index, y=evolucao['quantidade_estoque'],
+                mode='lines+markers', name='Estoque Total', line=dict(color='#1f77b4')
+            ))
+            fig_evolucao.add_trace(go.Scatter(
+                x=evolucao.index, y=evolucao['media_movel'],
+                mode='lines', name=f'Média Móvel ({janela} datas)', line=dict(color='#ff7f0e', dash='dash')
+            ))
+            fig_evolucao.update_layout(
+                title="Evolução do Estoque",
+                xaxis_title="Data de Referência",
+                yaxis_title="Quantidade em Estoque",
+                template="plotly_white",
+                hovermode='x unified'
+            )
+            st.plotly_chart(fig_evolucao, use_container_width=True)
+        
+        st.markdown("#### ⏳ Menor Cobertura Primeiro")
+        st.dataframe(
+            df_tendencias.round({'Consumo/Dia': 2, 'Dias de Cobertura': 1, 'Média Móvel': 1}),
+            use_container_width=True,
+            hide_index=True
+        )
+    else:
+        st.warning("Nenhum dado disponível para exibição com os filtros selecionados.")
+
+elif visao_selecionada == VISAO_COMPARACAO:
+    st.subheader("🔀 Comparação entre Datas")
+    
+    outras_datas = [d for d in datas_formatadas if d != chave_data] if datas_disponiveis else []
+    if outras_datas:
+        # Padrão: a data imediatamente anterior à selecionada (ou a primeira disponível)
+        anteriores = [d for d in datas_disponiveis if d < data_selecionada]
+        padrao = anteriores[-1].strftime('%d/%m/%Y') if anteriores else outras_datas[0]
+        col_base, col_agrupamento = st.columns(2)
+        with col_base:
+            chave_base = st.selectbox(
+                "Comparar com a data:",
+                options=outras_datas,
+                index=outras_datas.index(padrao),
+                help="A data selecionada na sidebar é comparada com esta data base"
+            )
+        with col_agrupamento:
+            por_localizacao = st.radio(
+                "Alinhar por:",
+                options=["Produto × Localização", "Produto"],
+                horizontal=True,
+                key="alinhamento_comparacao"
+            ) == "Produto × Localização"
+        data_base = pd.to_datetime(chave_base, format='%d/%m/%Y')
+        st.caption(
+            f"Variações de {chave_base} para {chave_data}, com os mesmos filtros da sidebar "
+            "nas duas datas (o filtro de status é ignorado para exibir as transições)."
+        )
+        
+        with instrumentacao.etapa("comparacao:preparar") as medicao:
+            comparacao, comparacao_categoria, df_transicoes, df_alterados = preparar_comparacao(
+                chave_filtros, chave_base, por_localizacao, data_base
+            )
+            medicao.linhas_saida = len(comparacao.itens)
+        
+        base, atual = comparacao.kpis_base, comparacao.kpis_comparada
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric(
+                label="📦 Total de Produtos",
+                value=atual.total_produtos_unicos,
+                delta=atual.total_produtos_unicos - base.total_produtos_unicos
+            )
+        with col2:
+            st.metric(
+                label="⚠️ Produtos Abaixo do Mínimo",
+                value=atual.produtos_abaixo_minimo,
+                delta=atual.produtos_abaixo_minimo - base.produtos_abaixo_minimo,
+                delta_color="inverse"
+            )
+        with col3:
+            st.metric(
+                label="💰 Valor Total do Estoque",
+                value=formatar_moeda(atual.valor_total),
+                delta=formatar_moeda(atual.valor_total - base.valor_total)
+            )
+        with col4:
+            st.metric(
+                label="📈 % Produtos em Alerta",
+                value=f"{atual.percentual_alerta:.1f}%",
+                delta=f"{atual.percentual_alerta - base.percentual_alerta:+.1f} p.p.",
+                delta_color="inverse"
+            )
+        
+        transicoes = comparacao.contagem_transicoes()
+        st.markdown("#### 🔁 Transições de Status")
+        colunas_transicao = st.columns(len(transicoes))
+        for coluna, (transicao, quantidade) in zip(colunas_transicao, transicoes.items()):
+            with coluna:
+                st.metric(label=transicao, value=int(quantidade))
+        
+        if comparacao_categoria is not None and len(comparacao_categoria) > 0:
+            with instrumentacao.etapa("comparacao:grafico", len(comparacao_categoria)):
+                fig_comparacao = go.Figure()
+                fig_comparacao.add_trace(go.Bar(
+                    name=f'Valor em {chave_base}', x=comparacao_categoria.index,
+                    y=comparacao_categoria['valor_base'], marker_color='#9ecae1'
+                ))
+                fig_comparacao.add_trace(go.Bar(
+                    name=f'Valor em {chave_data}', x=comparacao_categoria.index,
+                    y=comparacao_categoria['valor_comparada'], marker_color='#1f77b4'
+                ))
+                fig_comparacao.update_layout(
+                    title="Valor do Estoque por Categoria",
+                    xaxis_title="Categoria",
+                    yaxis_title="Valor (R$)",
+                    barmode='group',
+                    template="plotly_white"
+                )
+                st.plotly_chart(fig_comparacao, use_container_width=True)
+            
+            tabela_categoria = comparacao_categoria.reset_index().rename(columns={
+                'categoria': 'Categoria',
+                'abaixo_base': 'Em Alerta (Base)',
+                'abaixo_comparada': 'Em Alerta (Atual)',
+                'entraram_alerta': 'Entraram em Alerta',
+                'sairam_alerta': 'Saíram do Alerta',
+            })
+            tabela_categoria['Variação do Valor (R$)'] = formatar_moeda_lote(comparacao_categoria['delta_valor'])
+            st.dataframe(
+                tabela_categoria[['Categoria', 'Em Alerta (Base)', 'Em Alerta (Atual)', 'Entraram em Alerta',
+                                  'Saíram do Alerta', 'Variação do Valor (R$)']],
+                use_container_width=True,
+                hide_index=True
+            )
+        
+        st.markdown("#### 🚨 Entraram ou Saíram do Alerta")
+        if len(df_transicoes) > 0:
+            st.dataframe(df_transicoes, use_container_width=True, hide_index=True)
+        else:
+            st.info("Nenhum item mudou de status entre as datas.")
+        
+        st.markdown("#### 📦 Maiores Variações de Quantidade")
+        st.dataframe(df_alterados, use_container_width=True, hide_index=True)
+    else:
+        st.info("É preciso haver ao menos duas datas de referência para comparar.")
 
 # ============================================
 # RESUMO DOS FILTROS ATIVOS
@@ -619,16 +1249,16 @@ with tab4:
 st.markdown("---")
 with st.expander("ℹ️ Informações sobre os Filtros Ativos"):
     filtros_ativos = []
-    if categoria_selecionada != "Todas":
-        filtros_ativos.append(f"**Categoria:** {categoria_selecionada}")
-    if marca_selecionada != "Todas":
-        filtros_ativos.append(f"**Marca:** {marca_selecionada}")
-    if localizacao_selecionada != "Todas":
-        filtros_ativos.append(f"**Localização:** {localizacao_selecionada}")
+    if categorias_selecionadas:
+        filtros_ativos.append(f"**Categoria:** {', '.join(categorias_selecionadas)}")
+    if marcas_selecionadas:
+        filtros_ativos.append(f"**Marca:** {', '.join(marcas_selecionadas)}")
+    if localizacoes_selecionadas:
+        filtros_ativos.append(f"**Localização:** {', '.join(localizacoes_selecionadas)}")
     if status_selecionado != "Todos":
         filtros_ativos.append(f"**Status:** {status_selecionado}")
     if preco_range[0] > preco_min or preco_range[1] < preco_max:
-        filtros_ativos.append(f"**Preço:** R$ {preco_range[0]:,.2f} - R$ {preco_range[1]:,.2f}".replace(",", "."))
+        filtros_ativos.append(f"**Preço:** {formatar_moeda(preco_range[0])} - {formatar_moeda(preco_range[1])}")
     if busca_nome:
         filtros_ativos.append(f"**Busca:** {busca_nome}")
     
@@ -639,7 +1269,84 @@ with st.expander("ℹ️ Informações sobre os Filtros Ativos"):
     else:
         st.write("Nenhum filtro específico aplicado (exibindo todos os dados).")
     
-    st.write(f"**Total de registros exibidos:** {len(df_filtrado)} de {len(df_original)}")
+    st.write(f"**Total de registros exibidos:** {kpis.total_linhas} de {total_registros}")
+
+# ============================================
+# ATUALIZAÇÃO DOS DADOS
+# ============================================
+# Novas versões são publicadas pelo serviço em segundo plano e passam a valer
+# na próxima interação de cada sessão
+st.sidebar.caption(
+    f"🔄 Dados na versão nº {conjunto_dados.numero}, publicada às "
+    f"{datetime.fromtimestamp(conjunto_dados.publicado_em).strftime('%H:%M:%S')}"
+    + ("" if servico_atualizacao.intervalo > 0 else " · atualização automática desativada")
+)
+if servico_atualizacao.ultimo_erro is not None:
+    st.sidebar.warning(
+        f"⚠️ A última atualização dos dados falhou e a versão anterior continua em uso: "
+        f"{servico_atualizacao.ultimo_erro}"
+    )
+
+# ============================================
+# DIAGNÓSTICO DE DESEMPENHO
+# ============================================
+@st.cache_data(max_entries=4)
+def preparar_memoria_colunas(versao, _df):
+    """Memória por coluna do DataFrame carregado, com e sem o esquema compacto de tipos"""
+    return relatorio_memoria(_df)
+
+instrumentacao.finalizar()
+with st.sidebar.expander("🛠️ Diagnóstico de Desempenho"):
+    resumo_etapas = instrumentacao.resumo()
+    memoria_medida = resumo_etapas['bytes_alocados'].notna().any()
+    st.caption(
+        f"Tempo total das etapas: {instrumentacao.total_ms:.1f} ms"
+        + ("" if memoria_medida else " · memória não amostrada nesta execução")
+    )
+    estatisticas_cache = cache_filtros.estatisticas()
+    st.caption(
+        f"Cache de filtros: {estatisticas_cache['acertos']} acertos, "
+        f"{estatisticas_cache['falhas']} falhas "
+        f"({estatisticas_cache['taxa_acerto']:.0%}) · "
+        f"{estatisticas_cache['tamanho']}/{estatisticas_cache['capacidade']} combinações"
+    )
+    resumo_etapas['ms'] = resumo_etapas['ms'].round(2)
+    resumo_etapas['bytes_alocados'] = (resumo_etapas['bytes_alocados'] / 1024).round(1)
+    st.dataframe(
+        resumo_etapas.rename(columns={
+            'nome': 'Etapa',
+            'ms': 'Tempo (ms)',
+            'linhas_entrada': 'Linhas (entrada)',
+            'linhas_saida': 'Linhas (saída)',
+            'bytes_alocados': 'Memória alocada (KB)'
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    # Memória do DataFrame em uso (apenas no backend pandas): medida com o
+    # esquema compacto e estimada para os tipos padrão do pandas
+    if not usar_sql:
+        memoria_colunas = preparar_memoria_colunas(versao_atual, df_original)
+        total_sem = memoria_colunas['bytes_sem_esquema'].sum() / 1024 ** 2
+        total_com = memoria_colunas['bytes_com_esquema'].sum() / 1024 ** 2
+        st.caption(
+            f"Memória do DataFrame: {total_com:.1f} MB com o esquema compacto "
+            f"(≈ {total_sem:.1f} MB estimados sem ele)"
+        )
+        st.dataframe(
+            memoria_colunas.assign(
+                bytes_sem_esquema=(memoria_colunas['bytes_sem_esquema'] / 1024).round(1),
+                bytes_com_esquema=(memoria_colunas['bytes_com_esquema'] / 1024).round(1),
+            ).rename(columns={
+                'coluna': 'Coluna',
+                'tipo': 'Tipo',
+                'bytes_sem_esquema': 'Sem esquema, estimado (KB)',
+                'bytes_com_esquema': 'Com esquema (KB)',
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
 
 # Rodapé
 st.markdown("---")
@@ -0,0 +1 @@
+# Pacote de benchmarks dos caminhos críticos do dashboard
@@ -0,0 +1,248 @@
+"""
+Executa os benchmarks dos caminhos críticos do dashboard e grava os resultados em JSON
+
+Uso:
+    python -m benchmarks.executar --linhas 1000000
+    python -m benchmarks.executar --linhas 10000000 --comparar benchmarks/resultados/anterior.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.gerador import gerar_dados
+from utils.busca import MODO_CONTEM
+from utils.calculations import (
+    calcular_kpis,
+    calcular_produtos_abaixo_minimo,
+    calcular_valor_total_estoque,
+    identificar_produtos_abaixo_minimo,
+)
+from utils.carga_em_blocos import agregar_em_blocos
+from utils.data_loader import (
+    carregar_dados,
+    construir_catalogo,
+    construir_indice_datas,
+    filtrar_por_data,
+    obter_categorias,
+    obter_datas_referencia,
+    obter_localizacoes,
+    obter_marcas,
+)
+from utils.filtros import STATUS_ABAIXO, MotorFiltros
+
+# Razão de tempo (atual / anterior) a partir da qual um caso é regressão
+TOLERANCIA_PADRAO = 1.25
+
+
+def medir(funcao, repeticoes=3):
+    """
+    Mede o tempo de parede (várias repetições) e o pico de memória alocada
+    (uma execução extra sob tracemalloc, para não distorcer os tempos).
+    O tracemalloc enxerga as alocações do Python e do NumPy/pandas, mas não
+    o pool de memória do Arrow usado na leitura do snapshot Parquet.
+
+    Args:
+        funcao (callable): Função sem argumentos a medir
+        repeticoes (int): Quantidade de execuções cronometradas
+
+    Returns:
+        dict: Tempos mínimo e mediano (s) e pico de memória (MB)
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'tempo_min_s': min(tempos),
+        'tempo_mediana_s': statistics.median(tempos),
+        'repeticoes': repeticoes,
+        'pico_memoria_mb': pico / 1024 ** 2,
+    }
+
+
+def casos_benchmark(pasta_dados):
+    """
+    Monta os casos medidos, na ordem do fluxo do app.py: carga, recorte por
+    data, listas da sidebar, cálculos e a cadeia de filtros.
+
+    Args:
+        pasta_dados (str): Pasta com os CSVs sintéticos
+
+    Returns:
+        list: Pares (nome, função sem argumentos)
+    """
+    # Gravar o snapshot antes, para medir a carga pelos dois caminhos
+    df = carregar_dados(pasta_dados)
+    indice = construir_indice_datas(df)
+    data = indice.data_mais_recente
+    df_data = filtrar_por_data(df, data, indice)
+    catalogo = construir_catalogo(df, indice)
+    catalogo_data = catalogo.recorte(data)
+    motor = MotorFiltros(df_data)
+    categorias = obter_categorias(df_data)[:2]
+    preco_min, preco_max = motor.limites_preco()
+    faixa = (preco_min, preco_min + (preco_max - preco_min) / 2)
+
+    def cadeia_filtros():
+        motor_data = MotorFiltros(filtrar_por_data(df, data, indice))
+        df_filtrado = motor_data.aplicar(
+            categorias=categorias, status=STATUS_ABAIXO, faixa_preco=faixa,
+            busca='', modo_busca=MODO_CONTEM
+        )
+        return calcular_kpis(df_filtrado)
+
+    return [
+        ('carregar_dados[csv]', lambda: carregar_dados(pasta_dados, usar_snapshot=False)),
+        ('carregar_dados[snapshot]', lambda: carregar_dados(pasta_dados)),
+        ('agregar_em_blocos', lambda: agregar_em_blocos(pasta_dados, tamanho_bloco=100_000)),
+        ('construir_indice_datas', lambda: construir_indice_datas(df)),
+        ('obter_datas_referencia', lambda: obter_datas_referencia(df)),
+        ('filtrar_por_data', lambda: filtrar_por_data(df, data)),
+        ('filtrar_por_data[indice]', lambda: filtrar_por_data(df, data, indice)),
+        ('obter_categorias', lambda: obter_categorias(df_data)),
+        ('obter_marcas', lambda: obter_marcas(df_data)),
+        ('obter_localizacoes', lambda: obter_localizacoes(df_data)),
+        ('construir_catalogo', lambda: construir_catalogo(df, indice)),
+        ('opcoes_sidebar[catalogo]', lambda: (
+            obter_datas_referencia(df, catalogo=catalogo),
+            obter_categorias(df_data, catalogo_data),
+            obter_marcas(df_data, catalogo_data),
+            obter_localizacoes(df_data, catalogo_data),
+            catalogo_data.limites_preco(),
+        )),
+        ('calcular_produtos_abaixo_minimo', lambda: calcular_produtos_abaixo_minimo(df)),
+        ('calcular_valor_total_estoque', lambda: calcular_valor_total_estoque(df)),
+        ('identificar_produtos_abaixo_minimo', lambda: identificar_produtos_abaixo_minimo(df)),
+        ('calcular_kpis', lambda: calcular_kpis(df)),
+        ('MotorFiltros', lambda: MotorFiltros(df_data)),
+        ('MotorFiltros.aplicar[busca]', lambda: motor.aplicar(busca='yamaha', modo_busca=MODO_CONTEM)),
+        ('cadeia_filtros_app', cadeia_filtros),
+    ]
+
+
+def comparar(resultados, caminho_anterior, tolerancia=TOLERANCIA_PADRAO):
+    """
+    Compara os tempos com os de uma execução anterior (mesmo formato JSON).
+
+    Args:
+        resultados (dict): Resultados da execução atual
+        caminho_anterior (str): Arquivo JSON da execução anterior
+        tolerancia (float): Razão de tempo considerada regressão
+
+    Returns:
+        list: Nomes dos casos que regrediram
+    """
+    with open(caminho_anterior, encoding='utf-8') as f:
+        anteriores = {caso['nome']: caso for caso in json.load(f)['casos']}
+
+    regressoes = []
+    for caso in resultados['casos']:
+        anterior = anteriores.get(caso['nome'])
+        if anterior is None or anterior['tempo_min_s'] <= 0:
+            continue
+        razao = caso['tempo_min_s'] / anterior['tempo_min_s']
+        marcador = '  <-- regressão' if razao > tolerancia else ''
+        print(f"{caso['nome']:<40} {anterior['tempo_min_s']:>10.4f}s -> "
+              f"{caso['tempo_min_s']:>10.4f}s ({razao:.2f}x){marcador}")
+        if razao > tolerancia:
+            regressoes.append(caso['nome'])
+    return regressoes
+
+
+def executar(linhas, produtos, semente, repeticoes, pasta_dados=None):
+    """
+    Gera os dados sintéticos (se necessário) e mede todos os casos.
+
+    Args:
+        linhas (int): Linhas de estoque geradas
+        produtos (int): Produtos gerados
+        semente (int): Semente do gerador
+        repeticoes (int): Execuções cronometradas por caso
+        pasta_dados (str): Pasta dos CSVs (None = pasta temporária)
+
+    Returns:
+        dict: Metadados da execução e resultado de cada caso
+    """
+    with tempfile.TemporaryDirectory() as pasta_tmp:
+        pasta = pasta_dados or pasta_tmp
+        if not os.path.exists(os.path.join(pasta, 'FCD_ESTOQUE.csv')):
+            print(f"Gerando {linhas} linhas de estoque em {pasta}...")
+            gerar_dados(pasta, linhas, produtos, semente)
+
+        casos = []
+        for nome, funcao in casos_benchmark(pasta):
+            resultado = medir(funcao, repeticoes)
+            print(f"{nome:<40} {resultado['tempo_min_s']:>10.4f}s "
+                  f"{resultado['pico_memoria_mb']:>10.1f} MB")
+            casos.append({'nome': nome, **resultado})
+
+    return {
+        'data_execucao': datetime.now().isoformat(timespec='seconds'),
+        'parametros': {
+            'linhas': linhas, 'produtos': produtos,
+            'semente': semente, 'repeticoes': repeticoes,
+        },
+        'ambiente': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'plataforma': platform.platform(),
+        },
+        'casos': casos,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do dashboard de estoque")
+    parser.add_argument('--linhas', type=int, default=1_000_000,
+                        help="Linhas de estoque sintéticas (até dezenas de milhões)")
+    parser.add_argument('--produtos', type=int, default=10_000, help="Produtos sintéticos")
+    parser.add_argument('--semente', type=int, default=42, help="Semente do gerador")
+    parser.add_argument('--repeticoes', type=int, default=3, help="Execuções por caso")
+    parser.add_argument('--dados', help="Pasta para gerar/reaproveitar os CSVs (padrão: temporária)")
+    parser.add_argument('--saida', help="Arquivo JSON de saída (padrão: benchmarks/resultados/)")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior para comparação")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_PADRAO,
+                        help="Razão de tempo considerada regressão")
+    args = parser.parse_args(argv)
+
+    resultados = executar(args.linhas, args.produtos, args.semente, args.repeticoes, args.dados)
+
+    saida = args.saida or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'resultados',
+        f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(resultados, f, ensure_ascii=False, indent=2)
+    print(f"Resultados gravados em {saida}")
+
+    if args.comparar:
+        regressoes = comparar(resultados, args.comparar, args.tolerancia)
+        if regressoes:
+            print(f"Regressões: {', '.join(regressoes)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
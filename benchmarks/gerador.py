@@ -0,0 +1,104 @@
+"""
+Gerador de dados sintéticos de estoque no mesmo esquema de FCD_PRODUTOS e FCD_ESTOQUE
+"""
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+CATEGORIAS = ['Acessórios', 'Pneus', 'Transmissão', 'Elétrica', 'Motor', 'Freios', 'Suspensão']
+MARCAS = ['Yamaha', 'Kawasaki', 'Suzuki', 'NGK', 'Bosch', 'Magneti Marelli',
+          'Pirelli', 'Shineray', 'Honda', 'Cofap']
+LOCALIZACOES = ['Loja 1', 'Loja 2', 'Depósito Central']
+PALAVRAS = ['Nostrum', 'Unde', 'Voluptate', 'Adipisci', 'Illo', 'Nobis', 'Tenetur',
+            'Sequi', 'Saepe', 'Culpa', 'Sint', 'Debitis', 'Dolorem', 'Beatae',
+            'Labore', 'Delectus', 'Quod', 'Suscipit', 'Aliquid', 'Laudantium']
+
+# Linhas de estoque geradas e gravadas por vez (limita a memória do gerador)
+LINHAS_POR_BLOCO = 1_000_000
+
+
+def gerar_produtos(n_produtos, rng):
+    """
+    Gera o cadastro de produtos com as mesmas colunas e faixas de valores
+    do FCD_PRODUTOS.csv de exemplo.
+
+    Args:
+        n_produtos (int): Quantidade de produtos
+        rng (np.random.Generator): Gerador de números aleatórios
+
+    Returns:
+        pd.DataFrame: Produtos
+    """
+    ids = np.arange(1, n_produtos + 1)
+    categorias = rng.choice(CATEGORIAS, n_produtos)
+    marcas = rng.choice(MARCAS, n_produtos)
+    palavras = rng.choice(PALAVRAS, n_produtos)
+    preco = np.round(rng.uniform(38.0, 2500.0, n_produtos), 2)
+    dimensoes = rng.integers(1, 100, size=(n_produtos, 3))
+    return pd.DataFrame({
+        'produto_id': ids,
+        'sku': [f"SKU{i:05d}" for i in ids],
+        'produto_nome': [f"{c} {m} {p}" for c, m, p in zip(categorias, marcas, palavras)],
+        'categoria': categorias,
+        'marca': marcas,
+        'preco_unitario': preco,
+        'custo_unitario': np.round(preco * rng.uniform(0.4, 0.7, n_produtos), 2),
+        'estoque_inicial': rng.integers(5, 151, n_produtos),
+        'unidade_medida': 'unidade',
+        'peso_kg': np.round(rng.uniform(0.2, 30.0, n_produtos), 2),
+        'dimensao_cm': [f"{a}x{b}x{c}" for a, b, c in dimensoes],
+    })
+
+
+def _gerar_bloco_estoque(inicio, fim, n_produtos, datas, rng):
+    """Gera as linhas de estoque [inicio, fim): cada data tem uma linha por produto"""
+    posicoes = np.arange(inicio, fim)
+    quantidade = rng.integers(0, 900, len(posicoes))
+    # Cerca de 15% das linhas ficam abaixo do mínimo, como nos dados de exemplo
+    baixos = rng.random(len(posicoes)) < 0.15
+    quantidade[baixos] = rng.integers(0, 5, int(baixos.sum()))
+    return pd.DataFrame({
+        'estoque_id': posicoes + 1,
+        'data_referencia': datas[posicoes // n_produtos],
+        'produto_id': posicoes % n_produtos + 1,
+        'quantidade_estoque': quantidade,
+        'estoque_minimo': rng.integers(5, 31, len(posicoes)),
+        'localizacao': rng.choice(LOCALIZACOES, len(posicoes)),
+    })
+
+
+def gerar_dados(destino, n_linhas_estoque, n_produtos=10_000, semente=42):
+    """
+    Grava em destino os arquivos FCD_PRODUTOS.csv e FCD_ESTOQUE.csv
+    sintéticos. Cada data de referência (diária, a partir de 2020-01-01)
+    tem uma linha de estoque por produto; o número de datas é o necessário
+    para chegar a n_linhas_estoque. O estoque é gerado e gravado em blocos,
+    então é possível chegar a dezenas de milhões de linhas.
+
+    Args:
+        destino (str): Pasta de saída
+        n_linhas_estoque (int): Quantidade de linhas de estoque
+        n_produtos (int): Quantidade de produtos (limitada a n_linhas_estoque)
+        semente (int): Semente do gerador (mesma semente, mesmos arquivos)
+
+    Returns:
+        tuple: (caminho_produtos, caminho_estoque)
+    """
+    rng = np.random.default_rng(semente)
+    n_produtos = max(1, min(n_produtos, n_linhas_estoque))
+    n_datas = math.ceil(n_linhas_estoque / n_produtos)
+    datas = pd.date_range('2020-01-01', periods=n_datas, freq='D').strftime('%Y-%m-%d').to_numpy()
+
+    os.makedirs(destino, exist_ok=True)
+    caminho_produtos = os.path.join(destino, 'FCD_PRODUTOS.csv')
+    caminho_estoque = os.path.join(destino, 'FCD_ESTOQUE.csv')
+
+    gerar_produtos(n_produtos, rng).to_csv(caminho_produtos, index=False)
+    for inicio in range(0, n_linhas_estoque, LINHAS_POR_BLOCO):
+        fim = min(inicio + LINHAS_POR_BLOCO, n_linhas_estoque)
+        bloco = _gerar_bloco_estoque(inicio, fim, n_produtos, datas, rng)
+        bloco.to_csv(caminho_estoque, index=False, mode='w' if inicio == 0 else 'a',
+                     header=inicio == 0)
+    return caminho_produtos, caminho_estoque
@@ -0,0 +1,93 @@
+"""
+Módulo com a formatação vetorizada usada nas tabelas e gráficos do dashboard
+"""
+import numpy as np
+import pandas as pd
+
+# Rótulos de status (abaixo do mínimo, adequado) usados no gráfico e na tabela
+ROTULOS_STATUS = ('Abaixo do Mínimo', 'Adequado')
+ROTULOS_STATUS_TABELA = ('⚠️ Abaixo do Mínimo', '✅ OK')
+
+COR_ABAIXO = '#DC143C'
+COR_ADEQUADO = '#28A745'
+
+
+def formatar_moeda(valor):
+    """
+    Formata um valor em reais, no mesmo padrão usado em todo o dashboard.
+
+    Args:
+        valor (float): Valor a formatar
+
+    Returns:
+        str: Valor formatado (ex.: 'R$ 1.486.47')
+    """
+    return f"R$ {valor:,.2f}".replace(",", ".")
+
+
+def formatar_moeda_lote(valores):
+    """
+    Formata uma coluna inteira de valores em reais. Cada valor distinto é
+    formatado uma única vez e o resultado é espalhado pelas linhas com um
+    take vetorizado (preços se repetem muito entre localizações e datas).
+
+    Args:
+        valores (pd.Series ou np.ndarray): Valores a formatar
+
+    Returns:
+        pd.Series ou np.ndarray: Textos formatados (Series mantém o índice)
+    """
+    array = valores.to_numpy(dtype=np.float64) if isinstance(valores, pd.Series) else np.asarray(valores, dtype=np.float64)
+    codigos, distintos = pd.factorize(array)
+    textos = np.array([formatar_moeda(v) for v in distintos] + [formatar_moeda(np.nan)], dtype=object)
+    # Código -1 (NaN) aponta para o último texto
+    formatados = textos[codigos]
+    if isinstance(valores, pd.Series):
+        return pd.Series(formatados, index=valores.index, name=valores.name)
+    return formatados
+
+
+def mascara_abaixo_minimo(df):
+    """Retorna a máscara booleana das linhas abaixo do estoque mínimo"""
+    return df['quantidade_estoque'].to_numpy() < df['estoque_minimo'].to_numpy()
+
+
+def rotular_status(mascara_abaixo, rotulos=ROTULOS_STATUS, index=None):
+    """
+    Monta a coluna de status como categórica a partir da máscara de alerta,
+    sem percorrer as linhas em Python.
+
+    Args:
+        mascara_abaixo (np.ndarray): Máscara das linhas abaixo do mínimo
+        rotulos (tuple): (rótulo abaixo do mínimo, rótulo adequado)
+        index (pd.Index): Índice da Series resultante (opcional)
+
+    Returns:
+        pd.Series: Status categórico
+    """
+    codigos = np.where(mascara_abaixo, 0, 1).astype(np.int8)
+    return pd.Series(pd.Categorical.from_codes(codigos, categories=list(rotulos)), index=index)
+
+
+def ordem_criticidade(df):
+    """
+    Retorna as posições das linhas ordenadas por criticidade: primeiro os
+    produtos abaixo do mínimo, depois pela diferença (quantidade - mínimo)
+    crescente. Usa chaves numéricas em vez de comparar textos de status.
+
+    Args:
+        df (pd.DataFrame): DataFrame com quantidade_estoque e estoque_minimo
+
+    Returns:
+        np.ndarray: Posições ordenadas
+    """
+    quantidade = df['quantidade_estoque'].to_numpy(dtype=np.int64)
+    minimo = df['estoque_minimo'].to_numpy(dtype=np.int64)
+    ordem_status = (quantidade >= minimo).astype(np.int8)
+    # lexsort ordena pela última chave primeiro
+    return np.lexsort((quantidade - minimo, ordem_status))
+
+
+def cores_status(mascara_abaixo):
+    """Retorna a lista de cores das barras conforme o status de cada linha"""
+    return np.where(mascara_abaixo, COR_ABAIXO, COR_ADEQUADO).tolist()
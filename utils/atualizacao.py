@@ -0,0 +1,187 @@
+"""
+Módulo com o serviço de atualização em segundo plano dos dados do dashboard
+"""
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# Variável de ambiente com o intervalo (segundos) entre as verificações dos
+# arquivos de origem; 0 desativa a atualização automática
+VARIAVEL_INTERVALO = 'DASHBOARD_INTERVALO_ATUALIZACAO'
+INTERVALO_PADRAO = 30.0
+
+
+def obter_intervalo_configurado():
+    """
+    Retorna o intervalo entre verificações definido na variável de ambiente
+    DASHBOARD_INTERVALO_ATUALIZACAO (padrão: 30 segundos; 0 = desativado).
+
+    Returns:
+        float: Intervalo em segundos
+    """
+    valor = os.environ.get(VARIAVEL_INTERVALO, '').strip()
+    if not valor:
+        return INTERVALO_PADRAO
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        logger.warning("%s inválido (%r); usando %.0f s", VARIAVEL_INTERVALO, valor, INTERVALO_PADRAO)
+        return INTERVALO_PADRAO
+
+
+@dataclass(frozen=True)
+class ConjuntoDados:
+    """
+    Versão completa e imutável dos dados, publicada de uma só vez.
+
+    Attributes:
+        versao (str): Identificador dos arquivos de origem (ver versao_dados)
+        numero (int): Número sequencial da publicação (1 = primeira carga)
+        dados (object): O que a função de construção retornou
+        publicado_em (float): Momento da publicação (time.time())
+    """
+    versao: str
+    numero: int
+    dados: object
+    publicado_em: float
+
+
+class ServicoAtualizacao:
+    """
+    Mantém a versão atual dos dados e a reconstrói em uma thread de fundo
+    quando os arquivos de origem mudam, fora do caminho das requisições.
+
+    A thread consulta obter_versao() a cada `intervalo` segundos (só
+    metadados dos arquivos, sem ler o conteúdo). Uma versão nova só é
+    construída depois de aparecer igual em duas verificações seguidas, para
+    não ler arquivos ainda em cópia. A construção roda inteira na thread de
+    fundo; ao terminar, o novo ConjuntoDados substitui o anterior em uma
+    única atribuição, então quem chama atual() recebe sempre uma versão
+    completa, a antiga ou a nova, nunca uma parcial. Se a construção falha,
+    a versão anterior continua publicada e o erro fica em ultimo_erro.
+
+    Args:
+        obter_versao (callable): Função sem argumentos que retorna a versão dos arquivos
+        construir (callable): Função que recebe a versão e retorna os dados prontos
+        intervalo (float): Segundos entre verificações (0 = sem thread de fundo)
+    """
+
+    def __init__(self, obter_versao, construir, intervalo=INTERVALO_PADRAO):
+        self.obter_versao = obter_versao
+        self.construir = construir
+        self.intervalo = intervalo
+        self.ultimo_erro = None
+        self.verificado_em = None
+        self._atual = None
+        self._versao_com_erro = None
+        self._trava_construcao = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+
+    @property
+    def numero(self):
+        """Número da versão publicada (0 = nenhuma ainda)"""
+        atual = self._atual
+        return atual.numero if atual is not None else 0
+
+    def atual(self):
+        """
+        Retorna a versão publicada dos dados. Só a primeira chamada (antes
+        de haver qualquer versão) espera pela carga; as demais nunca esperam.
+
+        Returns:
+            ConjuntoDados: Versão atual
+
+        Raises:
+            Exception: O erro da carga inicial, se ela falhar
+        """
+        atual = self._atual
+        if atual is not None:
+            return atual
+        with self._trava_construcao:
+            if self._atual is None:
+                versao = self.obter_versao()
+                self._publicar(versao, self.construir(versao))
+        return self._atual
+
+    def _publicar(self, versao, dados):
+        """Substitui a versão publicada (uma única atribuição de referência)"""
+        self._atual = ConjuntoDados(
+            versao=versao,
+            numero=self.numero + 1,
+            dados=dados,
+            publicado_em=time.time(),
+        )
+        self.ultimo_erro = None
+        self._versao_com_erro = None
+        logger.info("Dados publicados: versão %s (nº %d)", versao, self._atual.numero)
+
+    def verificar(self, versao_anterior=None):
+        """
+        Verifica os arquivos de origem e, se a versão mudou e está estável
+        (igual a `versao_anterior`, observada na verificação anterior),
+        reconstrói e publica os dados.
+
+        Args:
+            versao_anterior (str): Versão vista na verificação anterior
+                (None = reconstruir sem esperar pela confirmação)
+
+        Returns:
+            str: Versão observada nesta verificação (None se falhou)
+        """
+        try:
+            versao = self.obter_versao()
+        except Exception as e:
+            logger.warning("Não foi possível verificar os arquivos de origem: %s", e)
+            return None
+        finally:
+            self.verificado_em = time.time()
+
+        atual = self._atual
+        if atual is not None and versao == atual.versao:
+            return versao
+        if versao == self._versao_com_erro:
+            return versao
+        if versao_anterior is not None and versao != versao_anterior:
+            # Arquivos mudando: espera a próxima verificação confirmar
+            return versao
+
+        with self._trava_construcao:
+            if self._atual is not None and self._atual.versao == versao:
+                return versao
+            inicio = time.perf_counter()
+            try:
+                dados = self.construir(versao)
+            except Exception as e:
+                self.ultimo_erro = e
+                self._versao_com_erro = versao
+                logger.exception("Falha ao reconstruir os dados (versão %s); mantendo a versão anterior", versao)
+                return versao
+            self._publicar(versao, dados)
+            logger.info("Reconstrução em segundo plano: %.2f s", time.perf_counter() - inicio)
+        return versao
+
+    def _executar(self):
+        """Laço da thread de fundo"""
+        versao_anterior = None
+        while not self._parar.wait(self.intervalo):
+            versao_anterior = self.verificar(versao_anterior or '')
+
+    def iniciar(self):
+        """Inicia a thread de fundo (nada acontece se o intervalo for 0 ou ela já existir)"""
+        if self.intervalo <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, name='atualizacao-dados', daemon=True)
+        self._thread.start()
+
+    def parar(self, timeout=None):
+        """Interrompe a thread de fundo (a versão publicada continua disponível)"""
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
@@ -0,0 +1,537 @@
+"""
+Módulo com o backend SQL embutido (SQLite) para consultar o estoque sem carregá-lo inteiro
+"""
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from utils.busca import COLUNAS_BUSCA, MODO_CONTEM, IndiceBusca
+from utils.calculations import ResultadoKPIs
+from utils.catalogo import DIMENSOES_CATALOGO, CatalogoDados, CatalogoRecorte
+from utils.carga_em_blocos import TAMANHO_BLOCO_PADRAO, iterar_blocos_estoque
+from utils.cubo import MEDIDAS_CUBO
+from utils.data_loader import (
+    ESQUEMA_ESTOQUE,
+    ESQUEMA_PRODUTOS,
+    localizar_fontes,
+)
+from utils.filtros import STATUS_ABAIXO, STATUS_ADEQUADO, STATUS_TODOS
+from utils.series_temporais import COLUNAS_DESCRICAO
+from utils.snapshot import _fonte_inalterada, calcular_assinatura
+
+logger = logging.getLogger(__name__)
+
+BACKEND_PANDAS = 'pandas'
+BACKEND_SQLITE = 'sqlite'
+BACKENDS = (BACKEND_PANDAS, BACKEND_SQLITE)
+
+# Variável de ambiente que escolhe o backend do dashboard
+VARIAVEL_BACKEND = 'DASHBOARD_BACKEND'
+
+# Nome do banco, gravado na mesma pasta dos CSVs
+NOME_BANCO = '.fcd_estoque.sqlite'
+
+# Incrementar sempre que o formato das tabelas mudar
+VERSAO_BANCO = 1
+
+_FORMATO_DATA = '%Y-%m-%d %H:%M:%S'
+
+
+def obter_backend(padrao=BACKEND_PANDAS):
+    """
+    Retorna o backend configurado na variável de ambiente DASHBOARD_BACKEND
+    ('pandas' ou 'sqlite').
+
+    Args:
+        padrao (str): Backend usado quando a variável não está definida
+
+    Returns:
+        str: Nome do backend
+    """
+    backend = os.environ.get(VARIAVEL_BACKEND, padrao).strip().lower()
+    if backend not in BACKENDS:
+        logger.warning("Backend '%s' desconhecido; usando '%s'", backend, padrao)
+        return padrao
+    return backend
+
+
+def _texto_data(data):
+    """Converte uma data para o texto gravado na coluna data_referencia"""
+    return pd.Timestamp(data).strftime(_FORMATO_DATA)
+
+
+def _banco_valido(caminho_banco, fontes):
+    """Verifica se o banco existe e foi construído a partir das fontes atuais"""
+    if not os.path.exists(caminho_banco):
+        return False
+    try:
+        with closing(sqlite3.connect(caminho_banco)) as con:
+            linha = con.execute(
+                "SELECT valor FROM metadados WHERE chave = 'origem'"
+            ).fetchone()
+        info = json.loads(linha[0]) if linha else {}
+    except (sqlite3.Error, ValueError) as e:
+        logger.warning("Banco %s ignorado: %s", caminho_banco, e)
+        return False
+
+    if info.get('versao') != VERSAO_BANCO:
+        return False
+    assinaturas = info.get('fontes', [])
+    if len(assinaturas) != len(fontes):
+        return False
+    return all(_fonte_inalterada(f, a) for f, a in zip(fontes, assinaturas))
+
+
+def _gravar_banco(caminho_banco, caminho_produtos, caminhos_estoque, tamanho_bloco):
+    """
+    Grava o banco a partir dos CSVs. O estoque (um arquivo ou vários
+    fragmentos, na ordem informada) é inserido em blocos, então a memória
+    usada não depende do tamanho do histórico.
+    """
+    with closing(sqlite3.connect(caminho_banco)) as con:
+        df_produtos = pd.read_csv(caminho_produtos)
+        df_produtos.to_sql('produtos', con, index=False)
+
+        for bloco in iterar_blocos_estoque(caminhos_estoque, tamanho_bloco):
+            if 'data_referencia' in bloco.columns:
+                bloco['data_referencia'] = bloco['data_referencia'].dt.strftime(_FORMATO_DATA)
+            bloco.to_sql('estoque', con, index=False, if_exists='append')
+
+        colunas_estoque = [linha[1] for linha in con.execute("PRAGMA table_info(estoque)")]
+        con.execute("CREATE INDEX idx_produtos_id ON produtos (produto_id)")
+        con.execute("CREATE INDEX idx_estoque_produto ON estoque (produto_id)")
+        if 'data_referencia' in colunas_estoque:
+            con.execute("CREATE INDEX idx_estoque_data ON estoque (data_referencia)")
+
+        # Visão com o mesmo left join (e as mesmas colunas) de carregar_dados
+        selecao = [f'p."{c}"' for c in df_produtos.columns]
+        for coluna in colunas_estoque:
+            if coluna == 'produto_id':
+                continue
+            if coluna in ('quantidade_estoque', 'estoque_minimo'):
+                selecao.append(f'COALESCE(e."{coluna}", 0) AS "{coluna}"')
+            else:
+                selecao.append(f'e."{coluna}"')
+        con.execute(
+            "CREATE VIEW estoque_unificado AS SELECT "
+            "p.rowid AS _ordem_produto, e.rowid AS _ordem_estoque, "
+            + ", ".join(selecao)
+            + " FROM produtos p LEFT JOIN estoque e ON e.produto_id = p.produto_id"
+        )
+
+        info = {
+            'versao': VERSAO_BANCO,
+            'fontes': [calcular_assinatura(f) for f in [caminho_produtos] + caminhos_estoque],
+        }
+        con.execute("CREATE TABLE metadados (chave TEXT PRIMARY KEY, valor TEXT)")
+        con.execute("INSERT INTO metadados VALUES ('origem', ?)", (json.dumps(info),))
+        con.commit()
+
+
+def construir_banco(base_path='data', caminho_banco=None, tamanho_bloco=TAMANHO_BLOCO_PADRAO,
+                    estoque=None):
+    """
+    Constrói (ou reaproveita) o banco SQLite com as tabelas de produtos e
+    estoque e a visão estoque_unificado. O banco só é reconstruído quando os
+    CSVs de origem mudam (mesma assinatura usada pelo snapshot Parquet).
+
+    A gravação é atômica (arquivo temporário + rename). Se a pasta dos CSVs
+    for somente leitura, o banco é gravado na pasta temporária do sistema.
+
+    Args:
+        base_path (str): Caminho base onde estão os arquivos CSV
+        caminho_banco (str): Caminho do banco (padrão: ao lado dos CSVs)
+        tamanho_bloco (int): Linhas de estoque inseridas por bloco
+        estoque (str): Pasta ou padrão glob dos fragmentos de estoque (opcional)
+
+    Returns:
+        str: Caminho do banco
+    """
+    caminho_produtos, caminhos_estoque = localizar_fontes(base_path, estoque)
+    fontes = [caminho_produtos] + caminhos_estoque
+    if caminho_banco is None:
+        caminho_banco = os.path.join(os.path.dirname(os.path.abspath(caminho_produtos)), NOME_BANCO)
+
+    for destino in (caminho_banco, os.path.join(tempfile.gettempdir(), NOME_BANCO)):
+        if _banco_valido(destino, fontes):
+            return destino
+        caminho_tmp = f"{destino}.{os.getpid()}.tmp"
+        try:
+            if os.path.exists(caminho_tmp):
+                os.remove(caminho_tmp)
+            _gravar_banco(caminho_tmp, caminho_produtos, caminhos_estoque, tamanho_bloco)
+            os.replace(caminho_tmp, destino)
+            return destino
+        except (OSError, sqlite3.OperationalError) as e:
+            logger.warning("Não foi possível gravar o banco %s: %s", destino, e)
+            try:
+                if os.path.exists(caminho_tmp):
+                    os.remove(caminho_tmp)
+            except OSError:
+                pass
+    raise OSError("Não foi possível gravar o banco SQLite do estoque")
+
+
+def _tipar_resultado(df):
+    """Aplica ao resultado de uma consulta o mesmo esquema de carregar_dados"""
+    for coluna, tipo in {**ESQUEMA_PRODUTOS, **ESQUEMA_ESTOQUE}.items():
+        if coluna in df.columns:
+            df[coluna] = df[coluna].astype(tipo)
+    if 'data_referencia' in df.columns:
+        df['data_referencia'] = pd.to_datetime(df['data_referencia'], format=_FORMATO_DATA)
+    return df
+
+
+class BancoEstoque:
+    """
+    Acesso ao banco SQLite do estoque. As listas de valores dos filtros, os
+    indicadores e as agregações são calculados pelo próprio banco, e apenas
+    as linhas de resultado voltam para o Python, de modo que o histórico
+    inteiro nunca precisa caber em memória.
+
+    Os métodos espelham as funções de utils.data_loader (obter_*), com a data
+    de referência no lugar do DataFrame.
+
+    Args:
+        caminho_banco (str): Caminho retornado por construir_banco()
+    """
+
+    def __init__(self, caminho_banco):
+        self.caminho_banco = caminho_banco
+        self._indice_busca = None
+        self._total_linhas = None
+        self._catalogo = None
+
+    def _conectar(self):
+        """Abre uma conexão somente leitura (uma por consulta, segura entre threads)"""
+        return closing(sqlite3.connect(f"file:{self.caminho_banco}?mode=ro", uri=True))
+
+    def consultar(self, sql, parametros=()):
+        """
+        Executa uma consulta e retorna o resultado como DataFrame.
+
+        Args:
+            sql (str): Consulta SQL
+            parametros (tuple): Parâmetros da consulta
+
+        Returns:
+            pd.DataFrame: Resultado
+        """
+        with self._conectar() as con:
+            return pd.read_sql_query(sql, con, params=parametros)
+
+    def _valor(self, sql, parametros=()):
+        """Executa uma consulta que retorna uma única linha"""
+        with self._conectar() as con:
+            return con.execute(sql, parametros).fetchone()
+
+    @property
+    def colunas(self):
+        """Colunas da visão unificada (as mesmas do DataFrame de carregar_dados)"""
+        with self._conectar() as con:
+            colunas = [linha[1] for linha in con.execute("PRAGMA table_info(estoque_unificado)")]
+        return [c for c in colunas if not c.startswith('_ordem')]
+
+    def total_linhas(self):
+        """Retorna o total de linhas da visão unificada (contado uma única vez)"""
+        if self._total_linhas is None:
+            self._total_linhas = int(self._valor("SELECT COUNT(*) FROM estoque_unificado")[0])
+        return self._total_linhas
+
+    @property
+    def catalogo(self):
+        """
+        Catálogo com as opções dos filtros, os limites de preço e a contagem
+        de linhas do banco inteiro e de cada data, obtido uma única vez com
+        consultas agrupadas por data.
+        """
+        if self._catalogo is None:
+            self._catalogo = self._construir_catalogo()
+        return self._catalogo
+
+    def _construir_catalogo(self):
+        """Consulta no banco os metadados do catálogo (ver utils.catalogo)"""
+        colunas = set(self.colunas)
+        expr_data = "data_referencia" if 'data_referencia' in colunas else "NULL"
+
+        # Pares (data, valor) distintos de cada dimensão; o conjunto inteiro é
+        # a união dos valores de todas as datas (e das linhas sem data)
+        geral = {}
+        por_data = {}
+        for coluna in DIMENSOES_CATALOGO:
+            if coluna not in colunas:
+                geral[coluna], por_data[coluna] = (), {}
+                continue
+            pares = self.consultar(
+                f'SELECT DISTINCT {expr_data} AS data, "{coluna}" AS valor '
+                f'FROM estoque_unificado WHERE "{coluna}" IS NOT NULL'
+            )
+            geral[coluna] = tuple(sorted(set(pares['valor'].tolist())))
+            por_data[coluna] = {
+                data: tuple(sorted(grupo.tolist()))
+                for data, grupo in pares.groupby('data')['valor']
+            }
+
+        totais = self.consultar(
+            f"SELECT {expr_data} AS data, COUNT(*) AS n_linhas, "
+            "MIN(preco_unitario) AS preco_min, MAX(preco_unitario) AS preco_max "
+            f"FROM estoque_unificado GROUP BY {expr_data}"
+        )
+
+        def recorte(valores, n_linhas, preco_min, preco_max):
+            return CatalogoRecorte(
+                categorias=valores['categoria'],
+                marcas=valores['marca'],
+                localizacoes=valores['localizacao'],
+                preco_min=None if pd.isna(preco_min) else float(preco_min),
+                preco_max=None if pd.isna(preco_max) else float(preco_max),
+                n_linhas=int(n_linhas),
+            )
+
+        recortes = {}
+        for linha in totais.dropna(subset=['data']).itertuples(index=False):
+            valores = {coluna: por_data[coluna].get(linha.data, ()) for coluna in DIMENSOES_CATALOGO}
+            recortes[pd.to_datetime(linha.data, format=_FORMATO_DATA)] = recorte(
+                valores, linha.n_linhas, linha.preco_min, linha.preco_max
+            )
+        catalogo_geral = recorte(
+            geral, totais['n_linhas'].sum(), totais['preco_min'].min(), totais['preco_max'].max()
+        )
+        return CatalogoDados(catalogo_geral, recortes)
+
+    def obter_datas_referencia(self):
+        """
+        Retorna lista de datas de referência únicas ordenadas.
+
+        Returns:
+            list: Lista de datas (pd.Timestamp)
+        """
+        return list(self.catalogo.datas)
+
+    def obter_categorias(self, data=None):
+        """Retorna lista de categorias únicas ordenadas (na data, se informada)"""
+        return list(self.catalogo.recorte(data).categorias)
+
+    def obter_marcas(self, data=None):
+        """Retorna lista de marcas únicas ordenadas (na data, se informada)"""
+        return list(self.catalogo.recorte(data).marcas)
+
+    def obter_localizacoes(self, data=None):
+        """Retorna lista de localizações únicas ordenadas (na data, se informada)"""
+        return list(self.catalogo.recorte(data).localizacoes)
+
+    @property
+    def indice_busca(self):
+        """Índice de trigramas sobre os nomes e SKUs do cadastro de produtos"""
+        if self._indice_busca is None:
+            valores_por_coluna = {
+                coluna: self.consultar(
+                    f'SELECT DISTINCT "{coluna}" AS valor FROM produtos WHERE "{coluna}" IS NOT NULL'
+                )['valor'].tolist()
+                for coluna in COLUNAS_BUSCA
+            }
+            self._indice_busca = IndiceBusca(valores_por_coluna)
+        return self._indice_busca
+
+    def motor_filtros(self, data=None):
+        """Retorna o motor de filtros SQL de uma data de referência"""
+        return MotorFiltrosSQL(self, data)
+
+
+class MotorFiltrosSQL:
+    """
+    Equivalente SQL do MotorFiltros: os filtros da sidebar viram a cláusula
+    WHERE de consultas sobre a visão estoque_unificado. aplicar() tem a mesma
+    assinatura e retorna as mesmas linhas (na mesma ordem) que o motor em
+    pandas; calcular_kpis() e agregar() devolvem só o resultado agregado.
+
+    Listas de valores são passadas como um único parâmetro JSON (json_each),
+    sem limite de variáveis por consulta. A busca por nome/SKU usa o mesmo
+    índice de trigramas do backend pandas, construído sobre o cadastro de
+    produtos, e os valores encontrados entram no WHERE.
+
+    Args:
+        banco (BancoEstoque): Banco consultado
+        data: Data de referência (None = todas as datas)
+    """
+
+    def __init__(self, banco, data=None):
+        self.banco = banco
+        self.data = data
+
+    def limites_preco(self, padrao=(0.0, 1000.0)):
+        """
+        Retorna o menor e o maior preço unitário da data.
+
+        Args:
+            padrao (tuple): Limites usados quando não há preços
+
+        Returns:
+            tuple: (preço mínimo, preço máximo)
+        """
+        onde, parametros = self._where()
+        minimo, maximo = self.banco._valor(
+            f"SELECT MIN(preco_unitario), MAX(preco_unitario) FROM estoque_unificado {onde}",
+            parametros
+        )
+        if minimo is None:
+            return padrao
+        return float(minimo), float(maximo)
+
+    def _where(self, categorias=None, marcas=None, localizacoes=None, status=STATUS_TODOS,
+               faixa_preco=None, busca=None, modo_busca=MODO_CONTEM):
+        """Monta a cláusula WHERE (e os parâmetros) dos filtros ativos"""
+        condicoes = []
+        parametros = []
+        if self.data is not None:
+            condicoes.append("data_referencia = ?")
+            parametros.append(_texto_data(self.data))
+
+        for coluna, valores in (('categoria', categorias), ('marca', marcas),
+                                ('localizacao', localizacoes)):
+            if valores:
+                condicoes.append(f"{coluna} IN (SELECT value FROM json_each(?))")
+                parametros.append(json.dumps([str(v) for v in valores]))
+
+        if status == STATUS_ABAIXO:
+            condicoes.append("quantidade_estoque < estoque_minimo")
+        elif status == STATUS_ADEQUADO:
+            condicoes.append("quantidade_estoque >= estoque_minimo")
+
+        if faixa_preco is not None:
+            condicoes.append("preco_unitario BETWEEN ? AND ?")
+            parametros.extend(float(v) for v in faixa_preco)
+
+        if busca and busca.strip():
+            encontrados = self.banco.indice_busca.buscar(busca, modo_busca)
+            alternativas = []
+            for coluna, valores in encontrados.items():
+                alternativas.append(f"{coluna} IN (SELECT value FROM json_each(?))")
+                parametros.append(json.dumps([str(v) for v in valores]))
+            condicoes.append("(" + " OR ".join(alternativas) + ")" if alternativas else "0")
+
+        onde = "WHERE " + " AND ".join(condicoes) if condicoes else ""
+        return onde, tuple(parametros)
+
+    def consultar_historico(self, inicio=None, fim=None, **filtros):
+        """
+        Retorna o estoque de cada (produto, localização, data), agregado no
+        banco, no formato esperado por utils.series_temporais.construir_serie().
+        Só entram as chaves (produto, localização) que atendem aos filtros na
+        data do motor e as datas entre `inicio` e `fim`, de modo que o
+        histórico inteiro nunca volta para o Python.
+
+        Args:
+            inicio: Primeira data do histórico (None = sem limite)
+            fim: Última data do histórico (None = sem limite)
+            **filtros: Mesmos argumentos de aplicar()
+
+        Returns:
+            pd.DataFrame: Uma linha por produto, localização e data
+        """
+        onde, parametros = self._where(**filtros)
+        condicoes = ["h.data_referencia IS NOT NULL"]
+        if inicio is not None:
+            condicoes.append("h.data_referencia >= ?")
+            parametros += (_texto_data(inicio),)
+        if fim is not None:
+            condicoes.append("h.data_referencia <= ?")
+            parametros += (_texto_data(fim),)
+        colunas = set(self.banco.colunas)
+        descricao = "".join(
+            f', MIN(h."{coluna}") AS "{coluna}"'
+            for coluna in COLUNAS_DESCRICAO if coluna in colunas
+        )
+        df = self.banco.consultar(
+            "WITH chaves AS (SELECT DISTINCT produto_id, localizacao "
+            f"FROM estoque_unificado {onde}) "
+            "SELECT h.produto_id, h.localizacao, h.data_referencia, "
+            "SUM(h.quantidade_estoque) AS quantidade_estoque, "
+            f"AVG(h.estoque_minimo) AS estoque_minimo{descricao} "
+            "FROM estoque_unificado h JOIN chaves c "
+            "ON h.produto_id = c.produto_id AND h.localizacao IS c.localizacao "
+            f"WHERE {' AND '.join(condicoes)} "
+            "GROUP BY h.produto_id, h.localizacao, h.data_referencia",
+            parametros
+        )
+        return _tipar_resultado(df)
+
+    def aplicar(self, **filtros):
+        """
+        Retorna o DataFrame com as linhas que atendem aos filtros (mesmos
+        argumentos de MotorFiltros.filtrar()).
+
+        Returns:
+            pd.DataFrame: DataFrame filtrado
+        """
+        onde, parametros = self._where(**filtros)
+        df = self.banco.consultar(
+            f"SELECT * FROM estoque_unificado {onde} ORDER BY _ordem_produto, _ordem_estoque",
+            parametros
+        )
+        return _tipar_resultado(df.drop(columns=['_ordem_produto', '_ordem_estoque']))
+
+    def calcular_kpis(self, **filtros):
+        """
+        Calcula no banco os mesmos indicadores de calcular_kpis(). Como as
+        linhas não voltam para o Python, mascara_abaixo é None.
+
+        Returns:
+            ResultadoKPIs: Indicadores calculados
+        """
+        onde, parametros = self._where(**filtros)
+        custo = (
+            "COALESCE(custo_unitario, preco_unitario)"
+            if 'custo_unitario' in self.banco.colunas else "preco_unitario"
+        )
+        linhas, abaixo, unicos, valor, deficit, reposicao = self.banco._valor(
+            "SELECT COUNT(*), "
+            "COALESCE(SUM(quantidade_estoque < estoque_minimo), 0), "
+            "COUNT(DISTINCT produto_id), "
+            "COALESCE(SUM(quantidade_estoque * preco_unitario), 0), "
+            "COALESCE(SUM(MAX(estoque_minimo - quantidade_estoque, 0)), 0), "
+            f"COALESCE(SUM(MAX(estoque_minimo - quantidade_estoque, 0) * {custo}), 0) "
+            f"FROM estoque_unificado {onde}",
+            parametros
+        )
+        return ResultadoKPIs(
+            mascara_abaixo=None,
+            produtos_abaixo_minimo=int(abaixo),
+            total_linhas=int(linhas),
+            total_produtos_unicos=int(unicos),
+            valor_total=round(float(valor), 2),
+            percentual_alerta=(abaixo / linhas * 100) if linhas > 0 else 0,
+            deficit_total=int(deficit),
+            valor_reposicao=float(reposicao),
+        )
+
+    def agregar(self, por, **filtros):
+        """
+        Agrega no banco as medidas de CuboEstoque.agregar() por uma dimensão.
+
+        Args:
+            por (str): Coluna de agrupamento (ex.: 'categoria', 'localizacao')
+
+        Returns:
+            pd.DataFrame: Medidas agregadas, indexadas pela coluna de agrupamento
+        """
+        onde, parametros = self._where(**filtros)
+        nao_nulo = f'"{por}" IS NOT NULL'
+        onde = f"{onde} AND {nao_nulo}" if onde else f"WHERE {nao_nulo}"
+        df = self.banco.consultar(
+            f'SELECT "{por}", COUNT(*) AS n_linhas, '
+            "SUM(quantidade_estoque) AS quantidade_estoque, "
+            "SUM(estoque_minimo) AS estoque_minimo, "
+            "TOTAL(quantidade_estoque * preco_unitario) AS valor_total, "
+            "SUM(MAX(estoque_minimo - quantidade_estoque, 0)) AS deficit "
+            f'FROM estoque_unificado {onde} GROUP BY "{por}" ORDER BY "{por}"',
+            parametros
+        )
+        df = df.set_index(por)[MEDIDAS_CUBO]
+        return df.astype({c: np.int64 for c in MEDIDAS_CUBO if c != 'valor_total'})
@@ -0,0 +1,171 @@
+"""
+Módulo com o índice de trigramas para a busca por nome/SKU de produto
+"""
+import math
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+MODO_CONTEM = 'contem'
+MODO_PREFIXO = 'prefixo'
+MODO_APROXIMADO = 'aproximado'
+
+COLUNAS_BUSCA = ['produto_nome', 'sku']
+
+# Fração mínima dos trigramas do termo que precisa aparecer no texto (modo aproximado)
+LIMIAR_APROXIMADO = 0.6
+
+
+def normalizar_texto(texto):
+    """
+    Normaliza um texto para busca: remove acentos, ignora maiúsculas/minúsculas
+    e colapsa espaços repetidos.
+
+    Args:
+        texto (str): Texto original
+
+    Returns:
+        str: Texto normalizado
+    """
+    decomposto = unicodedata.normalize('NFKD', str(texto))
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return ' '.join(sem_acentos.casefold().split())
+
+
+def _trigramas(texto):
+    """Retorna o conjunto de trigramas de um texto já normalizado"""
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def _trigramas_com_bordas(texto):
+    """
+    Trigramas do texto com um espaço em cada extremidade, para que início e
+    fim de palavra também gerem trigramas (usado na indexação e no modo
+    aproximado).
+    """
+    return _trigramas(f" {texto} ")
+
+
+class IndiceBusca:
+    """
+    Índice invertido de trigramas sobre os valores distintos de produto_nome e
+    sku. O índice é construído uma vez por carga de dados e a busca custa em
+    função do número de candidatos (textos que compartilham os trigramas do
+    termo), e não do tamanho do catálogo. O termo é tratado como texto
+    literal, nunca como expressão regular.
+
+    Args:
+        valores_por_coluna (dict): Mapeamento coluna -> valores distintos
+    """
+
+    def __init__(self, valores_por_coluna):
+        self.valores = []
+        self.colunas = []
+        textos = []
+        for coluna, valores in valores_por_coluna.items():
+            for valor in valores:
+                if pd.isna(valor):
+                    continue
+                self.valores.append(valor)
+                self.colunas.append(coluna)
+                textos.append(normalizar_texto(valor))
+        self.textos = textos
+
+        postings = {}
+        for doc_id, texto in enumerate(textos):
+            for trigrama in _trigramas_com_bordas(texto):
+                postings.setdefault(trigrama, []).append(doc_id)
+        self.postings = {
+            trigrama: np.array(ids, dtype=np.int32)
+            for trigrama, ids in postings.items()
+        }
+
+    @classmethod
+    def de_dataframe(cls, df, colunas=None):
+        """
+        Constrói o índice a partir das colunas de busca de um DataFrame.
+
+        Args:
+            df (pd.DataFrame): DataFrame com dados de produtos
+            colunas (list): Colunas indexadas (padrão: produto_nome e sku)
+
+        Returns:
+            IndiceBusca: Índice construído
+        """
+        valores_por_coluna = {}
+        for coluna in colunas or COLUNAS_BUSCA:
+            if coluna not in df.columns:
+                continue
+            serie = df[coluna]
+            if isinstance(serie.dtype, pd.CategoricalDtype):
+                valores_por_coluna[coluna] = list(serie.cat.categories)
+            else:
+                valores_por_coluna[coluna] = list(pd.unique(serie.dropna()))
+        return cls(valores_por_coluna)
+
+    def _candidatos_contem(self, termo):
+        """Documentos que podem conter o termo (superconjunto, sem verificação)"""
+        if len(termo) >= 3:
+            listas = []
+            for trigrama in _trigramas(termo):
+                lista = self.postings.get(trigrama)
+                if lista is None:
+                    return np.empty(0, dtype=np.int32)
+                listas.append(lista)
+            # Interseção começando pela lista mais curta
+            listas.sort(key=len)
+            candidatos = listas[0]
+            for lista in listas[1:]:
+                candidatos = np.intersect1d(candidatos, lista, assume_unique=True)
+                if len(candidatos) == 0:
+                    break
+            return candidatos
+
+        # Termo curto: como os textos são indexados com bordas, todo texto que
+        # contém o termo tem algum trigrama que o contém
+        listas = [lista for trigrama, lista in self.postings.items() if termo in trigrama]
+        if not listas:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate(listas))
+
+    def _candidatos_aproximado(self, termo):
+        """Documentos que compartilham ao menos LIMIAR_APROXIMADO dos trigramas do termo"""
+        trigramas = _trigramas_com_bordas(termo)
+        listas = [self.postings[t] for t in trigramas if t in self.postings]
+        if not listas:
+            return np.empty(0, dtype=np.int32)
+        ids, contagens = np.unique(np.concatenate(listas), return_counts=True)
+        minimo = max(1, math.ceil(LIMIAR_APROXIMADO * len(trigramas)))
+        return ids[contagens >= minimo]
+
+    def buscar(self, termo, modo=MODO_CONTEM):
+        """
+        Busca o termo nos textos indexados.
+
+        Args:
+            termo (str): Texto buscado (literal)
+            modo (str): 'contem' (substring), 'prefixo' (início de alguma
+                palavra) ou 'aproximado' (similaridade por trigramas)
+
+        Returns:
+            dict: Mapeamento coluna -> lista de valores encontrados
+        """
+        termo = normalizar_texto(termo)
+        resultado = {}
+        if not termo:
+            return resultado
+
+        if modo == MODO_APROXIMADO:
+            encontrados = self._candidatos_aproximado(termo)
+        else:
+            candidatos = self._candidatos_contem(termo)
+            if modo == MODO_PREFIXO:
+                chave = ' ' + termo
+                encontrados = [i for i in candidatos if chave in ' ' + self.textos[i]]
+            else:
+                encontrados = [i for i in candidatos if termo in self.textos[i]]
+
+        for doc_id in encontrados:
+            resultado.setdefault(self.colunas[doc_id], []).append(self.valores[doc_id])
+        return resultado
@@ -1,6 +1,9 @@
 """
 Módulo para cálculos e métricas do estoque
 """
+from dataclasses import dataclass
+
+import numpy as np
 import pandas as pd
 
 
@@ -60,3 +63,292 @@ def identificar_produtos_abaixo_minimo(df):
     return produtos_abaixo
 
 
+@dataclass
+class ResultadoKPIs:
+    """
+    Conjunto de indicadores calculados por calcular_kpis().
+
+    Attributes:
+        mascara_abaixo (np.ndarray): Máscara booleana das linhas abaixo do mínimo
+        produtos_abaixo_minimo (int): Quantidade de linhas abaixo do mínimo
+        total_linhas (int): Quantidade de linhas consideradas
+        total_produtos_unicos (int): Quantidade de produto_id distintos
+        valor_total (float): Valor total do estoque (quantidade × preço unitário)
+        percentual_alerta (float): Percentual de linhas abaixo do mínimo
+        deficit_total (int): Soma de (mínimo - quantidade) das linhas em alerta
+        valor_reposicao (float): Déficit valorizado pelo custo unitário (ou
+            pelo preço unitário, quando não há custo)
+    """
+    mascara_abaixo: np.ndarray
+    produtos_abaixo_minimo: int
+    total_linhas: int
+    total_produtos_unicos: int
+    valor_total: float
+    percentual_alerta: float
+    deficit_total: int
+    valor_reposicao: float
+
+
+def _custo_reposicao(df, preco):
+    """Custo unitário de cada linha, usando o preço quando o custo não existe"""
+    if 'custo_unitario' not in df.columns:
+        return preco
+    custo = df['custo_unitario'].to_numpy(dtype=np.float64)
+    return np.where(np.isnan(custo), preco, custo)
+
+
+def calcular_kpis(df):
+    """
+    Calcula todos os indicadores principais em uma única passada vetorizada
+    sobre as colunas, sem criar DataFrames intermediários.
+    
+    O valor total equivale ao de calcular_valor_total_estoque(): como o preço
+    unitário vem do cadastro de produtos, ele é único por produto_id, e somar
+    quantidade × preço linha a linha dá o mesmo resultado que agrupar por
+    produto antes.
+    
+    Args:
+        df (pd.DataFrame): DataFrame com dados de produtos e estoque
+        
+    Returns:
+        ResultadoKPIs: Indicadores calculados
+    """
+    quantidade = df['quantidade_estoque'].to_numpy(dtype=np.int64)
+    minimo = df['estoque_minimo'].to_numpy(dtype=np.int64)
+    preco = df['preco_unitario'].to_numpy(dtype=np.float64)
+    
+    custo = _custo_reposicao(df, preco)
+    
+    diferenca = minimo - quantidade
+    mascara_abaixo = diferenca > 0
+    deficit = np.where(mascara_abaixo, diferenca, 0)
+    
+    total_linhas = len(quantidade)
+    produtos_abaixo = int(np.count_nonzero(mascara_abaixo))
+    
+    if 'produto_id' in df.columns:
+        total_produtos_unicos = len(pd.unique(df['produto_id'].to_numpy()))
+    else:
+        total_produtos_unicos = total_linhas
+    
+    return ResultadoKPIs(
+        mascara_abaixo=mascara_abaixo,
+        produtos_abaixo_minimo=produtos_abaixo,
+        total_linhas=total_linhas,
+        total_produtos_unicos=total_produtos_unicos,
+        valor_total=round(float(np.nansum(quantidade * preco)), 2),
+        percentual_alerta=(produtos_abaixo / total_linhas * 100) if total_linhas > 0 else 0,
+        deficit_total=int(deficit.sum()),
+        valor_reposicao=float(np.nansum(deficit * custo)),
+    )
+
+
+def selecionar_mais_criticos(df, n=30):
+    """
+    Retorna as posições dos N produtos mais críticos, na mesma ordem de
+    ordem_criticidade() (abaixo do mínimo primeiro, depois pela diferença
+    quantidade - mínimo crescente), sem ordenar o DataFrame inteiro.
+    
+    Como uma linha está abaixo do mínimo exatamente quando a diferença é
+    negativa, a criticidade se resume à diferença. A seleção usa partição
+    parcial (np.partition) em O(n) e só os N escolhidos são ordenados.
+    Empates no limite são resolvidos pela posição da linha, como numa
+    ordenação estável.
+    
+    Args:
+        df (pd.DataFrame): DataFrame com quantidade_estoque e estoque_minimo
+        n (int): Quantidade de produtos desejada
+        
+    Returns:
+        np.ndarray: Posições dos N produtos mais críticos, já ordenadas
+    """
+    diferenca = (
+        df['quantidade_estoque'].to_numpy(dtype=np.int64)
+        - df['estoque_minimo'].to_numpy(dtype=np.int64)
+    )
+    total = len(diferenca)
+    if n <= 0 or total == 0:
+        return np.empty(0, dtype=np.int64)
+    
+    if n >= total:
+        selecionadas = np.arange(total)
+    else:
+        limite = np.partition(diferenca, n - 1)[n - 1]
+        menores = np.flatnonzero(diferenca < limite)
+        empatadas = np.flatnonzero(diferenca == limite)[:n - len(menores)]
+        selecionadas = np.concatenate((menores, empatadas))
+    
+    # Ordenar apenas os selecionados por diferença e, no empate, por posição
+    ordem = np.lexsort((selecionadas, diferenca[selecionadas]))
+    return selecionadas[ordem]
+
+
+@dataclass
+class PlanoReposicao:
+    """
+    Resultado de planejar_reposicao().
+
+    Attributes:
+        itens (pd.DataFrame): Uma linha por produto × localização, na ordem
+            das linhas recebidas, com consumo, ponto de pedido, nível alvo,
+            transferências e quantidade a comprar
+        transferencias (pd.DataFrame): Sugestões de transferência entre
+            localizações do mesmo produto (origem, destino, quantidade, valor)
+        quantidade_pedido (int): Total de unidades a comprar
+        valor_pedido (float): Compra valorizada pelo custo unitário
+        quantidade_transferida (int): Total de unidades transferidas
+        valor_transferido (float): Compra evitada pelas transferências
+    """
+    itens: pd.DataFrame
+    transferencias: pd.DataFrame
+    quantidade_pedido: int
+    valor_pedido: float
+    quantidade_transferida: int
+    valor_transferido: float
+
+
+def _casar_transferencias(grupo, excedente, necessidade):
+    """
+    Casa, dentro de cada grupo (produto), as sobras das origens com as
+    necessidades dos destinos, na ordem das linhas, sem laço por produto.
+
+    As sobras de cada grupo são enfileiradas em um intervalo contínuo de
+    uma reta numérica, e as necessidades em outro intervalo começando no
+    mesmo ponto (cada grupo recebe um trecho próprio da reta). Cada trecho
+    em que um intervalo de origem e um de destino se sobrepõem vira uma
+    transferência com o tamanho da sobreposição.
+
+    Returns:
+        tuple: (posições de origem, posições de destino, quantidades)
+    """
+    vazio = np.empty(0, dtype=np.int64)
+    origens = np.flatnonzero(excedente > 0)
+    destinos = np.flatnonzero(necessidade > 0)
+    if len(origens) == 0 or len(destinos) == 0:
+        return vazio, vazio, vazio
+
+    n_grupos = int(grupo.max()) + 1
+    total_excedente = np.bincount(grupo[origens], weights=excedente[origens], minlength=n_grupos)
+    total_necessidade = np.bincount(grupo[destinos], weights=necessidade[destinos], minlength=n_grupos)
+    # Início do trecho de cada grupo: espaço para a maior das duas filas
+    base = np.concatenate(([0], np.cumsum(np.maximum(total_excedente, total_necessidade))[:-1]))
+
+    def intervalos(posicoes, valores):
+        # Linhas ordenadas por grupo (estável: mantém a ordem das linhas)
+        posicoes = posicoes[np.argsort(grupo[posicoes], kind='stable')]
+        fim = np.cumsum(valores[posicoes])
+        inicio_grupo = np.concatenate(([True], grupo[posicoes][1:] != grupo[posicoes][:-1]))
+        deslocamento = np.maximum.accumulate(np.where(inicio_grupo, fim - valores[posicoes], 0))
+        fim = fim - deslocamento + base[grupo[posicoes]]
+        return posicoes, fim - valores[posicoes], fim
+
+    origens, inicio_o, fim_o = intervalos(origens, excedente)
+    destinos, inicio_d, fim_d = intervalos(destinos, necessidade)
+
+    # Trechos elementares entre todas as extremidades
+    pontos = np.unique(np.concatenate((inicio_o, fim_o, inicio_d, fim_d)))
+    inicio, fim = pontos[:-1], pontos[1:]
+    i_o = np.searchsorted(fim_o, inicio, side='right')
+    i_d = np.searchsorted(fim_d, inicio, side='right')
+    cobertos = (i_o < len(fim_o)) & (i_d < len(fim_d))
+    i_o, i_d = np.minimum(i_o, len(fim_o) - 1), np.minimum(i_d, len(fim_d) - 1)
+    cobertos &= (inicio_o[i_o] <= inicio) & (inicio_d[i_d] <= inicio)
+
+    # Cada par origem/destino se sobrepõe em um único trecho contínuo; como
+    # as extremidades são apenas desses intervalos, cada trecho é um par
+    return origens[i_o[cobertos]], destinos[i_d[cobertos]], (fim - inicio)[cobertos].astype(np.int64)
+
+
+def planejar_reposicao(df, velocidade, cobertura_alvo=30, prazo_entrega=7, transferir=True):
+    """
+    Calcula, em uma única passada vetorizada (NumPy), o plano de reposição
+    de todos os produtos × localizações recebidos.
+
+    Para cada linha, com o consumo diário histórico v (ver
+    SerieEstoque.velocidade_consumo) e o estoque mínimo como estoque de
+    segurança:
+
+    - ponto de pedido = estoque mínimo + v × prazo de entrega
+    - nível alvo = estoque mínimo + v × (prazo de entrega + cobertura alvo)
+    - necessidade = nível alvo - quantidade, quando a quantidade está no
+      ponto de pedido ou abaixo dele (arredondada para cima)
+
+    Com transferir=True, as localizações com sobra (quantidade acima do
+    próprio nível alvo) cedem unidades às localizações do mesmo produto que
+    precisam de reposição, e só o restante vira compra. A compra e a
+    transferência são valorizadas pelo custo unitário (ou pelo preço, se não
+    houver custo).
+
+    Args:
+        df (pd.DataFrame): Linhas com produto_id, localizacao, quantidade_estoque,
+            estoque_minimo e custo_unitario/preco_unitario (uma por produto × localização)
+        velocidade (np.ndarray): Consumo diário de cada linha (NaN = sem histórico, tratado como 0)
+        cobertura_alvo (float): Dias de consumo que a reposição deve cobrir
+        prazo_entrega (float): Dias entre o pedido e a chegada da mercadoria
+        transferir (bool): Se True, sugere transferências entre localizações
+
+    Returns:
+        PlanoReposicao: Plano calculado
+    """
+    quantidade = df['quantidade_estoque'].to_numpy(dtype=np.float64)
+    minimo = df['estoque_minimo'].to_numpy(dtype=np.float64)
+    custo = _custo_reposicao(df, df['preco_unitario'].to_numpy(dtype=np.float64))
+    velocidade = np.nan_to_num(np.asarray(velocidade, dtype=np.float64), nan=0.0)
+    quantidade_valida = np.nan_to_num(quantidade, nan=0.0)
+    minimo = np.nan_to_num(minimo, nan=0.0)
+
+    ponto_pedido = minimo + velocidade * prazo_entrega
+    nivel_alvo = np.ceil(minimo + velocidade * (prazo_entrega + cobertura_alvo))
+    repor = quantidade_valida <= ponto_pedido
+    necessidade = np.where(repor, np.maximum(nivel_alvo - quantidade_valida, 0), 0).astype(np.int64)
+    excedente = np.where(repor, 0, np.maximum(np.floor(quantidade_valida - nivel_alvo), 0)).astype(np.int64)
+
+    produtos = df['produto_id'].to_numpy()
+    # Mantém o tipo original (categórico) das localizações, sem converter para texto
+    localizacoes = df['localizacao'].array
+    recebido = np.zeros(len(df), dtype=np.int64)
+    if transferir and len(df):
+        grupo = pd.factorize(produtos)[0]
+        origem, destino, transferido = _casar_transferencias(grupo, excedente, necessidade)
+        recebido = np.bincount(destino, weights=transferido, minlength=len(df)).astype(np.int64)
+        cedido = np.bincount(origem, weights=transferido, minlength=len(df)).astype(np.int64)
+    else:
+        origem = destino = transferido = np.empty(0, dtype=np.int64)
+        cedido = np.zeros(len(df), dtype=np.int64)
+
+    pedido = necessidade - recebido
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cobertura = np.where(velocidade > 0, quantidade_valida / velocidade, np.inf)
+
+    itens = pd.DataFrame({
+        'produto_id': produtos,
+        'localizacao': localizacoes,
+        'quantidade_estoque': quantidade,
+        'estoque_minimo': minimo,
+        'velocidade_dia': velocidade,
+        'dias_cobertura': cobertura,
+        'ponto_pedido': ponto_pedido,
+        'nivel_alvo': nivel_alvo,
+        'necessidade': necessidade,
+        'recebido_transferencia': recebido,
+        'cedido_transferencia': cedido,
+        'quantidade_pedido': pedido,
+        'custo_unitario': custo,
+        'custo_pedido': pedido * custo,
+    })
+    transferencias = pd.DataFrame({
+        'produto_id': produtos[origem],
+        'origem': localizacoes.take(origem),
+        'destino': localizacoes.take(destino),
+        'quantidade': transferido,
+        'valor': transferido * custo[destino],
+    })
+
+    return PlanoReposicao(
+        itens=itens,
+        transferencias=transferencias,
+        quantidade_pedido=int(pedido.sum()),
+        valor_pedido=float(np.nansum(pedido * custo)),
+        quantidade_transferida=int(transferido.sum()),
+        valor_transferido=float(np.nansum(transferido * custo[destino])),
+    )
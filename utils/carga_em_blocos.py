@@ -0,0 +1,183 @@
+"""
+Módulo para ingestão do estoque em blocos, com memória limitada pelo tamanho do bloco
+
+No dashboard, o único caminho com memória limitada é o backend SQLite
+(DASHBOARD_BACKEND=sqlite), cujo banco é gravado com iterar_blocos_estoque().
+O backend pandas (padrão) continua lendo o estoque inteiro em carregar_dados();
+agregar_em_blocos() e gravar_particoes_em_blocos() servem a scripts e cargas
+em lote fora do dashboard.
+"""
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.cubo import CuboEstoque, calcular_celulas, combinar_celulas
+from utils.data_loader import (
+    ESQUEMA_ESTOQUE,
+    ler_produtos,
+    localizar_fontes,
+    tipar_estoque,
+    unir_produtos_estoque,
+)
+
+# Linhas do CSV de estoque lidas por bloco
+TAMANHO_BLOCO_PADRAO = 500_000
+
+# Quantidade de partes de células acumuladas antes de uma redução intermediária
+_PARTES_POR_REDUCAO = 16
+
+# Localização lida como texto: categorias por bloco não seriam compatíveis
+_ESQUEMA_BLOCO = {coluna: 'str' for coluna in ESQUEMA_ESTOQUE}
+
+
+def iterar_blocos_estoque(caminhos_estoque, tamanho_bloco=TAMANHO_BLOCO_PADRAO):
+    """
+    Lê os CSVs de estoque (um arquivo ou vários fragmentos, na ordem
+    informada) em blocos de no máximo tamanho_bloco linhas, com a data já
+    convertida.
+
+    Args:
+        caminhos_estoque (list): Caminhos dos CSVs de estoque
+        tamanho_bloco (int): Linhas de estoque por bloco
+
+    Yields:
+        pd.DataFrame: Bloco de estoque
+    """
+    for caminho_estoque in caminhos_estoque:
+        for bloco in pd.read_csv(caminho_estoque, dtype=_ESQUEMA_BLOCO, chunksize=tamanho_bloco):
+            yield tipar_estoque(bloco)
+
+
+def iterar_blocos_unidos(base_path='data', tamanho_bloco=TAMANHO_BLOCO_PADRAO, estoque=None):
+    """
+    Lê o estoque em blocos e faz o join de cada bloco com a dimensão de
+    produtos (lida uma única vez, por ser pequena). Produtos que não
+    aparecem em nenhum bloco são emitidos no final com quantidade e mínimo
+    zerados, como no left join de carregar_dados().
+
+    Args:
+        base_path (str): Caminho base onde estão os arquivos CSV
+        tamanho_bloco (int): Linhas de estoque por bloco
+        estoque (str): Pasta ou padrão glob dos fragmentos de estoque (opcional)
+
+    Yields:
+        pd.DataFrame: Bloco unificado de produtos e estoque
+    """
+    caminho_produtos, caminhos_estoque = localizar_fontes(base_path, estoque)
+    df_produtos = ler_produtos(caminho_produtos)
+    ids_vistos = np.zeros(0, dtype=df_produtos['produto_id'].dtype)
+
+    for bloco in iterar_blocos_estoque(caminhos_estoque, tamanho_bloco):
+        ids_vistos = np.union1d(ids_vistos, bloco['produto_id'].unique())
+        yield unir_produtos_estoque(df_produtos, bloco, how='inner')
+
+    sem_estoque = df_produtos[~df_produtos['produto_id'].isin(ids_vistos)]
+    if not sem_estoque.empty and caminhos_estoque:
+        colunas_estoque = pd.read_csv(caminhos_estoque[0], nrows=0).columns
+        vazio = tipar_estoque(pd.DataFrame({c: pd.Series(dtype='float64') for c in colunas_estoque}))
+        vazio['produto_id'] = vazio['produto_id'].astype(df_produtos['produto_id'].dtype)
+        yield unir_produtos_estoque(sem_estoque, vazio, how='left')
+
+
+def agregar_em_blocos(base_path='data', tamanho_bloco=TAMANHO_BLOCO_PADRAO, estoque=None):
+    """
+    Reduz o estoque, bloco a bloco, direto nas células do cubo de agregados
+    (data × categoria × marca × localização × status). Nunca mantém mais de
+    um bloco de linhas em memória; as células parciais são somadas
+    periodicamente, então a memória depende do número de células.
+
+    Args:
+        base_path (str): Caminho base onde estão os arquivos CSV
+        tamanho_bloco (int): Linhas de estoque por bloco
+        estoque (str): Pasta ou padrão glob dos fragmentos de estoque (opcional)
+
+    Returns:
+        CuboEstoque: Cubo construído a partir das células agregadas
+    """
+    partes = []
+    for bloco in iterar_blocos_unidos(base_path, tamanho_bloco, estoque):
+        partes.append(calcular_celulas(bloco))
+        if len(partes) >= _PARTES_POR_REDUCAO:
+            partes = [combinar_celulas(partes)]
+
+    celulas = combinar_celulas(partes)
+    if 'localizacao' in celulas.columns:
+        celulas['localizacao'] = celulas['localizacao'].astype('category')
+    return CuboEstoque.de_celulas(celulas)
+
+
+def gravar_particoes_em_blocos(destino, base_path='data', tamanho_bloco=TAMANHO_BLOCO_PADRAO,
+                               estoque=None):
+    """
+    Grava o estoque unificado em um diretório Parquet particionado por data
+    (destino/data_referencia=AAAA-MM-DD/parte-NNNNN.parquet), bloco a bloco.
+    Linhas sem data válida vão para a partição data_referencia=sem_data.
+
+    Os arquivos são gravados em uma pasta temporária que depois substitui
+    destino por inteiro, de modo que partes de uma gravação anterior (com
+    outro tamanho de bloco, por exemplo) nunca se misturam às novas.
+
+    Args:
+        destino (str): Diretório de saída
+        base_path (str): Caminho base onde estão os arquivos CSV
+        tamanho_bloco (int): Linhas de estoque por bloco
+        estoque (str): Pasta ou padrão glob dos fragmentos de estoque (opcional)
+
+    Returns:
+        list: Caminhos dos arquivos gravados
+    """
+    destino = os.path.abspath(destino)
+    caminho_tmp = f"{destino}.{os.getpid()}.tmp"
+    caminho_antigo = f"{destino}.{os.getpid()}.antigo"
+    shutil.rmtree(caminho_tmp, ignore_errors=True)
+    os.makedirs(caminho_tmp)
+
+    arquivos = []
+    try:
+        for numero, bloco in enumerate(iterar_blocos_unidos(base_path, tamanho_bloco, estoque)):
+            datas = bloco['data_referencia'].dt.strftime('%Y-%m-%d').fillna('sem_data')
+            for data, parte in bloco.groupby(datas, sort=False):
+                pasta = f"data_referencia={data}"
+                os.makedirs(os.path.join(caminho_tmp, pasta), exist_ok=True)
+                arquivo = os.path.join(pasta, f"parte-{numero:05d}.parquet")
+                pq.write_table(
+                    pa.Table.from_pandas(parte, preserve_index=False),
+                    os.path.join(caminho_tmp, arquivo)
+                )
+                arquivos.append(arquivo)
+
+        # Troca a pasta inteira: a anterior sai do caminho antes de ser removida
+        if os.path.exists(destino):
+            shutil.rmtree(caminho_antigo, ignore_errors=True)
+            os.rename(destino, caminho_antigo)
+        os.rename(caminho_tmp, destino)
+    finally:
+        shutil.rmtree(caminho_tmp, ignore_errors=True)
+        shutil.rmtree(caminho_antigo, ignore_errors=True)
+    return [os.path.join(destino, arquivo) for arquivo in arquivos]
+
+
+def ler_particao(destino, data):
+    """
+    Lê do diretório particionado apenas os arquivos de uma data.
+
+    Args:
+        destino (str): Diretório gravado por gravar_particoes_em_blocos()
+        data: Data de referência desejada
+
+    Returns:
+        pd.DataFrame: Linhas da data (vazio se a partição não existir)
+    """
+    pasta = os.path.join(destino, f"data_referencia={pd.Timestamp(data):%Y-%m-%d}")
+    if not os.path.isdir(pasta):
+        return pd.DataFrame()
+    partes = [
+        pq.read_table(os.path.join(pasta, nome)).to_pandas()
+        for nome in sorted(os.listdir(pasta))
+        if nome.endswith('.parquet')
+    ]
+    return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
@@ -0,0 +1,139 @@
+"""
+Módulo com o catálogo de metadados (opções dos filtros e limites de preço) calculado na carga
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from utils.particoes import construir_indice_datas
+
+# Colunas cujos valores distintos alimentam as opções da sidebar
+DIMENSOES_CATALOGO = ('categoria', 'marca', 'localizacao')
+
+
+@dataclass(frozen=True)
+class CatalogoRecorte:
+    """
+    Metadados de um recorte dos dados (uma data de referência ou o conjunto
+    inteiro).
+
+    Attributes:
+        categorias (tuple): Categorias distintas, ordenadas
+        marcas (tuple): Marcas distintas, ordenadas
+        localizacoes (tuple): Localizações distintas, ordenadas
+        preco_min (float): Menor preço unitário (None = sem preços)
+        preco_max (float): Maior preço unitário (None = sem preços)
+        n_linhas (int): Número de linhas do recorte
+    """
+    categorias: tuple = ()
+    marcas: tuple = ()
+    localizacoes: tuple = ()
+    preco_min: float = None
+    preco_max: float = None
+    n_linhas: int = 0
+
+    def limites_preco(self, padrao=(0.0, 1000.0)):
+        """
+        Retorna o menor e o maior preço unitário do recorte.
+
+        Args:
+            padrao (tuple): Limites usados quando não há preços
+
+        Returns:
+            tuple: (preço mínimo, preço máximo)
+        """
+        if self.preco_min is None:
+            return padrao
+        return self.preco_min, self.preco_max
+
+
+class CatalogoDados:
+    """
+    Catálogo calculado uma única vez na carga dos dados: valores distintos
+    de cada dimensão, limites de preço e contagem de linhas, para o conjunto
+    inteiro e para cada data de referência. As funções obter_* e os limites
+    do slider de preço passam a ser consultas a este catálogo, sem varrer o
+    DataFrame a cada execução.
+
+    Args:
+        geral (CatalogoRecorte): Metadados do conjunto inteiro
+        por_data (dict): Mapeamento data (pd.Timestamp) -> CatalogoRecorte
+    """
+
+    def __init__(self, geral, por_data):
+        self.geral = geral
+        self.por_data = por_data
+        self.datas = sorted(por_data)
+
+    def recorte(self, data=None):
+        """
+        Retorna os metadados de uma data de referência.
+
+        Args:
+            data: Data desejada (None = conjunto inteiro)
+
+        Returns:
+            CatalogoRecorte: Metadados da data (vazio se a data não existir)
+        """
+        if data is None:
+            return self.geral
+        data = pd.to_datetime(data, errors='coerce')
+        if pd.isna(data):
+            return CatalogoRecorte()
+        return self.por_data.get(data, CatalogoRecorte())
+
+
+def _distintos(serie, inicio, fim):
+    """Valores distintos e não nulos de serie[inicio:fim], ordenados"""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        # Códigos distintos da faixa, traduzidos pelas categorias (sem varrer texto)
+        codigos = np.unique(serie.cat.codes.to_numpy()[inicio:fim])
+        valores = serie.cat.categories[codigos[codigos >= 0]].tolist()
+    else:
+        valores = serie.iloc[inicio:fim].dropna().unique().tolist()
+    return tuple(sorted(valores))
+
+
+def _recorte(df, inicio, fim):
+    """Calcula os metadados das linhas [inicio, fim) do DataFrame"""
+    valores = {
+        coluna: _distintos(df[coluna], inicio, fim) if coluna in df.columns else ()
+        for coluna in DIMENSOES_CATALOGO
+    }
+    preco_min = preco_max = None
+    if 'preco_unitario' in df.columns:
+        precos = df['preco_unitario'].to_numpy(dtype=np.float64)[inicio:fim]
+        precos = precos[~np.isnan(precos)]
+        if len(precos):
+            preco_min, preco_max = float(precos.min()), float(precos.max())
+    return CatalogoRecorte(
+        categorias=valores['categoria'],
+        marcas=valores['marca'],
+        localizacoes=valores['localizacao'],
+        preco_min=preco_min,
+        preco_max=preco_max,
+        n_linhas=fim - inicio,
+    )
+
+
+def construir_catalogo(df, indice=None):
+    """
+    Constrói o catálogo de um DataFrame retornado por carregar_dados(). Cada
+    data é processada sobre a sua faixa de linhas no índice de datas, e as
+    colunas categóricas são lidas pelos códigos.
+
+    Args:
+        df (pd.DataFrame): DataFrame ordenado por data_referencia
+        indice (IndiceDatas): Índice de datas já construído (opcional)
+
+    Returns:
+        CatalogoDados: Catálogo do DataFrame
+    """
+    if indice is None:
+        indice = construir_indice_datas(df)
+    por_data = {
+        data: _recorte(df, *indice.faixa(data))
+        for data in indice.datas
+    }
+    return CatalogoDados(_recorte(df, 0, len(df)), por_data)
@@ -0,0 +1,213 @@
+"""
+Módulo com o armazenamento colunar em memória mapeada (.npy) compartilhado entre processos
+"""
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from utils.snapshot import VERSAO_SNAPSHOT
+
+logger = logging.getLogger(__name__)
+
+# Pasta, ao lado dos CSVs, com uma subpasta de colunas por versão dos dados
+PASTA_COLUNAR = '.fcd_colunas'
+
+# Incrementar sempre que o formato das colunas gravadas mudar
+VERSAO_COLUNAR = 1
+
+# Versões mantidas em disco (as mais recentes); as demais são removidas
+VERSOES_MANTIDAS = 2
+
+_MANIFESTO = 'manifesto.json'
+
+
+def _arquivo_coluna(indice, sufixo=''):
+    """Nome do arquivo .npy de uma coluna (pela posição, não pelo nome)"""
+    return f"c{indice:04d}{sufixo}.npy"
+
+
+def _salvar(pasta, nome, valores):
+    """Grava um array contíguo em .npy"""
+    np.save(os.path.join(pasta, nome), np.ascontiguousarray(valores), allow_pickle=False)
+
+
+def _gravar_coluna(pasta, indice, serie):
+    """Grava uma coluna e retorna a sua descrição para o manifesto"""
+    descricao = {'nome': serie.name}
+    dtype = serie.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        categorias = dtype.categories
+        descricao.update(tipo='categoria', ordenada=bool(dtype.ordered))
+        if categorias.dtype.kind in 'iuf':
+            descricao['categorias'] = categorias.tolist()
+            descricao['tipo_categorias'] = str(categorias.dtype)
+        else:
+            descricao['categorias'] = [str(c) for c in categorias]
+        _salvar(pasta, _arquivo_coluna(indice), serie.cat.codes.to_numpy())
+    elif isinstance(serie.array, pd.arrays.IntegerArray | pd.arrays.FloatingArray | pd.arrays.BooleanArray):
+        # Tipos anuláveis: valores e máscara em arquivos separados
+        descricao.update(tipo='mascarado', dtype=str(dtype))
+        _salvar(pasta, _arquivo_coluna(indice), serie.array._data)
+        _salvar(pasta, _arquivo_coluna(indice, '_mascara'), serie.array._mask)
+    elif isinstance(dtype, np.dtype) and dtype.kind in 'biufmM':
+        descricao.update(tipo='numpy')
+        _salvar(pasta, _arquivo_coluna(indice), serie.to_numpy())
+    else:
+        # Texto livre: guardado como categórico (códigos inteiros + valores)
+        return _gravar_coluna(pasta, indice, serie.astype('category'))
+    return descricao
+
+
+def gravar_colunas(df, pasta):
+    """
+    Grava um DataFrame como uma pasta de colunas .npy (uma por coluna, as
+    categóricas como códigos) e um manifesto com os nomes e tipos.
+
+    Args:
+        df (pd.DataFrame): DataFrame (o índice não é gravado)
+        pasta (str): Pasta de destino (criada se necessário)
+    """
+    os.makedirs(pasta, exist_ok=True)
+    colunas = [_gravar_coluna(pasta, i, df[coluna]) for i, coluna in enumerate(df.columns)]
+    manifesto = {'versao': VERSAO_COLUNAR, 'n_linhas': len(df), 'colunas': colunas}
+    with open(os.path.join(pasta, _MANIFESTO), 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False)
+
+
+def abrir_colunas(pasta):
+    """
+    Abre uma pasta gravada por gravar_colunas() como um DataFrame cujas
+    colunas são arrays somente leitura em memória mapeada (np.load com
+    mmap_mode='r'). Nada é copiado para a memória do processo: as páginas
+    vêm do cache do sistema operacional e são compartilhadas por todos os
+    processos que abrem a mesma pasta.
+
+    Args:
+        pasta (str): Pasta gravada por gravar_colunas()
+
+    Returns:
+        pd.DataFrame: DataFrame somente leitura
+
+    Raises:
+        ValueError: Se a pasta for de outra versão do formato
+    """
+    with open(os.path.join(pasta, _MANIFESTO), encoding='utf-8') as f:
+        manifesto = json.load(f)
+    if manifesto.get('versao') != VERSAO_COLUNAR:
+        raise ValueError(f"Formato colunar incompatível em '{pasta}'")
+
+    def carregar(indice, sufixo=''):
+        # Visão ndarray comum do arquivo mapeado (o np.memmap fica em .base)
+        return np.asarray(np.load(os.path.join(pasta, _arquivo_coluna(indice, sufixo)), mmap_mode='r'))
+
+    colunas = {}
+    for indice, descricao in enumerate(manifesto['colunas']):
+        tipo = descricao['tipo']
+        if tipo == 'categoria':
+            categorias = pd.Index(descricao['categorias'], dtype=descricao.get('tipo_categorias'))
+            colunas[descricao['nome']] = pd.Categorical.from_codes(
+                carregar(indice), dtype=pd.CategoricalDtype(categorias, ordered=descricao['ordenada']),
+                validate=False
+            )
+        elif tipo == 'mascarado':
+            classe = pd.api.types.pandas_dtype(descricao['dtype']).construct_array_type()
+            colunas[descricao['nome']] = classe(carregar(indice), carregar(indice, '_mascara'))
+        else:
+            colunas[descricao['nome']] = carregar(indice)
+
+    # copy=False mantém cada coluna apontando para o próprio arquivo mapeado
+    return pd.DataFrame(colunas, index=pd.RangeIndex(manifesto['n_linhas']), copy=False)
+
+
+def _pastas_candidatas(base_path):
+    """Pasta colunar ao lado dos CSVs e, se ela for somente leitura, na pasta temporária"""
+    return [
+        os.path.join(os.path.abspath(base_path), PASTA_COLUNAR),
+        os.path.join(tempfile.gettempdir(), PASTA_COLUNAR),
+    ]
+
+
+def _remover_versoes_antigas(raiz, versao):
+    """
+    Remove as versões mais antigas da pasta colunar. Processos que ainda
+    usam uma versão removida não são afetados: o arquivo mapeado continua
+    válido até ser fechado (POSIX); onde a remoção não é permitida, a pasta
+    é mantida.
+    """
+    try:
+        pastas = [
+            os.path.join(raiz, nome) for nome in os.listdir(raiz)
+            if nome != versao and not nome.startswith('.')
+        ]
+        pastas.sort(key=os.path.getmtime, reverse=True)
+    except OSError:
+        return
+    for pasta in pastas[VERSOES_MANTIDAS - 1:]:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+def _nome_pasta_versao(versao):
+    """
+    Nome da subpasta de uma versão dos dados. Inclui a versão do DataFrame
+    unificado (VERSAO_SNAPSHOT), de modo que uma mudança no esquema ou no
+    join invalide as colunas gravadas mesmo sem mudança nos CSVs.
+    """
+    return f"{versao}-s{VERSAO_SNAPSHOT}"
+
+
+def carregar_compartilhado(base_path, versao, carregar):
+    """
+    Retorna o DataFrame de uma versão dos dados a partir do armazenamento
+    colunar em memória mapeada, construindo-o com `carregar()` apenas se
+    nenhum processo o tiver gravado ainda.
+
+    O primeiro processo que precisa de uma versão carrega os dados, grava as
+    colunas em uma pasta temporária e a renomeia para
+    `<PASTA_COLUNAR>/<versao>-s<VERSAO_SNAPSHOT>` (operação atômica: ou a
+    pasta completa existe, ou não existe). Todos os processos, inclusive o
+    que gravou, passam a usar a versão mapeada, de modo que o conjunto de
+    dados fica uma única vez na memória da máquina, não importa quantas
+    sessões ou processos do servidor estejam ativos.
+
+    Args:
+        base_path (str): Pasta dos CSVs (o armazenamento fica ao lado deles)
+        versao (str): Versão dos dados (ver versao_dados)
+        carregar (callable): Função sem argumentos que retorna o DataFrame
+
+    Returns:
+        pd.DataFrame: DataFrame somente leitura em memória mapeada (ou o
+            retornado por carregar(), se nenhuma pasta aceitar gravação)
+    """
+    pasta_versao = _nome_pasta_versao(versao)
+    for raiz in _pastas_candidatas(base_path):
+        destino = os.path.join(raiz, pasta_versao)
+        try:
+            return abrir_colunas(destino)
+        except (OSError, ValueError, KeyError, json.JSONDecodeError):
+            pass
+
+    df = carregar()
+    for raiz in _pastas_candidatas(base_path):
+        destino = os.path.join(raiz, pasta_versao)
+        caminho_tmp = os.path.join(raiz, f".{pasta_versao}.{os.getpid()}.tmp")
+        try:
+            shutil.rmtree(caminho_tmp, ignore_errors=True)
+            gravar_colunas(df, caminho_tmp)
+            try:
+                os.rename(caminho_tmp, destino)
+            except OSError:
+                # Outro processo gravou a mesma versão primeiro: usa a dele
+                if not os.path.exists(os.path.join(destino, _MANIFESTO)):
+                    raise
+                shutil.rmtree(caminho_tmp, ignore_errors=True)
+            _remover_versoes_antigas(raiz, pasta_versao)
+            return abrir_colunas(destino)
+        except (OSError, ValueError) as e:
+            logger.warning("Não foi possível gravar as colunas em %s: %s", raiz, e)
+            shutil.rmtree(caminho_tmp, ignore_errors=True)
+    return df
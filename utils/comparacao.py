@@ -0,0 +1,227 @@
+"""
+Módulo para a comparação do estoque entre duas datas de referência
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from utils.calculations import ResultadoKPIs, calcular_kpis
+
+# Transições de status de cada (produto, localização) entre as duas datas
+TRANSICAO_ENTROU = 'Entrou em alerta'
+TRANSICAO_SAIU = 'Saiu do alerta'
+TRANSICAO_CONTINUA_ALERTA = 'Continua em alerta'
+TRANSICAO_CONTINUA_ADEQUADO = 'Continua adequado'
+TRANSICAO_NOVO = 'Novo na data'
+TRANSICAO_AUSENTE = 'Ausente na data'
+TRANSICOES = [
+    TRANSICAO_ENTROU, TRANSICAO_SAIU, TRANSICAO_CONTINUA_ALERTA,
+    TRANSICAO_CONTINUA_ADEQUADO, TRANSICAO_NOVO, TRANSICAO_AUSENTE,
+]
+
+# Colunas descritivas copiadas (uma linha por chave) para o resultado
+COLUNAS_DESCRICAO = ['sku', 'produto_nome', 'categoria', 'marca']
+
+
+@dataclass
+class ComparacaoDatas:
+    """
+    Resultado de comparar_datas().
+
+    Attributes:
+        itens (pd.DataFrame): Uma linha por (produto_id, localizacao) presente em
+            alguma das datas, com quantidades, valores, deltas e transição
+        kpis_base (ResultadoKPIs): Indicadores da data base
+        kpis_comparada (ResultadoKPIs): Indicadores da data comparada
+    """
+    itens: pd.DataFrame
+    kpis_base: ResultadoKPIs
+    kpis_comparada: ResultadoKPIs
+
+    def contagem_transicoes(self):
+        """
+        Conta as chaves em cada transição de status.
+
+        Returns:
+            pd.Series: Quantidade por transição, na ordem de TRANSICOES
+        """
+        return self.itens['transicao'].value_counts().reindex(TRANSICOES, fill_value=0)
+
+    def por_dimensao(self, coluna):
+        """
+        Agrega a comparação por uma dimensão (categoria, marca, localização).
+
+        Args:
+            coluna (str): Coluna de agrupamento
+
+        Returns:
+            pd.DataFrame: Valor e itens em alerta nas duas datas, com as
+                diferenças e as chaves que entraram ou saíram do alerta
+        """
+        itens = self.itens
+        agregado = itens.groupby(coluna, observed=True, sort=True).agg(
+            valor_base=('valor_base', 'sum'),
+            valor_comparada=('valor_comparada', 'sum'),
+            abaixo_base=('abaixo_base', 'sum'),
+            abaixo_comparada=('abaixo_comparada', 'sum'),
+            entraram_alerta=('transicao', lambda t: int((t == TRANSICAO_ENTROU).sum())),
+            sairam_alerta=('transicao', lambda t: int((t == TRANSICAO_SAIU).sum())),
+        )
+        agregado['delta_valor'] = agregado['valor_comparada'] - agregado['valor_base']
+        agregado['delta_abaixo'] = agregado['abaixo_comparada'] - agregado['abaixo_base']
+        return agregado
+
+    def mais_alterados(self, n=30):
+        """
+        Retorna as N chaves com maior variação absoluta de quantidade.
+
+        Args:
+            n (int): Quantidade de chaves
+
+        Returns:
+            pd.DataFrame: Linhas de itens, da maior para a menor variação
+        """
+        variacao = np.abs(self.itens['delta_quantidade'].to_numpy())
+        n = min(n, len(variacao))
+        if n <= 0:
+            return self.itens.iloc[:0]
+        selecionadas = np.argpartition(-variacao, n - 1)[:n]
+        ordem = np.lexsort((selecionadas, -variacao[selecionadas]))
+        return self.itens.iloc[selecionadas[ordem]]
+
+
+def _codigos(serie, valores):
+    """Código de cada linha de uma coluna segundo o índice `valores` (-1 = nulo)"""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        # Traduz as categorias (poucas) e depois os códigos, sem varrer texto
+        traducao = np.append(valores.get_indexer(serie.cat.categories), -1)
+        return traducao[serie.cat.codes.to_numpy()]
+    return valores.get_indexer(serie.to_numpy())
+
+
+def _distintos(serie):
+    """Valores distintos e não nulos de uma coluna"""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return pd.Index(serie.cat.categories)
+    return pd.Index(serie.dropna().unique())
+
+
+def _primeiras(posicoes, n_chaves):
+    """Primeira linha de cada chave (-1 quando a chave não aparece)"""
+    primeira = np.full(n_chaves, -1, dtype=np.int64)
+    chaves, indices = np.unique(posicoes, return_index=True)
+    primeira[chaves] = indices
+    return primeira
+
+
+def comparar_datas(df_base, df_comparada, por_localizacao=True):
+    """
+    Compara as linhas de duas datas de referência (por exemplo, duas
+    partições do índice de datas depois dos filtros), alinhadas pela chave
+    (produto_id, localizacao).
+
+    O alinhamento não faz merge dos DataFrames: cada chave vira um inteiro
+    (código do produto × código da localização), as duas datas são
+    posicionadas na união das chaves com np.unique e as quantidades são
+    somadas por chave com np.bincount. Deltas e transições de status são
+    operações vetorizadas sobre esses arrays; só as colunas descritivas da
+    primeira linha de cada chave são copiadas para o resultado.
+
+    Args:
+        df_base (pd.DataFrame): Linhas da data base (a mais antiga, em geral)
+        df_comparada (pd.DataFrame): Linhas da data comparada
+        por_localizacao (bool): Se False, alinha só por produto_id, somando as
+            localizações (a localização dos itens passa a ser 'Todas')
+
+    Returns:
+        ComparacaoDatas: Itens alinhados, deltas, transições e indicadores
+    """
+    n_base = len(df_base)
+    produtos = pd.Index(pd.unique(np.concatenate((
+        df_base['produto_id'].to_numpy(), df_comparada['produto_id'].to_numpy()
+    ))))
+    locais = _distintos(df_base['localizacao']).union(_distintos(df_comparada['localizacao']))
+    n_locais = len(locais) + 1 if por_localizacao else 1
+
+    def chaves_linhas(df):
+        codigo_produto = produtos.get_indexer(df['produto_id'].to_numpy()).astype(np.int64)
+        if not por_localizacao:
+            return codigo_produto
+        return codigo_produto * n_locais + (_codigos(df['localizacao'], locais) + 1)
+
+    chaves, posicoes = np.unique(
+        np.concatenate((chaves_linhas(df_base), chaves_linhas(df_comparada))), return_inverse=True
+    )
+    n_chaves = len(chaves)
+    posicoes_base, posicoes_comparada = posicoes[:n_base], posicoes[n_base:]
+
+    def somar(posicoes_lado, df, coluna):
+        valores = np.nan_to_num(df[coluna].to_numpy(dtype=np.float64), nan=0.0)
+        return np.bincount(posicoes_lado, weights=valores, minlength=n_chaves)
+
+    presente_base = np.bincount(posicoes_base, minlength=n_chaves) > 0
+    presente_comparada = np.bincount(posicoes_comparada, minlength=n_chaves) > 0
+    quantidade_base = somar(posicoes_base, df_base, 'quantidade_estoque')
+    quantidade_comparada = somar(posicoes_comparada, df_comparada, 'quantidade_estoque')
+    minimo_base = somar(posicoes_base, df_base, 'estoque_minimo')
+    minimo_comparada = somar(posicoes_comparada, df_comparada, 'estoque_minimo')
+    abaixo_base = presente_base & (quantidade_base < minimo_base)
+    abaixo_comparada = presente_comparada & (quantidade_comparada < minimo_comparada)
+
+    # Descrição e preço lidos da primeira linha da chave na data comparada
+    # (ou na base, se a chave não existir mais)
+    primeira_base = _primeiras(posicoes_base, n_chaves)
+    primeira_comparada = _primeiras(posicoes_comparada, n_chaves)
+    usar_comparada = primeira_comparada >= 0
+    colunas = ['produto_id', 'localizacao'] + [
+        c for c in COLUNAS_DESCRICAO + ['preco_unitario']
+        if c in df_base.columns and c in df_comparada.columns
+    ]
+    itens = pd.concat([
+        df_comparada[colunas].iloc[primeira_comparada[usar_comparada]],
+        df_base[colunas].iloc[primeira_base[~usar_comparada]],
+    ], ignore_index=True)
+    # Volta para a ordem das chaves
+    ordem = np.concatenate((np.flatnonzero(usar_comparada), np.flatnonzero(~usar_comparada)))
+    itens = itens.iloc[np.argsort(ordem, kind='stable')].reset_index(drop=True)
+    if not por_localizacao:
+        itens['localizacao'] = 'Todas'
+
+    preco = np.nan_to_num(itens['preco_unitario'].to_numpy(dtype=np.float64), nan=0.0)
+    itens['quantidade_base'] = quantidade_base
+    itens['quantidade_comparada'] = quantidade_comparada
+    itens['delta_quantidade'] = quantidade_comparada - quantidade_base
+    itens['minimo_base'] = minimo_base
+    itens['minimo_comparada'] = minimo_comparada
+    itens['valor_base'] = quantidade_base * preco
+    itens['valor_comparada'] = quantidade_comparada * preco
+    itens['delta_valor'] = itens['valor_comparada'].to_numpy() - itens['valor_base'].to_numpy()
+    itens['abaixo_base'] = abaixo_base
+    itens['abaixo_comparada'] = abaixo_comparada
+    itens['transicao'] = pd.Categorical.from_codes(
+        np.select(
+            [
+                ~presente_base,
+                ~presente_comparada,
+                ~abaixo_base & abaixo_comparada,
+                abaixo_base & ~abaixo_comparada,
+                abaixo_base & abaixo_comparada,
+            ],
+            [
+                TRANSICOES.index(TRANSICAO_NOVO),
+                TRANSICOES.index(TRANSICAO_AUSENTE),
+                TRANSICOES.index(TRANSICAO_ENTROU),
+                TRANSICOES.index(TRANSICAO_SAIU),
+                TRANSICOES.index(TRANSICAO_CONTINUA_ALERTA),
+            ],
+            default=TRANSICOES.index(TRANSICAO_CONTINUA_ADEQUADO),
+        ),
+        categories=TRANSICOES,
+    )
+
+    return ComparacaoDatas(
+        itens=itens,
+        kpis_base=calcular_kpis(df_base),
+        kpis_comparada=calcular_kpis(df_comparada),
+    )
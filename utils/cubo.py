@@ -0,0 +1,169 @@
+"""
+Módulo com o cubo de agregados do estoque (data × categoria × marca × localização × status)
+"""
+import numpy as np
+import pandas as pd
+
+from utils.filtros import STATUS_ABAIXO, STATUS_ADEQUADO, STATUS_TODOS
+from utils.particoes import construir_indice_datas
+
+DIMENSOES_CUBO = ['data_referencia', 'categoria', 'marca', 'localizacao', 'abaixo_minimo']
+
+# Medidas aditivas mantidas em cada célula do cubo
+MEDIDAS_CUBO = ['n_linhas', 'quantidade_estoque', 'estoque_minimo', 'valor_total', 'deficit']
+
+
+def _medidas_por_linha(df):
+    """
+    Calcula, sem alterar o DataFrame, as colunas auxiliares por linha usadas
+    nas agregações: status, valor em estoque e déficit.
+    """
+    quantidade = df['quantidade_estoque'].to_numpy(dtype=np.int64)
+    minimo = df['estoque_minimo'].to_numpy(dtype=np.int64)
+    preco = df['preco_unitario'].to_numpy(dtype=np.float64)
+    return pd.DataFrame({
+        'abaixo_minimo': quantidade < minimo,
+        'n_linhas': np.ones(len(df), dtype=np.int64),
+        'quantidade_estoque': quantidade,
+        'estoque_minimo': minimo,
+        'valor_total': quantidade * preco,
+        'deficit': np.maximum(minimo - quantidade, 0),
+    }, index=df.index)
+
+
+def agregar_linhas(df, por):
+    """
+    Agrega diretamente as linhas de um DataFrame (caminho usado quando o
+    filtro não pode ser respondido pelo cubo, como busca por nome ou faixa
+    de preço). Retorna as mesmas medidas de CuboEstoque.agregar().
+
+    Args:
+        df (pd.DataFrame): DataFrame filtrado
+        por (str): Coluna de agrupamento (ex.: 'categoria', 'localizacao')
+
+    Returns:
+        pd.DataFrame: Medidas agregadas, indexadas pela coluna de agrupamento
+    """
+    medidas = _medidas_por_linha(df)
+    medidas[por] = df[por]
+    return medidas.groupby(por, observed=True, sort=True)[MEDIDAS_CUBO].sum()
+
+
+def calcular_celulas(df):
+    """
+    Agrega as linhas de um DataFrame nas células do cubo (uma linha por
+    combinação observada das dimensões, com a soma de cada medida).
+
+    Args:
+        df (pd.DataFrame): DataFrame unificado (ou um bloco dele)
+
+    Returns:
+        pd.DataFrame: Células com as dimensões e as medidas aditivas
+    """
+    medidas = _medidas_por_linha(df)
+    chaves = [c for c in DIMENSOES_CUBO if c != 'abaixo_minimo' and c in df.columns]
+    for coluna in chaves:
+        medidas[coluna] = df[coluna]
+    celulas = medidas.groupby(
+        chaves + ['abaixo_minimo'], observed=True, dropna=False, sort=True
+    )[MEDIDAS_CUBO].sum().reset_index()
+    return celulas[celulas['n_linhas'] > 0].reset_index(drop=True)
+
+
+def combinar_celulas(partes):
+    """
+    Soma células calculadas separadamente (por exemplo, uma parte por bloco
+    de leitura). Como as medidas são aditivas, o resultado é igual ao de
+    calcular_celulas() sobre todas as linhas juntas.
+
+    Args:
+        partes (list): Lista de DataFrames de células
+
+    Returns:
+        pd.DataFrame: Células combinadas
+    """
+    partes = [parte for parte in partes if not parte.empty]
+    if not partes:
+        return pd.DataFrame(columns=DIMENSOES_CUBO + MEDIDAS_CUBO)
+    todas = pd.concat(partes, ignore_index=True)
+    chaves = [c for c in DIMENSOES_CUBO if c in todas.columns]
+    return todas.groupby(
+        chaves, observed=True, dropna=False, sort=True
+    )[MEDIDAS_CUBO].sum().reset_index()
+
+
+class CuboEstoque:
+    """
+    Cubo de medidas aditivas calculado uma única vez na carga dos dados.
+
+    Cada célula corresponde a uma combinação de data, categoria, marca,
+    localização e status (abaixo do mínimo ou não) e guarda: número de
+    linhas, soma da quantidade em estoque, soma do estoque mínimo, valor em
+    estoque (quantidade × preço unitário) e déficit (mínimo - quantidade,
+    apenas quando positivo). Como as medidas são aditivas, qualquer recorte
+    por essas dimensões é obtido somando células, com custo proporcional ao
+    número de células e não ao número de linhas.
+
+    Args:
+        df (pd.DataFrame): DataFrame completo
+        celulas (pd.DataFrame): Células já agregadas, no lugar de df (ver de_celulas())
+    """
+
+    def __init__(self, df=None, celulas=None):
+        if celulas is None:
+            celulas = calcular_celulas(df)
+        self.celulas = celulas
+        self.dimensoes = [c for c in DIMENSOES_CUBO if c in celulas.columns]
+        self.indice_datas = construir_indice_datas(celulas)
+
+    @classmethod
+    def de_celulas(cls, celulas):
+        """
+        Constrói o cubo a partir de células já agregadas (por exemplo, pela
+        carga em blocos), sem precisar das linhas originais.
+
+        Args:
+            celulas (pd.DataFrame): Células ordenadas por data_referencia
+
+        Returns:
+            CuboEstoque: Cubo construído
+        """
+        return cls(celulas=celulas)
+
+    def _celulas(self, data=None, categorias=None, marcas=None, localizacoes=None,
+                 status=STATUS_TODOS):
+        """Retorna as células que atendem ao recorte informado"""
+        celulas = self.celulas
+        if data is not None and 'data_referencia' in celulas.columns:
+            inicio, fim = self.indice_datas.faixa(data)
+            celulas = celulas.iloc[inicio:fim]
+
+        mascara = np.ones(len(celulas), dtype=bool)
+        for coluna, valores in (('categoria', categorias), ('marca', marcas),
+                                ('localizacao', localizacoes)):
+            if valores and coluna in celulas.columns:
+                mascara &= celulas[coluna].isin(valores).to_numpy()
+        if status == STATUS_ABAIXO:
+            mascara &= celulas['abaixo_minimo'].to_numpy()
+        elif status == STATUS_ADEQUADO:
+            mascara &= ~celulas['abaixo_minimo'].to_numpy()
+        return celulas[mascara]
+
+    def agregar(self, por, data=None, categorias=None, marcas=None, localizacoes=None,
+                status=STATUS_TODOS):
+        """
+        Soma as células do recorte agrupando por uma dimensão.
+
+        Args:
+            por (str): Dimensão de agrupamento (ex.: 'categoria', 'localizacao')
+            data: Data de referência (None = todas as datas)
+            categorias (list): Categorias aceitas (vazio/None = todas)
+            marcas (list): Marcas aceitas (vazio/None = todas)
+            localizacoes (list): Localizações aceitas (vazio/None = todas)
+            status (str): 'Todos', 'Abaixo do Mínimo' ou 'Adequado'
+
+        Returns:
+            pd.DataFrame: Medidas agregadas, indexadas pela dimensão
+        """
+        celulas = self._celulas(data, categorias, marcas, localizacoes, status)
+        return celulas.groupby(por, observed=True, sort=True)[MEDIDAS_CUBO].sum()
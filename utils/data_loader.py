@@ -1,19 +1,64 @@
 """
 Módulo para carregar e processar dados dos CSVs
 """
-import pandas as pd
+import hashlib
+import json
+import logging
 import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# construir_catalogo e construir_indice_datas não são usados aqui: são
+# reexportados para app.py, utils.relatorio e os benchmarks
+from utils.catalogo import construir_catalogo  # noqa: F401
+from utils.fragmentos import carregar_fragmentos, localizar_fragmentos
+from utils.particoes import construir_indice_datas  # noqa: F401
+from utils.snapshot import calcular_assinatura, carregar_snapshot, salvar_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Esquema aplicado na leitura dos CSVs. Colunas de texto com poucos valores
+# distintos (em relação ao número de linhas do DataFrame unificado) viram
+# categóricas; inteiros são reduzidos depois do join (ver _reduzir_inteiro).
+# Colunas monetárias continuam em float64 para não perder centavos nas somas.
+ESQUEMA_PRODUTOS = {
+    'sku': 'category',
+    'produto_nome': 'category',
+    'categoria': 'category',
+    'marca': 'category',
+    'unidade_medida': 'category',
+    'dimensao_cm': 'category',
+    'preco_unitario': 'float64',
+    'custo_unitario': 'float64',
+    'peso_kg': 'float32',
+}
+
+ESQUEMA_ESTOQUE = {
+    'localizacao': 'category',
+}
+
+COLUNAS_INTEIRAS = [
+    'produto_id', 'estoque_id', 'estoque_inicial',
+    'quantidade_estoque', 'estoque_minimo',
+]
+
+_TIPOS_INTEIROS = [np.int8, np.int16, np.int32, np.int64]
 
 
-def carregar_dados(base_path='data'):
+def _localizar_arquivos(base_path='data', exigir_estoque=True):
     """
-    Carrega os dados dos CSVs e faz o join entre produtos e estoque.
+    Localiza os arquivos CSV de produtos e estoque, tentando diferentes
+    diretórios e variações de nomes.
     
     Args:
         base_path (str): Caminho base onde estão os arquivos CSV
+        exigir_estoque (bool): Se False, basta encontrar o CSV de produtos
+            (o estoque vem de fragmentos; caminho_estoque pode ser None)
         
     Returns:
-        pd.DataFrame: DataFrame com dados unificados de produtos e estoque
+        tuple: (caminho_produtos, caminho_estoque)
     """
     # Obter o diretório do script atual
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -41,6 +86,9 @@ def carregar_dados(base_path='data'):
         for variacao_produto in variacoes_produtos:
             caminho_produto_teste = os.path.join(caminho_base, variacao_produto)
             if os.path.exists(caminho_produto_teste):
+                if not exigir_estoque:
+                    caminho_produtos = caminho_produto_teste
+                    break
                 # Encontrar o arquivo de estoque correspondente
                 for variacao_estoque in variacoes_estoque:
                     caminho_estoque_teste = os.path.join(caminho_base, variacao_estoque)
@@ -81,6 +129,9 @@ def carregar_dados(base_path='data'):
             f"Nota: Os nomes dos arquivos são case-sensitive no Linux (Streamlit Cloud)."
         )
     
+    if not exigir_estoque:
+        return caminho_produtos, None
+    
     if not os.path.exists(caminho_estoque):
         raise FileNotFoundError(
             f"Arquivo FCD_ESTOQUE.csv não encontrado.\n"
@@ -90,114 +141,395 @@ def carregar_dados(base_path='data'):
             f"Consulte DEPLOY.md para mais informações."
         )
     
-    # Carregar CSVs
-    df_produtos = pd.read_csv(caminho_produtos)
-    df_estoque = pd.read_csv(caminho_estoque)
+    return caminho_produtos, caminho_estoque
+
+
+def ler_produtos(caminho_produtos):
+    """
+    Lê o CSV de produtos já com o esquema de tipos.
     
-    # Fazer join por produto_id
+    Args:
+        caminho_produtos (str): Caminho do CSV de produtos
+        
+    Returns:
+        pd.DataFrame: DataFrame de produtos
+    """
+    return pd.read_csv(caminho_produtos, dtype=ESQUEMA_PRODUTOS)
+
+
+def tipar_estoque(df_estoque):
+    """
+    Converte data_referencia de um DataFrame (ou bloco) de estoque para datetime64.
+    
+    Args:
+        df_estoque (pd.DataFrame): DataFrame de estoque lido do CSV
+        
+    Returns:
+        pd.DataFrame: O mesmo DataFrame, com a data convertida
+    """
+    if 'data_referencia' in df_estoque.columns:
+        df_estoque['data_referencia'] = pd.to_datetime(df_estoque['data_referencia'], errors='coerce')
+    return df_estoque
+
+
+def unir_produtos_estoque(df_produtos, df_estoque, how='left'):
+    """
+    Faz o join entre produtos e estoque por produto_id e preenche com 0 a
+    quantidade e o mínimo dos produtos sem registro de estoque.
+    
+    Args:
+        df_produtos (pd.DataFrame): DataFrame de produtos
+        df_estoque (pd.DataFrame): DataFrame (ou bloco) de estoque
+        how (str): Tipo de join ('left' mantém todos os produtos)
+        
+    Returns:
+        pd.DataFrame: DataFrame unificado
+    """
     df_merged = pd.merge(
         df_produtos,
         df_estoque,
         on='produto_id',
-        how='left'  # Left join para manter todos os produtos, mesmo sem estoque
+        how=how
     )
     
     # Preencher valores NaN em quantidade_estoque e estoque_minimo com 0
     # para produtos que não têm registro de estoque
     df_merged['quantidade_estoque'] = df_merged['quantidade_estoque'].fillna(0).astype(int)
     df_merged['estoque_minimo'] = df_merged['estoque_minimo'].fillna(0).astype(int)
+    return df_merged
+
+
+def localizar_fontes(base_path='data', estoque=None):
+    """
+    Localiza o CSV de produtos e os arquivos de estoque: o par de arquivos
+    de base_path ou, com estoque informado, os fragmentos dessa origem.
+    
+    Args:
+        base_path (str): Caminho base onde estão os arquivos CSV
+        estoque (str): Pasta ou padrão glob dos fragmentos de estoque (opcional)
+        
+    Returns:
+        tuple: (caminho_produtos, lista de caminhos de estoque)
+    """
+    if estoque is None:
+        caminho_produtos, caminho_estoque = _localizar_arquivos(base_path)
+        return caminho_produtos, [caminho_estoque]
+    caminho_produtos, _ = _localizar_arquivos(base_path, exigir_estoque=False)
+    return caminho_produtos, localizar_fragmentos(estoque)
+
+
+def _ler_estoque(caminho_estoque):
+    """
+    Lê um CSV (ou fragmento) de estoque já com o esquema de tipos.
+    
+    Args:
+        caminho_estoque (str): Caminho do CSV de estoque
+        
+    Returns:
+        pd.DataFrame: DataFrame de estoque
+    """
+    return tipar_estoque(pd.read_csv(caminho_estoque, dtype=ESQUEMA_ESTOQUE))
+
+
+def _ler_e_unir(caminho_produtos, caminhos_estoque, max_workers=None):
+    """
+    Lê os CSVs de produtos e estoque e faz o join por produto_id.
+    
+    Vários arquivos de estoque (fragmentos) são lidos em paralelo e
+    concatenados antes do join, que acontece uma única vez.
+    
+    Args:
+        caminho_produtos (str): Caminho do CSV de produtos
+        caminhos_estoque (list): Caminhos dos CSVs de estoque
+        max_workers (int): Threads de leitura dos fragmentos (None = número de CPUs)
+        
+    Returns:
+        pd.DataFrame: DataFrame com dados unificados de produtos e estoque
+    """
+    # Carregar CSVs já com o esquema de tipos
+    df_produtos = ler_produtos(caminho_produtos)
+    if len(caminhos_estoque) == 1:
+        df_estoque = _ler_estoque(caminhos_estoque[0])
+    else:
+        df_estoque = carregar_fragmentos(caminhos_estoque, _ler_estoque, max_workers)
+    
+    # Left join para manter todos os produtos, mesmo sem estoque
+    df_merged = unir_produtos_estoque(df_produtos, df_estoque, how='left')
+    
+    # Ordenar por data (ordenação estável, datas inválidas no final) para que
+    # cada data ocupe uma faixa contínua de linhas (ver construir_indice_datas)
+    if 'data_referencia' in df_merged.columns:
+        df_merged = df_merged.sort_values(
+            'data_referencia', kind='stable', na_position='last'
+        ).reset_index(drop=True)
+    
+    # Reduzir colunas inteiras para a menor largura que comporta os valores
+    for coluna in COLUNAS_INTEIRAS:
+        if coluna in df_merged.columns and not df_merged[coluna].isna().any():
+            df_merged[coluna] = _reduzir_inteiro(df_merged[coluna])
+    
+    logger.info(
+        "Memória do DataFrame unificado: %.2f MB sem esquema -> %.2f MB com esquema",
+        estimar_memoria_sem_esquema(df_merged) / 1024 ** 2,
+        df_merged.memory_usage(deep=True).sum() / 1024 ** 2
+    )
+    
+    return df_merged
+
+
+def _reduzir_inteiro(serie):
+    """
+    Converte uma coluna inteira para o menor tipo que comporta o dobro do
+    maior valor absoluto, deixando folga para diferenças entre colunas
+    (ex.: estoque_minimo - quantidade_estoque) sem estouro.
+    
+    Args:
+        serie (pd.Series): Coluna inteira
+        
+    Returns:
+        pd.Series: Coluna convertida
+    """
+    if serie.empty:
+        return serie.astype(np.int32)
+    limite = 2 * int(max(abs(int(serie.min())), abs(int(serie.max()))))
+    for tipo in _TIPOS_INTEIROS:
+        if limite <= np.iinfo(tipo).max:
+            return serie.astype(tipo)
+    return serie.astype(np.int64)
+
+
+def estimar_memoria_sem_esquema(df):
+    """
+    Estima quantos bytes o DataFrame ocuparia com os tipos padrão do pandas
+    (texto e datas como objetos Python, números com 64 bits), sem precisar
+    materializar essa versão.
+    
+    Args:
+        df (pd.DataFrame): DataFrame com o esquema compacto aplicado
+        
+    Returns:
+        int: Estimativa de bytes
+    """
+    total = df.index.memory_usage()
+    for coluna in df.columns:
+        serie = df[coluna]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            # Ponteiro de 8 bytes por linha + objeto str por ocorrência
+            tamanhos = np.array([sys.getsizeof(str(c)) for c in serie.cat.categories], dtype=np.int64)
+            codigos = serie.cat.codes.to_numpy()
+            total += 8 * len(serie) + int(tamanhos[codigos[codigos >= 0]].sum())
+        elif pd.api.types.is_datetime64_any_dtype(serie):
+            # Data como texto 'AAAA-MM-DD'
+            total += (8 + sys.getsizeof('0000-00-00')) * len(serie)
+        elif pd.api.types.is_numeric_dtype(serie):
+            total += 8 * len(serie)
+        else:
+            total += int(serie.memory_usage(index=False, deep=True))
+    return int(total)
+
+
+def relatorio_memoria(df):
+    """
+    Retorna a memória ocupada por coluna, antes (estimada) e depois do esquema.
+    
+    Args:
+        df (pd.DataFrame): DataFrame com o esquema compacto aplicado
+        
+    Returns:
+        pd.DataFrame: Bytes por coluna com e sem esquema, e o tipo atual
+    """
+    linhas = []
+    for coluna in df.columns:
+        linhas.append({
+            'coluna': coluna,
+            'tipo': str(df[coluna].dtype),
+            'bytes_sem_esquema': estimar_memoria_sem_esquema(df[[coluna]]) - df.index.memory_usage(),
+            'bytes_com_esquema': int(df[coluna].memory_usage(index=False, deep=True)),
+        })
+    return pd.DataFrame(linhas)
+
+
+def carregar_dados(base_path='data', usar_snapshot=True, estoque=None, max_workers=None):
+    """
+    Carrega os dados dos CSVs e faz o join entre produtos e estoque.
+    
+    Quando existe um snapshot colunar (Parquet) válido ao lado dos CSVs, ele é
+    lido no lugar dos CSVs. O snapshot é regravado sempre que os arquivos de
+    origem mudam (tamanho, data de modificação ou conteúdo).
+    
+    O estoque pode vir fragmentado (um arquivo por loja e por dia): com
+    estoque informado, os fragmentos dessa pasta ou padrão glob são lidos em
+    paralelo, e apenas os que mudaram desde a última carga voltam a ser
+    lidos do CSV (ver utils.fragmentos).
+    
+    Args:
+        base_path (str): Caminho base onde estão os arquivos CSV
+        usar_snapshot (bool): Se True, lê/grava o snapshot colunar
+        estoque (str): Pasta ou padrão glob dos fragmentos de estoque (opcional)
+        max_workers (int): Threads de leitura dos fragmentos (None = número de CPUs)
+        
+    Returns:
+        pd.DataFrame: DataFrame com dados unificados de produtos e estoque
+    """
+    caminho_produtos, caminhos_estoque = localizar_fontes(base_path, estoque)
+    fontes = [caminho_produtos] + caminhos_estoque
+    
+    if usar_snapshot:
+        df_snapshot = carregar_snapshot(fontes)
+        if df_snapshot is not None:
+            return df_snapshot
+    
+    df_merged = _ler_e_unir(caminho_produtos, caminhos_estoque, max_workers)
+    
+    if usar_snapshot:
+        salvar_snapshot(df_merged, fontes)
     
     return df_merged
 
 
-def obter_categorias(df):
+def versao_dados(base_path='data', estoque=None):
+    """
+    Retorna um identificador da versão dos dados, derivado do nome, tamanho
+    e data de modificação dos CSVs de origem (sem ler o conteúdo). Muda
+    sempre que algum dos arquivos é substituído, incluído ou removido.
+    
+    Args:
+        base_path (str): Caminho base onde estão os arquivos CSV
+        estoque (str): Pasta ou padrão glob dos fragmentos de estoque (opcional)
+        
+    Returns:
+        str: Identificador curto da versão
+    """
+    caminho_produtos, caminhos_estoque = localizar_fontes(base_path, estoque)
+    assinaturas = [
+        calcular_assinatura(caminho, com_hash=False)
+        for caminho in [caminho_produtos] + caminhos_estoque
+    ]
+    conteudo = json.dumps(assinaturas, sort_keys=True).encode('utf-8')
+    return hashlib.sha1(conteudo).hexdigest()[:12]
+
+
+def obter_categorias(df, catalogo=None):
     """
     Retorna lista de categorias únicas ordenadas.
     
     Args:
         df (pd.DataFrame): DataFrame com dados de produtos
+        catalogo (CatalogoRecorte): Metadados já calculados do mesmo recorte (opcional)
         
     Returns:
         list: Lista de categorias únicas
     """
+    if catalogo is not None:
+        return list(catalogo.categorias)
     categorias = df['categoria'].unique().tolist()
     categorias.sort()
     return categorias
 
 
-def obter_marcas(df):
+def obter_marcas(df, catalogo=None):
     """
     Retorna lista de marcas únicas ordenadas.
     
     Args:
         df (pd.DataFrame): DataFrame com dados de produtos
+        catalogo (CatalogoRecorte): Metadados já calculados do mesmo recorte (opcional)
         
     Returns:
         list: Lista de marcas únicas
     """
+    if catalogo is not None:
+        return list(catalogo.marcas)
     marcas = df['marca'].dropna().unique().tolist()
     marcas.sort()
     return marcas
 
 
-def obter_localizacoes(df):
+def obter_localizacoes(df, catalogo=None):
     """
     Retorna lista de localizações únicas ordenadas.
     
     Args:
         df (pd.DataFrame): DataFrame com dados de produtos
+        catalogo (CatalogoRecorte): Metadados já calculados do mesmo recorte (opcional)
         
     Returns:
         list: Lista de localizações únicas
     """
+    if catalogo is not None:
+        return list(catalogo.localizacoes)
     localizacoes = df['localizacao'].dropna().unique().tolist()
     localizacoes.sort()
     return localizacoes
 
 
-def obter_datas_referencia(df):
+def _coluna_datas(df):
+    """
+    Retorna a coluna data_referencia como datetime64, convertendo apenas se
+    ela ainda não estiver tipada (o esquema de carregar_dados já a converte).
+    """
+    datas = df['data_referencia']
+    if pd.api.types.is_datetime64_any_dtype(datas):
+        return datas
+    return pd.to_datetime(datas, errors='coerce')
+
+
+def obter_datas_referencia(df, indice=None, catalogo=None):
     """
     Retorna lista de datas de referência únicas ordenadas.
     
     Args:
         df (pd.DataFrame): DataFrame com dados de produtos
+        indice (IndiceDatas): Índice de datas já construído (opcional)
+        catalogo (CatalogoDados): Catálogo já construído (opcional)
         
     Returns:
         list: Lista de datas de referência únicas
     """
+    if catalogo is not None:
+        return list(catalogo.datas)
+    if indice is not None:
+        return list(indice.datas)
     if 'data_referencia' in df.columns:
-        df_copy = df.copy()
-        df_copy['data_referencia'] = pd.to_datetime(df_copy['data_referencia'], errors='coerce')
-        datas = df_copy['data_referencia'].dropna().unique().tolist()
+        datas = _coluna_datas(df).dropna().unique().tolist()
         datas.sort()
         return datas
     return []
 
 
-def filtrar_por_data(df, data_selecionada=None):
+def filtrar_por_data(df, data_selecionada=None, indice=None):
     """
     Filtra o DataFrame por data de referência. Se nenhuma data for selecionada,
     retorna apenas os dados da data mais recente.
     
+    Com um índice de datas (construído sobre o mesmo DataFrame), a seleção é
+    um fatiamento posicional da partição, sem cópia e sem varrer as datas.
+    
     Args:
         df (pd.DataFrame): DataFrame com dados de produtos
         data_selecionada: Data a ser filtrada (None para usar a data mais recente)
+        indice (IndiceDatas): Índice de datas do DataFrame (opcional)
         
     Returns:
         pd.DataFrame: DataFrame filtrado
     """
+    if indice is not None:
+        inicio, fim = indice.faixa(data_selecionada)
+        return df.iloc[inicio:fim]
+    
     if 'data_referencia' not in df.columns:
         return df.copy()
     
-    df_copy = df.copy()
-    df_copy['data_referencia'] = pd.to_datetime(df_copy['data_referencia'], errors='coerce')
+    datas = _coluna_datas(df)
     
     if data_selecionada is None:
         # Se nenhuma data for selecionada, usar a data mais recente
-        data_mais_recente = df_copy['data_referencia'].max()
-        return df_copy[df_copy['data_referencia'] == data_mais_recente].copy()
+        data_mais_recente = datas.max()
+        df_data = df[datas == data_mais_recente].copy()
     else:
         data_selecionada_dt = pd.to_datetime(data_selecionada, errors='coerce')
-        return df_copy[df_copy['data_referencia'] == data_selecionada_dt].copy()
-
-
+        df_data = df[datas == data_selecionada_dt].copy()
+    
+    if not pd.api.types.is_datetime64_any_dtype(df_data['data_referencia']):
+        df_data['data_referencia'] = datas[df_data.index]
+    return df_data
@@ -0,0 +1,171 @@
+"""
+Módulo de exportação sob demanda (CSV, Parquet e XLSX), gravada em blocos
+"""
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+FORMATO_CSV = 'csv'
+FORMATO_PARQUET = 'parquet'
+FORMATO_XLSX = 'xlsx'
+
+# Extensão e tipo MIME de cada formato
+FORMATOS = {
+    FORMATO_CSV: ('.csv', 'text/csv'),
+    FORMATO_PARQUET: ('.parquet', 'application/vnd.apache.parquet'),
+    FORMATO_XLSX: ('.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+# Linhas serializadas por vez
+TAMANHO_BLOCO_EXPORTACAO = 50_000
+
+
+def _motor_xlsx():
+    """Retorna o nome da biblioteca disponível para gravar XLSX (ou None)"""
+    for modulo in ('xlsxwriter', 'openpyxl'):
+        try:
+            __import__(modulo)
+            return modulo
+        except ImportError:
+            continue
+    return None
+
+
+def formatos_disponiveis():
+    """
+    Retorna os formatos que podem ser exportados neste ambiente (XLSX
+    depende de xlsxwriter ou openpyxl estar instalado).
+
+    Returns:
+        list: Formatos disponíveis
+    """
+    formatos = [FORMATO_CSV, FORMATO_PARQUET]
+    if _motor_xlsx() is not None:
+        formatos.append(FORMATO_XLSX)
+    return formatos
+
+
+def _blocos(df, tamanho_bloco):
+    """Fatias consecutivas do DataFrame (sem cópia)"""
+    for inicio in range(0, len(df), tamanho_bloco):
+        yield df.iloc[inicio:inicio + tamanho_bloco]
+
+
+def _gravar_csv(df, destino, tamanho_bloco):
+    texto = io.TextIOWrapper(destino, encoding='utf-8-sig', newline='')
+    try:
+        for numero, bloco in enumerate(_blocos(df, tamanho_bloco)):
+            bloco.to_csv(texto, index=False, header=numero == 0)
+        if len(df) == 0:
+            df.to_csv(texto, index=False)
+        texto.flush()
+    finally:
+        # Desacoplar para não fechar o arquivo de destino junto com o wrapper
+        texto.detach()
+
+
+def _gravar_parquet(df, destino, tamanho_bloco):
+    # Esquema calculado uma vez, para que todos os blocos (row groups) tenham os mesmos tipos
+    esquema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(destino, esquema) as escritor:
+        for bloco in _blocos(df, tamanho_bloco):
+            escritor.write_table(pa.Table.from_pandas(bloco, schema=esquema, preserve_index=False))
+
+
+def _valores_planilha(bloco):
+    """Linhas do bloco como listas de valores aceitos pelas bibliotecas de XLSX"""
+    valores = bloco.astype(object)
+    valores = valores.where(bloco.notna(), None)
+    return valores.itertuples(index=False, name=None)
+
+
+def _gravar_xlsx(df, destino, tamanho_bloco):
+    motor = _motor_xlsx()
+    if motor is None:
+        raise ImportError("Exportar XLSX requer xlsxwriter ou openpyxl instalado")
+
+    colunas = [str(coluna) for coluna in df.columns]
+    if motor == 'xlsxwriter':
+        import xlsxwriter
+        # constant_memory grava cada linha no disco assim que ela é concluída
+        livro = xlsxwriter.Workbook(destino, {
+            'constant_memory': True,
+            'default_date_format': 'dd/mm/yyyy',
+        })
+        planilha = livro.add_worksheet('Estoque')
+        planilha.write_row(0, 0, colunas)
+        linha = 1
+        for bloco in _blocos(df, tamanho_bloco):
+            for valores in _valores_planilha(bloco):
+                planilha.write_row(linha, 0, valores)
+                linha += 1
+        livro.close()
+    else:
+        from openpyxl import Workbook
+        livro = Workbook(write_only=True)
+        planilha = livro.create_sheet('Estoque')
+        planilha.append(colunas)
+        for bloco in _blocos(df, tamanho_bloco):
+            for valores in _valores_planilha(bloco):
+                planilha.append(list(valores))
+        livro.save(destino)
+
+
+_GRAVADORES = {
+    FORMATO_CSV: _gravar_csv,
+    FORMATO_PARQUET: _gravar_parquet,
+    FORMATO_XLSX: _gravar_xlsx,
+}
+
+
+def exportar(df, formato, destino, tamanho_bloco=TAMANHO_BLOCO_EXPORTACAO):
+    """
+    Grava o DataFrame no formato escolhido, serializando um bloco de linhas
+    por vez (o arquivo inteiro nunca é montado como texto em memória).
+
+    Args:
+        df (pd.DataFrame): Dados a exportar
+        formato (str): 'csv', 'parquet' ou 'xlsx'
+        destino: Arquivo binário aberto para escrita
+        tamanho_bloco (int): Linhas serializadas por vez
+    """
+    if formato not in _GRAVADORES:
+        raise ValueError(f"Formato de exportação desconhecido: {formato}")
+    _GRAVADORES[formato](df, destino, tamanho_bloco)
+
+
+def gerar_arquivo(df, formato, tamanho_bloco=TAMANHO_BLOCO_EXPORTACAO):
+    """
+    Gera o conteúdo do arquivo de exportação.
+
+    Args:
+        df (pd.DataFrame): Dados a exportar
+        formato (str): 'csv', 'parquet' ou 'xlsx'
+        tamanho_bloco (int): Linhas serializadas por vez
+
+    Returns:
+        bytes: Conteúdo do arquivo
+    """
+    destino = io.BytesIO()
+    exportar(df, formato, destino, tamanho_bloco)
+    return destino.getvalue()
+
+
+def exportacao_sob_demanda(obter_df, formato, tamanho_bloco=TAMANHO_BLOCO_EXPORTACAO):
+    """
+    Retorna uma função sem argumentos que gera o arquivo apenas quando
+    chamada, no formato aceito por st.download_button(data=...): o
+    Streamlit só a executa quando o usuário clica em Download.
+
+    Args:
+        obter_df (callable): Função que retorna o DataFrame a exportar
+        formato (str): 'csv', 'parquet' ou 'xlsx'
+        tamanho_bloco (int): Linhas serializadas por vez
+
+    Returns:
+        callable: Função que gera e retorna o conteúdo do arquivo
+    """
+    def gerar():
+        return gerar_arquivo(obter_df(), formato, tamanho_bloco)
+    return gerar
@@ -0,0 +1,336 @@
+"""
+Módulo com o motor de filtros da sidebar (categoria, marca, localização e status)
+"""
+import numpy as np
+import pandas as pd
+
+from utils.busca import COLUNAS_BUSCA, MODO_CONTEM, IndiceBusca
+from utils.instrumentacao import INSTRUMENTACAO_DESATIVADA
+
+STATUS_TODOS = 'Todos'
+STATUS_ABAIXO = 'Abaixo do Mínimo'
+STATUS_ADEQUADO = 'Adequado'
+
+DIMENSOES_FILTRO = ['categoria', 'marca', 'localizacao']
+
+
+class _CodigosColuna:
+    """
+    Código de cada linha de uma coluna e a tabela de valores distintos, sem
+    índice invertido. Usado pelas colunas da busca por nome/SKU, que têm um
+    valor por produto: as posições das linhas saem de uma tabela booleana
+    indexada pelos códigos, sem um array de posições por valor.
+    """
+
+    def __init__(self, serie):
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            codigos = serie.cat.codes.to_numpy()
+            valores = serie.cat.categories
+        else:
+            codigos, valores = pd.factorize(serie, sort=True)
+
+        self.codigos = codigos.astype(np.int32, copy=False)
+        self.valores = valores if isinstance(valores, pd.Index) else pd.Index(valores)
+
+    @property
+    def n_valores(self):
+        """Quantidade de valores distintos da coluna"""
+        return len(self.valores)
+
+    def codigos_de(self, valores):
+        """Retorna os códigos dos valores informados (valores ausentes são ignorados)"""
+        codigos = self.valores.get_indexer(pd.Index(list(valores), dtype=self.valores.dtype))
+        return codigos[codigos >= 0].tolist()
+
+    def tabela(self, codigos):
+        """
+        Tabela booleana indexada por código, verdadeira nos códigos informados.
+        O código -1 (valor ausente) cai na última posição, sempre falsa.
+        """
+        tabela = np.zeros(self.n_valores + 1, dtype=bool)
+        tabela[codigos] = True
+        return tabela
+
+
+class _IndiceDimensao(_CodigosColuna):
+    """
+    Índice invertido de uma coluna: código de cada linha e, para cada valor,
+    o array (ordenado) das posições das linhas que têm esse valor.
+    """
+
+    def __init__(self, serie):
+        super().__init__(serie)
+
+        # Agrupar posições por código com uma única ordenação estável
+        ordem = np.argsort(self.codigos, kind='stable')
+        contagens = np.bincount(self.codigos[self.codigos >= 0], minlength=self.n_valores)
+        limites = np.concatenate(([0], np.cumsum(contagens)))
+        inicio_validos = int(np.count_nonzero(self.codigos < 0))
+        self.posicoes = [
+            ordem[inicio_validos + limites[i]:inicio_validos + limites[i + 1]]
+            for i in range(self.n_valores)
+        ]
+
+
+class MotorFiltros:
+    """
+    Motor de filtros pré-indexado sobre o DataFrame de uma data de referência.
+
+    Na construção, cada dimensão categórica ganha um índice invertido
+    (valor -> posições das linhas) e o status do estoque vira um array
+    booleano. Ao filtrar, apenas os filtros ativos são considerados: o mais
+    seletivo fornece as posições candidatas e os demais são verificados
+    somente nessas posições. O DataFrame resultante é materializado uma única
+    vez, no final. Filtros com vários valores (multi-seleção) custam o mesmo
+    que filtros com um único valor.
+
+    O preço unitário é mantido ordenado (argsort), de modo que uma faixa de
+    preço vira uma faixa contínua do índice, encontrada por busca binária.
+    As extremidades do índice fornecem os limites do slider de preço.
+
+    A busca por nome/SKU usa um índice de trigramas (IndiceBusca), que pode
+    ser construído uma única vez sobre o DataFrame completo e compartilhado
+    entre as datas.
+
+    Args:
+        df (pd.DataFrame): DataFrame da data de referência
+        indice_busca (IndiceBusca): Índice de busca compartilhado (opcional;
+            se omitido, é construído sobre o próprio df na primeira busca)
+    """
+
+    def __init__(self, df, indice_busca=None):
+        self.df = df
+        self.n_linhas = len(df)
+        self.dimensoes = {
+            coluna: _IndiceDimensao(df[coluna])
+            for coluna in DIMENSOES_FILTRO
+            if coluna in df.columns
+        }
+        # Colunas da busca têm um valor por produto: só os códigos das linhas
+        self.codigos_busca = {
+            coluna: _CodigosColuna(df[coluna])
+            for coluna in COLUNAS_BUSCA
+            if coluna in df.columns
+        }
+        self._indice_busca = indice_busca
+        quantidade = df['quantidade_estoque'].to_numpy()
+        minimo = df['estoque_minimo'].to_numpy()
+        self.abaixo_minimo = quantidade < minimo
+        self.posicoes_status = {
+            STATUS_ABAIXO: np.flatnonzero(self.abaixo_minimo),
+            STATUS_ADEQUADO: np.flatnonzero(~self.abaixo_minimo),
+        }
+
+        # Índice ordenado de preços (NaN ficam no final e nunca entram numa faixa)
+        if 'preco_unitario' in df.columns:
+            precos = df['preco_unitario'].to_numpy(dtype=np.float64)
+        else:
+            precos = np.empty(0, dtype=np.float64)
+        self.ordem_preco = np.argsort(precos, kind='stable')
+        self.precos_ordenados = precos[self.ordem_preco]
+        self.n_precos_validos = int(np.count_nonzero(~np.isnan(precos)))
+        # Posição de cada linha dentro do índice ordenado
+        self.posto_preco = np.empty(len(precos), dtype=np.int64)
+        self.posto_preco[self.ordem_preco] = np.arange(len(precos))
+
+    def limites_preco(self, padrao=(0.0, 1000.0)):
+        """
+        Retorna o menor e o maior preço unitário da data, lidos das
+        extremidades do índice ordenado.
+
+        Args:
+            padrao (tuple): Limites usados quando não há preços
+
+        Returns:
+            tuple: (preço mínimo, preço máximo)
+        """
+        if self.n_precos_validos == 0:
+            return padrao
+        return (
+            float(self.precos_ordenados[0]),
+            float(self.precos_ordenados[self.n_precos_validos - 1])
+        )
+
+    def faixa_preco(self, preco_min=None, preco_max=None):
+        """
+        Converte uma faixa de preço [preco_min, preco_max] na faixa [início, fim)
+        do índice ordenado de preços, por busca binária.
+
+        Args:
+            preco_min (float): Preço mínimo (None = sem limite inferior)
+            preco_max (float): Preço máximo (None = sem limite superior)
+
+        Returns:
+            tuple: (início, fim) no índice ordenado
+        """
+        validos = self.precos_ordenados[:self.n_precos_validos]
+        inicio = 0 if preco_min is None else int(np.searchsorted(validos, preco_min, side='left'))
+        fim = self.n_precos_validos if preco_max is None else int(np.searchsorted(validos, preco_max, side='right'))
+        return inicio, max(inicio, fim)
+
+    @property
+    def indice_busca(self):
+        """Índice de trigramas usado pela busca por nome/SKU"""
+        if self._indice_busca is None:
+            self._indice_busca = IndiceBusca.de_dataframe(self.df)
+        return self._indice_busca
+
+    def _restricao_busca(self, termo, modo):
+        """
+        Monta a restrição da busca textual: linhas cujo produto_nome ou sku
+        está entre os valores encontrados no índice de trigramas.
+        """
+        encontrados = self.indice_busca.buscar(termo, modo)
+        tabelas = []
+        for coluna, valores in encontrados.items():
+            if coluna not in self.codigos_busca:
+                continue
+            codigos_coluna = self.codigos_busca[coluna]
+            codigos = codigos_coluna.codigos_de(valores)
+            if codigos:
+                tabelas.append((codigos_coluna.codigos, codigos_coluna.tabela(codigos)))
+
+        if not tabelas:
+            return None
+
+        def verificar(pos):
+            mascara = np.zeros(len(pos), dtype=bool)
+            for codigos, tabela in tabelas:
+                mascara |= tabela[codigos[pos]]
+            return mascara
+
+        def gerar_posicoes():
+            mascara = np.zeros(self.n_linhas, dtype=bool)
+            for codigos, tabela in tabelas:
+                mascara |= tabela[codigos]
+            return np.flatnonzero(mascara)
+
+        # Sem índice invertido, o tamanho da restrição é estimado pela fração
+        # dos valores distintos que foram encontrados
+        fracao = min(1.0, sum(tabela[:-1].mean() for _, tabela in tabelas))
+        return int(fracao * self.n_linhas), gerar_posicoes, verificar, 'busca'
+
+    def _restricoes_ativas(self, selecoes, status, faixa_preco=None, busca=None,
+                           modo_busca=MODO_CONTEM):
+        """
+        Monta a lista de restrições ativas como (tamanho, gerador, verificador,
+        nome): o gerador devolve as posições que atendem à restrição e o
+        verificador recebe posições candidatas e devolve a máscara das que passam.
+        """
+        restricoes = []
+        for coluna, valores in selecoes.items():
+            if not valores or coluna not in self.dimensoes:
+                continue
+            indice = self.dimensoes[coluna]
+            codigos = indice.codigos_de(valores)
+            if not codigos:
+                # Nenhum dos valores existe nesta data: resultado vazio
+                return None
+            tabela = indice.tabela(codigos)
+            tamanho = sum(len(indice.posicoes[c]) for c in codigos)
+            restricoes.append((
+                tamanho,
+                lambda indice=indice, codigos=codigos: np.sort(
+                    np.concatenate([indice.posicoes[c] for c in codigos])
+                ),
+                # Código -1 (valor ausente) cai na última posição da tabela (False)
+                lambda pos, indice=indice, tabela=tabela: tabela[indice.codigos[pos]],
+                coluna,
+            ))
+
+        if status in self.posicoes_status:
+            posicoes = self.posicoes_status[status]
+            esperado = status == STATUS_ABAIXO
+            restricoes.append((
+                len(posicoes),
+                lambda posicoes=posicoes: posicoes,
+                lambda pos, esperado=esperado: self.abaixo_minimo[pos] == esperado,
+                'status',
+            ))
+
+        if faixa_preco is not None:
+            inicio, fim = self.faixa_preco(*faixa_preco)
+            # Faixa cobrindo todas as linhas não restringe nada
+            if inicio > 0 or fim < self.n_linhas:
+                restricoes.append((
+                    fim - inicio,
+                    lambda inicio=inicio, fim=fim: np.sort(self.ordem_preco[inicio:fim]),
+                    lambda pos, inicio=inicio, fim=fim: (
+                        (self.posto_preco[pos] >= inicio) & (self.posto_preco[pos] < fim)
+                    ),
+                    'faixa_preco',
+                ))
+
+        if busca and busca.strip():
+            restricao = self._restricao_busca(busca, modo_busca)
+            if restricao is None:
+                return None
+            restricoes.append(restricao)
+        return restricoes
+
+    def filtrar(self, categorias=None, marcas=None, localizacoes=None, status=STATUS_TODOS,
+                faixa_preco=None, busca=None, modo_busca=MODO_CONTEM, instrumentacao=None):
+        """
+        Retorna as posições (ordenadas) das linhas que atendem aos filtros.
+
+        Args:
+            categorias (list): Categorias aceitas (vazio/None = todas)
+            marcas (list): Marcas aceitas (vazio/None = todas)
+            localizacoes (list): Localizações aceitas (vazio/None = todas)
+            status (str): 'Todos', 'Abaixo do Mínimo' ou 'Adequado'
+            faixa_preco (tuple): (preço mínimo, preço máximo), inclusiva (None = todos)
+            busca (str): Texto buscado em produto_nome e sku (vazio = todos)
+            modo_busca (str): 'contem', 'prefixo' ou 'aproximado' (ver IndiceBusca)
+            instrumentacao (Instrumentacao): Registra cada filtro aplicado como
+                uma etapa, com as linhas de entrada e saída (opcional)
+
+        Returns:
+            np.ndarray: Posições das linhas selecionadas
+        """
+        if instrumentacao is None:
+            instrumentacao = INSTRUMENTACAO_DESATIVADA
+        selecoes = {
+            'categoria': categorias,
+            'marca': marcas,
+            'localizacao': localizacoes,
+        }
+        restricoes = self._restricoes_ativas(selecoes, status, faixa_preco, busca, modo_busca)
+        if restricoes is None:
+            return np.empty(0, dtype=np.int64)
+        if not restricoes:
+            return np.arange(self.n_linhas)
+
+        # Começar pela restrição mais seletiva e verificar as demais só nos candidatos
+        restricoes.sort(key=lambda r: r[0])
+        _, gerar_posicoes, _, nome = restricoes[0]
+        with instrumentacao.etapa(f"filtro:{nome}", self.n_linhas) as medicao:
+            posicoes = gerar_posicoes()
+            medicao.linhas_saida = len(posicoes)
+        for _, _, verificar, nome in restricoes[1:]:
+            if len(posicoes) == 0:
+                break
+            with instrumentacao.etapa(f"filtro:{nome}", len(posicoes)) as medicao:
+                posicoes = posicoes[verificar(posicoes)]
+                medicao.linhas_saida = len(posicoes)
+        return posicoes
+
+    def materializar(self, posicoes):
+        """
+        Retorna o DataFrame com as linhas das posições informadas.
+
+        Args:
+            posicoes (np.ndarray): Posições retornadas por filtrar()
+
+        Returns:
+            pd.DataFrame: DataFrame filtrado
+        """
+        if len(posicoes) == self.n_linhas:
+            return self.df
+        # Posições contíguas viram um fatiamento, que é uma visão sem cópia
+        if len(posicoes) and posicoes[-1] - posicoes[0] + 1 == len(posicoes):
+            return self.df.iloc[posicoes[0]:posicoes[-1] + 1]
+        return self.df.iloc[posicoes]
+
+    def aplicar(self, **filtros):
+        """Filtra e materializa o DataFrame resultante (ver filtrar())"""
+        return self.materializar(self.filtrar(**filtros))
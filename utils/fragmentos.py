@@ -0,0 +1,186 @@
+"""
+Módulo para a ingestão paralela do estoque fragmentado (um CSV por loja e por dia)
+"""
+import glob
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.snapshot import _fonte_inalterada, calcular_assinatura
+
+logger = logging.getLogger(__name__)
+
+# Variável de ambiente com a pasta (ou padrão glob) dos fragmentos de estoque
+VARIAVEL_FRAGMENTOS = 'DASHBOARD_ESTOQUE'
+
+# Prefixo (sem diferenciar maiúsculas) dos fragmentos procurados em uma pasta
+PREFIXO_FRAGMENTO = 'fcd_estoque'
+
+# Pasta, ao lado dos fragmentos, com a cópia Parquet de cada fragmento já lido
+PASTA_CACHE_FRAGMENTOS = '.fcd_fragmentos'
+
+# Incrementar sempre que o formato dos fragmentos lidos mudar
+VERSAO_CACHE_FRAGMENTOS = 1
+
+_CHAVE_METADADOS = b'fcd_fragmento'
+
+
+def obter_fragmentos_configurados():
+    """
+    Retorna a pasta (ou padrão glob) dos fragmentos de estoque definida na
+    variável de ambiente DASHBOARD_ESTOQUE, ou None quando o estoque vem de
+    um único arquivo.
+
+    Returns:
+        str ou None: Origem dos fragmentos
+    """
+    origem = os.environ.get(VARIAVEL_FRAGMENTOS, '').strip()
+    return origem or None
+
+
+def localizar_fragmentos(origem):
+    """
+    Lista os fragmentos de estoque de uma pasta (arquivos FCD_estoque*.csv,
+    sem diferenciar maiúsculas) ou de um padrão glob.
+
+    Args:
+        origem (str): Pasta ou padrão glob (ex.: 'data/estoque/*/FCD_estoque_*.csv')
+
+    Returns:
+        list: Caminhos dos fragmentos, em ordem alfabética
+    """
+    if os.path.isdir(origem):
+        caminhos = [
+            os.path.join(origem, nome) for nome in os.listdir(origem)
+            if nome.lower().startswith(PREFIXO_FRAGMENTO) and nome.lower().endswith('.csv')
+        ]
+    else:
+        caminhos = [c for c in glob.glob(origem, recursive=True) if os.path.isfile(c)]
+
+    if not caminhos:
+        raise FileNotFoundError(
+            f"Nenhum fragmento de estoque encontrado em '{origem}'.\n"
+            f"Informe uma pasta com arquivos FCD_estoque*.csv ou um padrão glob."
+        )
+    return sorted(caminhos)
+
+
+def _caminho_cache(caminho):
+    """Caminho da cópia Parquet de um fragmento"""
+    pasta, nome = os.path.split(os.path.abspath(caminho))
+    return os.path.join(pasta, PASTA_CACHE_FRAGMENTOS, f"{nome}.parquet")
+
+
+def _ler_cache(caminho):
+    """Lê a cópia Parquet do fragmento, se ainda corresponder ao arquivo de origem"""
+    caminho_cache = _caminho_cache(caminho)
+    if not os.path.exists(caminho_cache):
+        return None
+    try:
+        metadados = pq.read_schema(caminho_cache).metadata or {}
+        info = json.loads(metadados.get(_CHAVE_METADADOS, b'{}'))
+        if info.get('versao') != VERSAO_CACHE_FRAGMENTOS:
+            return None
+        if not _fonte_inalterada(caminho, info.get('fonte', {})):
+            return None
+        return pq.read_table(caminho_cache).to_pandas()
+    except Exception as e:
+        logger.warning("Cache do fragmento %s ignorado: %s", caminho, e)
+        return None
+
+
+def _gravar_cache(caminho, df):
+    """Grava (de forma atômica) a cópia Parquet do fragmento; falhas são só registradas"""
+    caminho_cache = _caminho_cache(caminho)
+    caminho_tmp = f"{caminho_cache}.{os.getpid()}.{id(df)}.tmp"
+    try:
+        os.makedirs(os.path.dirname(caminho_cache), exist_ok=True)
+        info = {'versao': VERSAO_CACHE_FRAGMENTOS, 'fonte': calcular_assinatura(caminho)}
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        metadados = dict(tabela.schema.metadata or {})
+        metadados[_CHAVE_METADADOS] = json.dumps(info).encode('utf-8')
+        pq.write_table(tabela.replace_schema_metadata(metadados), caminho_tmp)
+        os.replace(caminho_tmp, caminho_cache)
+    except Exception as e:
+        logger.warning("Não foi possível gravar o cache do fragmento %s: %s", caminho, e)
+        try:
+            if os.path.exists(caminho_tmp):
+                os.remove(caminho_tmp)
+        except OSError:
+            pass
+
+
+def _carregar_fragmento(caminho, ler_fragmento, usar_cache):
+    """Lê um fragmento (do cache, quando inalterado) e informa se ele foi relido"""
+    if usar_cache:
+        df = _ler_cache(caminho)
+        if df is not None:
+            return df, False
+    df = ler_fragmento(caminho)
+    if usar_cache:
+        _gravar_cache(caminho, df)
+    return df, True
+
+
+def _unificar_categorias(partes):
+    """
+    Converte as colunas categóricas das partes para um mesmo conjunto de
+    categorias (a união ordenada), para que a concatenação continue
+    categórica em vez de virar texto.
+    """
+    colunas = [
+        coluna for coluna in partes[0].columns
+        if isinstance(partes[0][coluna].dtype, pd.CategoricalDtype)
+    ]
+    for coluna in colunas:
+        categorias = pd.Index([])
+        for parte in partes:
+            if coluna in parte.columns:
+                categorias = categorias.union(parte[coluna].astype('category').cat.categories)
+        tipo = pd.CategoricalDtype(categorias.sort_values())
+        for parte in partes:
+            if coluna in parte.columns:
+                parte[coluna] = parte[coluna].astype(tipo)
+    return partes
+
+
+def carregar_fragmentos(caminhos, ler_fragmento, max_workers=None, usar_cache=True):
+    """
+    Lê os fragmentos de estoque em paralelo e os concatena em um único
+    DataFrame, com os mesmos tipos em todas as partes.
+
+    A leitura usa um pool de threads (o parser de CSV do pandas e a leitura
+    Parquet liberam o GIL na maior parte do trabalho), com no máximo um
+    fragmento por núcleo em andamento, de modo que o tempo acompanha o
+    número de núcleos e não o de fragmentos. Cada fragmento lido é guardado
+    em Parquet; nas cargas seguintes só os fragmentos alterados (assinatura
+    diferente) voltam a ser lidos do CSV.
+
+    Args:
+        caminhos (list): Caminhos dos fragmentos (ver localizar_fragmentos)
+        ler_fragmento (callable): Função que lê um fragmento e retorna o DataFrame tipado
+        max_workers (int): Threads de leitura (None = número de CPUs)
+        usar_cache (bool): Se True, lê/grava a cópia Parquet de cada fragmento
+
+    Returns:
+        pd.DataFrame: Fragmentos concatenados, na ordem de caminhos
+    """
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(caminhos)))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        resultados = list(pool.map(
+            lambda caminho: _carregar_fragmento(caminho, ler_fragmento, usar_cache), caminhos
+        ))
+
+    relidos = sum(relido for _, relido in resultados)
+    logger.info(
+        "Fragmentos de estoque: %d lidos do CSV, %d reaproveitados do cache",
+        relidos, len(resultados) - relidos
+    )
+
+    partes = _unificar_categorias([df for df, _ in resultados])
+    return pd.concat(partes, ignore_index=True)
@@ -0,0 +1,178 @@
+"""
+Módulo com a instrumentação leve dos caminhos críticos do dashboard (tempo, linhas e memória por etapa)
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+import tracemalloc
+import weakref
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Variável de ambiente com a fração das execuções que medem memória (0 a 1).
+# Desligado por padrão: o tracemalloc vale para o processo inteiro e deixa
+# todas as sessões do servidor mais lentas enquanto está ligado
+VARIAVEL_AMOSTRAGEM = 'DASHBOARD_AMOSTRAGEM_MEMORIA'
+AMOSTRAGEM_PADRAO = 0.0
+
+# O tracemalloc vale para o processo inteiro: só uma execução por vez mede
+# memória, já que reset_peak() de uma zeraria o pico da outra e as alocações
+# de uma contariam na outra. O contador é 0 ou 1 (execução amostrada em
+# andamento)
+_trava_tracemalloc = threading.Lock()
+_usuarios_tracemalloc = 0
+
+
+def _iniciar_tracemalloc():
+    """
+    Liga o tracemalloc para uma execução amostrada. Retorna False, sem ligar,
+    se outra execução já está medindo ou se o tracemalloc já foi ligado por
+    outro código.
+    """
+    global _usuarios_tracemalloc
+    with _trava_tracemalloc:
+        if _usuarios_tracemalloc > 0 or tracemalloc.is_tracing():
+            return False
+        tracemalloc.start()
+        _usuarios_tracemalloc += 1
+        return True
+
+
+def _parar_tracemalloc():
+    global _usuarios_tracemalloc
+    with _trava_tracemalloc:
+        _usuarios_tracemalloc -= 1
+        if _usuarios_tracemalloc == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def taxa_amostragem_configurada():
+    """Retorna a fração de execuções com medição de memória (DASHBOARD_AMOSTRAGEM_MEMORIA)"""
+    try:
+        taxa = float(os.environ.get(VARIAVEL_AMOSTRAGEM, AMOSTRAGEM_PADRAO))
+    except ValueError:
+        return AMOSTRAGEM_PADRAO
+    return min(max(taxa, 0.0), 1.0)
+
+
+@dataclass
+class MedicaoEtapa:
+    """
+    Medição de uma etapa registrada por Instrumentacao.etapa().
+
+    Attributes:
+        nome (str): Nome da etapa
+        ms (float): Tempo de parede em milissegundos
+        linhas_entrada (int): Linhas recebidas pela etapa (None = não se aplica)
+        linhas_saida (int): Linhas produzidas pela etapa (None = não se aplica)
+        bytes_alocados (int): Pico de memória alocada na etapa (None = execução não amostrada)
+    """
+    nome: str
+    ms: float = 0.0
+    linhas_entrada: int = None
+    linhas_saida: int = None
+    bytes_alocados: int = None
+
+
+class Instrumentacao:
+    """
+    Registro das etapas de uma execução (rerun) do dashboard.
+
+    Cada etapa custa duas leituras de relógio e um append, então a
+    instrumentação pode ficar sempre ligada. A memória é medida com
+    tracemalloc, que deixa o processo inteiro sensivelmente mais lento; por
+    isso a medição é opcional (taxa_amostragem, 0 por padrão) e, nas
+    execuções não amostradas, bytes_alocados fica None.
+
+    A memória medida é a do processo inteiro: alocações feitas por outras
+    threads (outras sessões) durante a etapa também são contadas. Para não
+    corromper medições simultâneas, só uma execução por vez mede memória;
+    uma execução amostrada enquanto outra mede segue apenas com os tempos.
+    As etapas não devem ser aninhadas quando a memória é medida (cada etapa
+    zera o pico do tracemalloc).
+
+    Args:
+        taxa_amostragem (float): Fração das execuções que medem memória
+            (None = valor de DASHBOARD_AMOSTRAGEM_MEMORIA)
+        ativa (bool): Se False, etapa() não registra nada
+    """
+
+    def __init__(self, taxa_amostragem=None, ativa=True):
+        if taxa_amostragem is None:
+            taxa_amostragem = taxa_amostragem_configurada()
+        self.ativa = ativa
+        self.etapas = []
+        self.mede_memoria = (
+            ativa and random.random() < taxa_amostragem and _iniciar_tracemalloc()
+        )
+        self._liberar = None
+        if self.mede_memoria:
+            # Garante a liberação mesmo se a execução for interrompida antes de finalizar()
+            self._liberar = weakref.finalize(self, _parar_tracemalloc)
+
+    @contextmanager
+    def etapa(self, nome, linhas_entrada=None):
+        """
+        Mede o bloco como uma etapa. O objeto retornado permite informar as
+        linhas de saída ao final do bloco (medicao.linhas_saida = ...).
+
+        Args:
+            nome (str): Nome da etapa
+            linhas_entrada (int): Linhas recebidas pela etapa (opcional)
+
+        Yields:
+            MedicaoEtapa: Medição em andamento
+        """
+        medicao = MedicaoEtapa(nome, linhas_entrada=linhas_entrada)
+        if not self.ativa:
+            yield medicao
+            return
+
+        if self.mede_memoria:
+            tracemalloc.reset_peak()
+            memoria_inicial = tracemalloc.get_traced_memory()[0]
+        inicio = time.perf_counter()
+        try:
+            yield medicao
+        finally:
+            medicao.ms = (time.perf_counter() - inicio) * 1000
+            if self.mede_memoria:
+                medicao.bytes_alocados = max(tracemalloc.get_traced_memory()[1] - memoria_inicial, 0)
+            self.etapas.append(medicao)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(json.dumps({'evento': 'etapa', **asdict(medicao)}, ensure_ascii=False))
+
+    def finalizar(self):
+        """Encerra a execução, liberando o tracemalloc se ele foi ligado"""
+        if self.mede_memoria:
+            self.mede_memoria = False
+            self._liberar()
+
+    @property
+    def total_ms(self):
+        """Tempo total das etapas registradas, em milissegundos"""
+        return sum(medicao.ms for medicao in self.etapas)
+
+    def resumo(self):
+        """
+        Retorna as etapas registradas como DataFrame.
+
+        Returns:
+            pd.DataFrame: Uma linha por etapa, na ordem de execução
+        """
+        return pd.DataFrame(
+            [asdict(medicao) for medicao in self.etapas],
+            columns=['nome', 'ms', 'linhas_entrada', 'linhas_saida', 'bytes_alocados']
+        ).astype({'ms': 'float64', 'linhas_entrada': 'Int64', 'linhas_saida': 'Int64',
+                  'bytes_alocados': 'Int64'})
+
+
+# Instância sem efeito, usada quando nenhuma instrumentação é informada
+INSTRUMENTACAO_DESATIVADA = Instrumentacao(taxa_amostragem=0.0, ativa=False)
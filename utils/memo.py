@@ -0,0 +1,139 @@
+"""
+Módulo com o cache LRU dos resultados de filtro, compartilhado entre sessões
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from utils.busca import normalizar_texto
+from utils.filtros import STATUS_TODOS
+
+CAPACIDADE_PADRAO = 256
+
+
+def normalizar_filtros(data=None, categorias=None, marcas=None, localizacoes=None,
+                       status=STATUS_TODOS, faixa_preco=None, busca=None, modo_busca=None):
+    """
+    Monta a tupla normalizada de uma combinação de filtros: seleções
+    ordenadas, faixa de preço como floats e termo de busca normalizado
+    (o modo de busca só entra quando há termo). Combinações equivalentes
+    geram a mesma tupla.
+
+    Args:
+        data: Data de referência (texto exibido na sidebar ou Timestamp)
+        categorias, marcas, localizacoes (list): Seleções (vazio/None = todas)
+        status (str): Status do estoque
+        faixa_preco (tuple): (preço mínimo, preço máximo)
+        busca (str): Termo buscado
+        modo_busca (str): Modo da busca
+
+    Returns:
+        tuple: Chave normalizada
+    """
+    termo = normalizar_texto(busca) if busca else ''
+    return (
+        data,
+        tuple(sorted(categorias or ())),
+        tuple(sorted(marcas or ())),
+        tuple(sorted(localizacoes or ())),
+        status,
+        None if faixa_preco is None else (float(faixa_preco[0]), float(faixa_preco[1])),
+        termo,
+        modo_busca if termo else None,
+    )
+
+
+@dataclass
+class ResultadoFiltro:
+    """
+    Resultado memorizado de uma combinação de filtros.
+
+    Attributes:
+        posicoes (np.ndarray): Posições das linhas no DataFrame da data
+            (None no backend SQL, que não mantém as linhas em memória)
+        kpis (ResultadoKPIs): Indicadores do recorte
+    """
+    posicoes: np.ndarray
+    kpis: object
+
+
+class CacheFiltros:
+    """
+    Cache LRU limitado, seguro entre threads, para os resultados de filtro.
+
+    A chave é (versão dos dados,) + normalizar_filtros(...), então uma nova
+    versão dos dados nunca reaproveita resultados antigos; as entradas
+    antigas simplesmente saem do cache por LRU. São guardadas apenas as
+    posições das linhas e os indicadores, nunca cópias do DataFrame.
+
+    Args:
+        capacidade (int): Número máximo de combinações mantidas
+    """
+
+    def __init__(self, capacidade=CAPACIDADE_PADRAO):
+        self.capacidade = capacidade
+        self._entradas = OrderedDict()
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def obter(self, chave):
+        """
+        Retorna o resultado da chave (marcando-o como o mais recente) ou None.
+
+        Args:
+            chave (tuple): Chave da combinação de filtros
+
+        Returns:
+            ResultadoFiltro ou None
+        """
+        with self._trava:
+            resultado = self._entradas.get(chave)
+            if resultado is None:
+                self.falhas += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return resultado
+
+    def guardar(self, chave, resultado):
+        """
+        Guarda o resultado, descartando a combinação usada há mais tempo
+        quando a capacidade é excedida.
+
+        Args:
+            chave (tuple): Chave da combinação de filtros
+            resultado (ResultadoFiltro): Resultado a memorizar
+        """
+        with self._trava:
+            self._entradas[chave] = resultado
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.capacidade:
+                self._entradas.popitem(last=False)
+
+    def limpar(self):
+        """Remove todas as entradas (os contadores são mantidos)"""
+        with self._trava:
+            self._entradas.clear()
+
+    def estatisticas(self):
+        """
+        Retorna os contadores do cache.
+
+        Returns:
+            dict: acertos, falhas, taxa de acerto, tamanho e capacidade
+        """
+        with self._trava:
+            consultas = self.acertos + self.falhas
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+                'tamanho': len(self._entradas),
+                'capacidade': self.capacidade,
+            }
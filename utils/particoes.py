@@ -0,0 +1,87 @@
+"""
+Módulo com o índice de partições por data de referência
+"""
+import numpy as np
+import pandas as pd
+
+
+class IndiceDatas:
+    """
+    Índice das partições de um DataFrame ordenado por data_referencia.
+
+    Cada data distinta é mapeada para a faixa contínua de linhas [início, fim)
+    que ela ocupa, de modo que selecionar uma data é um fatiamento posicional
+    (sem varrer a coluna de datas nem copiar o DataFrame).
+
+    Attributes:
+        datas (list): Datas de referência distintas, em ordem crescente
+        faixas (dict): Mapeamento data -> (início, fim)
+    """
+
+    def __init__(self, datas, inicios, fins):
+        self.datas = [pd.Timestamp(d) for d in datas]
+        self.faixas = {
+            data: (int(inicio), int(fim))
+            for data, inicio, fim in zip(self.datas, inicios, fins)
+        }
+
+    def __len__(self):
+        return len(self.datas)
+
+    @property
+    def data_mais_recente(self):
+        """Retorna a última data de referência (ou None se não houver datas)"""
+        return self.datas[-1] if self.datas else None
+
+    def faixa(self, data=None):
+        """
+        Retorna a faixa de linhas de uma data.
+
+        Args:
+            data: Data desejada (None para usar a data mais recente)
+
+        Returns:
+            tuple: (início, fim); (0, 0) se a data não existir
+        """
+        if data is None:
+            data = self.data_mais_recente
+        if data is None:
+            return (0, 0)
+        data = pd.to_datetime(data, errors='coerce')
+        if pd.isna(data):
+            return (0, 0)
+        return self.faixas.get(data, (0, 0))
+
+
+def construir_indice_datas(df):
+    """
+    Constrói o índice de partições por data. O DataFrame precisa estar
+    ordenado por data_referencia (como retornado por carregar_dados), com
+    eventuais datas inválidas (NaT) no final.
+
+    Args:
+        df (pd.DataFrame): DataFrame ordenado por data_referencia
+
+    Returns:
+        IndiceDatas: Índice com a faixa de linhas de cada data
+    """
+    if 'data_referencia' not in df.columns or df.empty:
+        return IndiceDatas([], [], [])
+
+    datas = df['data_referencia'].to_numpy(dtype='datetime64[ns]')
+    validas = datas[~np.isnat(datas)]
+
+    if np.isnat(datas[:len(validas)]).any() or (np.diff(validas.view(np.int64)) < 0).any():
+        raise ValueError(
+            "O DataFrame precisa estar ordenado por data_referencia para construir o índice de datas."
+        )
+
+    if len(validas) == 0:
+        return IndiceDatas([], [], [])
+
+    # Posições onde a data muda marcam o início de cada partição
+    mudancas = np.flatnonzero(validas[1:] != validas[:-1]) + 1
+    inicios = np.concatenate(([0], mudancas))
+    fins = np.concatenate((mudancas, [len(validas)]))
+
+    return IndiceDatas(validas[inicios], inicios, fins)
@@ -0,0 +1,164 @@
+"""
+Relatório em lote (sem Streamlit) com os indicadores de todas as datas de referência
+
+Uso:
+    python -m utils.relatorio --saida relatorio.parquet
+    python -m utils.relatorio --saida relatorio.csv --por-loja --processos 8
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+
+import pandas as pd
+
+from utils.calculations import calcular_kpis
+from utils.data_loader import carregar_dados, construir_indice_datas
+
+# Indicadores do ResultadoKPIs gravados no relatório (a máscara por linha fica de fora)
+COLUNAS_KPIS = [
+    'total_linhas', 'total_produtos_unicos', 'produtos_abaixo_minimo',
+    'percentual_alerta', 'valor_total', 'deficit_total', 'valor_reposicao',
+]
+
+DIMENSOES_RELATORIO = ['categoria', 'localizacao']
+
+# Recorte "todas as lojas" quando o relatório não é separado por loja
+TODAS_AS_LOJAS = 'Todas'
+
+
+def _linha_kpis(df, **chaves):
+    """Calcula os indicadores de um recorte e devolve a linha do relatório"""
+    kpis = asdict(calcular_kpis(df))
+    return {**chaves, **{coluna: kpis[coluna] for coluna in COLUNAS_KPIS}}
+
+
+def calcular_relatorio_data(df_data, por_loja=False):
+    """
+    Calcula os indicadores de uma data: o total e a quebra por categoria e
+    por localização, opcionalmente separados por loja (localização).
+
+    Args:
+        df_data (pd.DataFrame): Linhas de uma única data de referência
+        por_loja (bool): Se True, repete o cálculo para cada localização
+
+    Returns:
+        list: Linhas do relatório (dicionários)
+    """
+    data = df_data['data_referencia'].iloc[0]
+    if por_loja and 'localizacao' in df_data.columns:
+        recortes = df_data.groupby('localizacao', observed=True, sort=True)
+    else:
+        recortes = [(TODAS_AS_LOJAS, df_data)]
+
+    linhas = []
+    for loja, df_loja in recortes:
+        base = {'data_referencia': data, 'loja': loja}
+        linhas.append(_linha_kpis(df_loja, **base, dimensao='total', valor=''))
+        for dimensao in DIMENSOES_RELATORIO:
+            if dimensao not in df_loja.columns or (por_loja and dimensao == 'localizacao'):
+                continue
+            for valor, grupo in df_loja.groupby(dimensao, observed=True, sort=True):
+                linhas.append(_linha_kpis(grupo, **base, dimensao=dimensao, valor=valor))
+    return linhas
+
+
+def _calcular_lote(fatias, por_loja):
+    """Processa um lote de datas (executado em um processo do pool)"""
+    linhas = []
+    for df_data in fatias:
+        linhas.extend(calcular_relatorio_data(df_data, por_loja))
+    return linhas
+
+
+def gerar_relatorio(df, por_loja=False, processos=None):
+    """
+    Calcula o relatório de todas as datas de referência em paralelo.
+
+    As datas são divididas em lotes (algumas por processo) para diluir o
+    custo de enviar os dados a cada processo; cada lote recebe apenas as
+    fatias das suas datas, obtidas pelo índice de datas sem copiar o
+    DataFrame inteiro.
+
+    Args:
+        df (pd.DataFrame): DataFrame retornado por carregar_dados()
+        por_loja (bool): Se True, separa os indicadores por loja (localização)
+        processos (int): Processos do pool (None = número de CPUs; 1 = sem pool)
+
+    Returns:
+        pd.DataFrame: Relatório consolidado, ordenado por data
+    """
+    indice = construir_indice_datas(df)
+    fatias = []
+    for data in indice.datas:
+        inicio, fim = indice.faixa(data)
+        fatias.append(df.iloc[inicio:fim])
+
+    processos = processos or os.cpu_count() or 1
+    processos = max(1, min(processos, len(fatias)))
+    if processos == 1:
+        linhas = _calcular_lote(fatias, por_loja)
+    else:
+        n_lotes = processos * 4
+        lotes = [fatias[i::n_lotes] for i in range(n_lotes) if fatias[i::n_lotes]]
+        linhas = []
+        with ProcessPoolExecutor(max_workers=processos) as pool:
+            for resultado in pool.map(_calcular_lote, lotes, [por_loja] * len(lotes)):
+                linhas.extend(resultado)
+
+    relatorio = pd.DataFrame(
+        linhas,
+        columns=['data_referencia', 'loja', 'dimensao', 'valor'] + COLUNAS_KPIS
+    )
+    ordem_dimensao = {'total': 0, **{d: i + 1 for i, d in enumerate(DIMENSOES_RELATORIO)}}
+    relatorio = relatorio.sort_values(
+        ['data_referencia', 'loja', 'dimensao', 'valor'],
+        key=lambda coluna: coluna.map(ordem_dimensao) if coluna.name == 'dimensao' else coluna,
+        kind='stable'
+    ).reset_index(drop=True)
+    for coluna in ['loja', 'dimensao', 'valor']:
+        relatorio[coluna] = relatorio[coluna].astype(str)
+    return relatorio
+
+
+def gravar_relatorio(relatorio, caminho):
+    """
+    Grava o relatório em Parquet ou CSV, conforme a extensão do arquivo.
+
+    Args:
+        relatorio (pd.DataFrame): Relatório de gerar_relatorio()
+        caminho (str): Arquivo de saída (.parquet ou .csv)
+    """
+    pasta = os.path.dirname(os.path.abspath(caminho))
+    os.makedirs(pasta, exist_ok=True)
+    if caminho.lower().endswith('.parquet'):
+        relatorio.to_parquet(caminho, index=False)
+    else:
+        relatorio.to_csv(caminho, index=False, encoding='utf-8-sig')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Relatório de indicadores do estoque para todas as datas de referência"
+    )
+    parser.add_argument('--dados', default='data', help="Pasta dos CSVs (padrão: data)")
+    parser.add_argument('--estoque', default=None,
+                        help="Pasta ou padrão glob dos fragmentos de estoque (um CSV por loja/dia)")
+    parser.add_argument('--saida', default='relatorio_estoque.parquet',
+                        help="Arquivo de saída, .parquet ou .csv")
+    parser.add_argument('--por-loja', action='store_true',
+                        help="Separa os indicadores por loja (localização)")
+    parser.add_argument('--processos', type=int, default=None,
+                        help="Processos em paralelo (padrão: número de CPUs)")
+    args = parser.parse_args(argv)
+
+    df = carregar_dados(args.dados, estoque=args.estoque)
+    relatorio = gerar_relatorio(df, por_loja=args.por_loja, processos=args.processos)
+    gravar_relatorio(relatorio, args.saida)
+    print(f"{len(relatorio)} linhas gravadas em {args.saida}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
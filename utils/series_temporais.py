@@ -0,0 +1,419 @@
+"""
+Módulo com a série histórica do estoque (produto × localização × data) e os indicadores de tendência
+"""
+import numpy as np
+import pandas as pd
+
+# Colunas do cadastro de produtos mantidas, por chave, para exibição
+COLUNAS_DESCRICAO = ['sku', 'produto_nome', 'categoria', 'marca']
+
+# Datas de referência usadas por padrão nas médias de consumo e nas estatísticas móveis
+JANELA_PADRAO = 3
+
+
+def _chaves(produto_ids, localizacoes):
+    """Índice (produto_id, localizacao) das chaves da série"""
+    return pd.MultiIndex.from_arrays(
+        [np.asarray(produto_ids), np.asarray(localizacoes, dtype=object)],
+        names=['produto_id', 'localizacao']
+    )
+
+
+class SerieEstoque:
+    """
+    Histórico do estoque como uma matriz densa chave × data, em que cada
+    chave é um par (produto_id, localizacao) e cada coluna uma data de
+    referência. A matriz é montada uma única vez e todos os indicadores
+    (velocidade de consumo, dias de cobertura, estatísticas móveis) são
+    operações vetorizadas sobre ela, para todas as chaves de uma vez.
+
+    Posições sem registro de estoque ficam como NaN. Com float32, cada
+    milhão de células ocupa 4 MB (ex.: 10 mil produtos × 10 lojas × 365
+    datas ≈ 146 MB).
+
+    Attributes:
+        chaves (pd.MultiIndex): Pares (produto_id, localizacao), um por linha da matriz
+        descricao (pd.DataFrame): Colunas de COLUNAS_DESCRICAO de cada chave
+        datas (pd.DatetimeIndex): Datas de referência, em ordem crescente
+        quantidade (np.ndarray): Quantidade em estoque, float32 (n_chaves × n_datas)
+        estoque_minimo (np.ndarray): Último estoque mínimo registrado de cada chave
+    """
+
+    def __init__(self, chaves, descricao, datas, quantidade, estoque_minimo):
+        self.chaves = chaves
+        self.descricao = descricao
+        self.datas = datas
+        self.quantidade = quantidade
+        self.estoque_minimo = estoque_minimo
+
+    def __len__(self):
+        return len(self.chaves)
+
+    def posicoes_linhas(self, df):
+        """
+        Retorna, para cada linha de um DataFrame, a posição da sua chave na
+        matriz (-1 quando a chave não está na série).
+
+        Args:
+            df (pd.DataFrame): DataFrame com produto_id e localizacao
+
+        Returns:
+            np.ndarray: Uma posição por linha do DataFrame
+        """
+        return self.chaves.get_indexer(
+            _chaves(df['produto_id'].to_numpy(), df['localizacao'].to_numpy())
+        )
+
+    def posicoes_chaves(self, df):
+        """
+        Retorna as posições (linhas da matriz) das chaves presentes em um
+        DataFrame, por exemplo o resultado dos filtros da sidebar.
+
+        Args:
+            df (pd.DataFrame): DataFrame com produto_id e localizacao
+
+        Returns:
+            np.ndarray: Posições distintas, em ordem crescente
+        """
+        posicoes = self.posicoes_linhas(df)
+        return np.unique(posicoes[posicoes >= 0])
+
+    def ate(self, data):
+        """
+        Retorna a série apenas com as datas até `data` (inclusive), para
+        calcular os indicadores como eram naquela data de referência.
+
+        Args:
+            data: Última data considerada (None = todas)
+
+        Returns:
+            SerieEstoque: Série truncada (as chaves são mantidas)
+        """
+        if data is None:
+            return self
+        fim = int(self.datas.searchsorted(pd.Timestamp(data), side='right'))
+        if fim == len(self.datas):
+            return self
+        return SerieEstoque(
+            chaves=self.chaves,
+            descricao=self.descricao,
+            datas=self.datas[:fim],
+            quantidade=self.quantidade[:, :fim],
+            estoque_minimo=self.estoque_minimo,
+        )
+
+    def _janela_consumo(self, janela):
+        """
+        Consumo e dias decorridos entre cada registro e o registro anterior
+        da mesma chave (datas sem registro são puladas, não zeradas), apenas
+        nas `janela` datas mais recentes. A matriz não é copiada: só as
+        colunas da janela viram temporários (float32 e int32).
+        """
+        quantidade = self.quantidade
+        n_chaves, n_datas = quantidade.shape
+        if n_datas == 0:
+            vazio = np.empty((n_chaves, 0), dtype=np.float32)
+            return vazio, vazio
+        inicio = 1 if janela is None else max(1, n_datas - janela)
+
+        # Último registro antes da janela (-1 = nenhum), lido de trás para
+        # frente nas colunas anteriores a ela
+        registrado_antes = ~np.isnan(quantidade[:, :inicio])
+        algum_antes = registrado_antes.any(axis=1)
+        ultimo_antes = inicio - 1 - np.argmax(registrado_antes[:, ::-1], axis=1)
+        ultimo_antes = np.where(algum_antes, ultimo_antes, -1).astype(np.int32)
+        del registrado_antes
+
+        # Posição do último registro até cada data da janela, propagada para
+        # a frente com maximum.accumulate a partir do último anterior
+        atuais = quantidade[:, inicio:]
+        registrado = ~np.isnan(atuais)
+        posicao = np.where(registrado, np.arange(inicio, n_datas, dtype=np.int32), np.int32(-1))
+        posicao = np.concatenate((ultimo_antes[:, None], posicao), axis=1)
+        anterior = np.maximum.accumulate(posicao, axis=1)[:, :-1]
+        valido = registrado & (anterior >= 0)
+        np.maximum(anterior, 0, out=anterior)
+
+        linhas = np.arange(n_chaves, dtype=np.int32)[:, None]
+        queda = quantidade[linhas, anterior] - atuais
+        dias_data = self.datas.values.astype('datetime64[D]').astype(np.float32)
+        dias = dias_data[inicio:] - dias_data[anterior]
+        # Aumentos são reposições e não contam como consumo
+        consumo = np.where(valido, np.maximum(queda, 0), np.float32(np.nan))
+        dias = np.where(valido, dias, np.float32(np.nan))
+        return consumo, dias
+
+    def velocidade_consumo(self, janela=None):
+        """
+        Calcula o consumo médio diário de cada chave: soma das quedas de
+        quantidade entre registros consecutivos dividida pelos dias decorridos.
+
+        Args:
+            janela (int): Quantidade de datas mais recentes (intervalos que
+                terminam nelas) considerados (None = histórico inteiro)
+
+        Returns:
+            np.ndarray: Unidades consumidas por dia (NaN = sem intervalos observados)
+        """
+        consumo, dias = self._janela_consumo(janela)
+        total_dias = np.nansum(dias, axis=1, dtype=np.float64)
+        total_consumo = np.nansum(consumo, axis=1, dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(total_dias > 0, total_consumo / total_dias, np.nan)
+
+    def subconjunto(self, posicoes):
+        """
+        Retorna a série apenas com as chaves informadas (por exemplo, as
+        que restaram depois dos filtros da sidebar).
+
+        Args:
+            posicoes (np.ndarray): Posições das chaves (ver posicoes_chaves)
+
+        Returns:
+            SerieEstoque: Série com as chaves selecionadas, na mesma ordem
+        """
+        posicoes = np.asarray(posicoes, dtype=np.int64)
+        return SerieEstoque(
+            chaves=self.chaves[posicoes],
+            descricao=self.descricao.iloc[posicoes].reset_index(drop=True),
+            datas=self.datas,
+            quantidade=self.quantidade[posicoes],
+            estoque_minimo=self.estoque_minimo[posicoes],
+        )
+
+    def por_produto(self):
+        """
+        Agrega a série por produto, somando as localizações em cada data
+        (a localização das chaves passa a ser 'Todas').
+
+        Returns:
+            SerieEstoque: Série com uma chave por produto
+        """
+        # As chaves estão ordenadas por produto_id, então cada produto é um
+        # bloco contínuo de linhas, somado com reduceat
+        produtos = self.chaves.get_level_values('produto_id').to_numpy()
+        inicios = np.flatnonzero(np.concatenate(([True], produtos[1:] != produtos[:-1])))
+        registrado = ~np.isnan(self.quantidade)
+        if len(inicios):
+            soma = np.add.reduceat(np.where(registrado, self.quantidade, 0), inicios, axis=0)
+            registros = np.add.reduceat(registrado, inicios, axis=0)
+            minimo = np.add.reduceat(self.estoque_minimo, inicios)
+        else:
+            soma = registros = np.empty((0, len(self.datas)))
+            minimo = np.empty(0)
+        return SerieEstoque(
+            chaves=_chaves(produtos[inicios], np.full(len(inicios), 'Todas', dtype=object)),
+            descricao=self.descricao.iloc[inicios].reset_index(drop=True),
+            datas=self.datas,
+            quantidade=np.where(registros > 0, soma, np.nan).astype(np.float32),
+            estoque_minimo=minimo,
+        )
+
+    def quantidade_atual(self):
+        """Quantidade na última data em que cada chave tem registro"""
+        registrado = ~np.isnan(self.quantidade)
+        ultima = self.quantidade.shape[1] - 1 - np.argmax(registrado[:, ::-1], axis=1)
+        atual = self.quantidade[np.arange(len(self)), ultima].astype(np.float64)
+        atual[~registrado.any(axis=1)] = np.nan
+        return atual
+
+    def resumo(self, posicoes=None, janela=JANELA_PADRAO):
+        """
+        Retorna, por chave, a quantidade atual, o mínimo, a velocidade de
+        consumo, os dias de cobertura e o mínimo, o máximo e a média das
+        últimas `janela` datas.
+
+        Args:
+            posicoes (np.ndarray): Chaves desejadas (None = todas)
+            janela (int): Janela da velocidade e das estatísticas móveis
+
+        Returns:
+            pd.DataFrame: Uma linha por chave
+        """
+        if posicoes is not None:
+            return self.subconjunto(posicoes).resumo(janela=janela)
+
+        # Estatísticas móveis na última data: só as colunas da última janela entram no cálculo
+        moveis = {
+            nome: matriz[:, -1] if matriz.shape[1] else np.full(len(self), np.nan)
+            for nome, matriz in _estatisticas_moveis(self.quantidade[:, -janela:], janela).items()
+        }
+        atual = self.quantidade_atual()
+        velocidade = self.velocidade_consumo(janela)
+
+        resumo = pd.DataFrame({
+            'produto_id': self.chaves.get_level_values('produto_id'),
+            'localizacao': self.chaves.get_level_values('localizacao'),
+        })
+        for coluna in self.descricao.columns:
+            resumo[coluna] = self.descricao[coluna].to_numpy()
+        resumo['quantidade_atual'] = atual
+        resumo['estoque_minimo'] = self.estoque_minimo
+        resumo['velocidade_dia'] = velocidade
+        resumo['dias_cobertura'] = _cobertura(atual, velocidade)
+        for nome, valores in moveis.items():
+            resumo[f'{nome}_movel'] = valores
+        return resumo
+
+    def total_por_data(self, posicoes=None, janela=None):
+        """
+        Soma a quantidade das chaves em cada data.
+
+        Args:
+            posicoes (np.ndarray): Chaves somadas (None = todas)
+            janela (int): Se informada, inclui o mínimo, o máximo e a média
+                móveis do total nas últimas `janela` datas
+
+        Returns:
+            pd.DataFrame: Quantidade total e número de chaves com registro, por
+                data (e minimo_movel, maximo_movel e media_movel, com janela)
+        """
+        quantidade = self.quantidade if posicoes is None else self.quantidade[posicoes]
+        total = np.nansum(quantidade, axis=0, dtype=np.float64)
+        evolucao = pd.DataFrame({
+            'quantidade_estoque': total,
+            'chaves_registradas': (~np.isnan(quantidade)).sum(axis=0),
+        }, index=pd.Index(self.datas, name='data_referencia'))
+        if janela is not None:
+            for nome, matriz in _estatisticas_moveis(total[None, :], janela).items():
+                evolucao[f'{nome}_movel'] = matriz[0]
+        return evolucao
+
+
+def _estatisticas_moveis(quantidade, janela):
+    """
+    Calcula o mínimo, o máximo e a média móveis de cada linha de uma matriz
+    chave × data sobre as últimas `janela` datas (ignorando datas sem
+    registro). As primeiras janela - 1 datas usam as datas disponíveis até
+    ali.
+
+    Args:
+        quantidade (np.ndarray): Matriz chave × data (NaN = sem registro)
+        janela (int): Quantidade de datas da janela
+
+    Returns:
+        dict: Matrizes 'minimo', 'maximo' e 'media', no formato de `quantidade`
+    """
+    n_datas = quantidade.shape[1]
+    janela = max(1, min(janela, n_datas)) if n_datas else 1
+
+    # Uma operação vetorizada por deslocamento da janela, acumulada no tipo
+    # da matriz na própria matriz de saída: a coluna t recebe a coluna
+    # t - deslocamento (as primeiras datas ficam com a janela parcial)
+    registrado = ~np.isnan(quantidade)
+    valores = np.where(registrado, quantidade, quantidade.dtype.type(0))
+    minimo = quantidade.copy()
+    maximo = quantidade.copy()
+    media = valores.copy()
+    contagem = registrado.astype(np.int32)
+    for deslocamento in range(1, janela):
+        fatia = quantidade[:, :-deslocamento]
+        # fmin/fmax ignoram NaN
+        np.fmin(minimo[:, deslocamento:], fatia, out=minimo[:, deslocamento:])
+        np.fmax(maximo[:, deslocamento:], fatia, out=maximo[:, deslocamento:])
+        media[:, deslocamento:] += valores[:, :-deslocamento]
+        contagem[:, deslocamento:] += registrado[:, :-deslocamento]
+    del valores, registrado
+
+    # Média: soma da janela dividida pela quantidade de datas com registro
+    with np.errstate(invalid='ignore', divide='ignore'):
+        np.divide(media, contagem, out=media)
+    media[contagem == 0] = np.nan
+    return {'minimo': minimo, 'maximo': maximo, 'media': media}
+
+
+def _cobertura(atual, velocidade):
+    """Dias de cobertura (inf quando não há consumo; NaN sem histórico)"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cobertura = atual / velocidade
+    cobertura[(velocidade == 0) & ~np.isnan(atual)] = np.inf
+    return cobertura
+
+
+def construir_serie(df):
+    """
+    Monta a série histórica a partir das linhas de estoque (o DataFrame de
+    carregar_dados, ou o histórico agregado do backend SQL). Linhas sem
+    data são ignoradas e registros repetidos da mesma chave na mesma data
+    são somados. Nenhuma operação é feita linha a linha: chaves e datas
+    viram códigos inteiros e a matriz é preenchida com np.bincount.
+
+    Args:
+        df (pd.DataFrame): Linhas com produto_id, localizacao, data_referencia,
+            quantidade_estoque e estoque_minimo
+
+    Returns:
+        SerieEstoque: Série histórica
+    """
+    datas_linhas = pd.to_datetime(df['data_referencia']).to_numpy(dtype='datetime64[ns]')
+    # Linhas sem data são descartadas coluna a coluna, sem copiar o DataFrame
+    validas = ~np.isnat(datas_linhas)
+    todas_validas = bool(validas.all())
+
+    def coluna(nome, valores=None):
+        valores = df[nome].to_numpy() if valores is None else valores
+        return valores if todas_validas else valores[validas]
+
+    codigos_data, datas = pd.factorize(coluna('data_referencia', datas_linhas), sort=True)
+    del datas_linhas
+    # Chave como um único inteiro (código do produto × código da localização),
+    # ordenada por produto e depois por localização
+    codigos_produto, produtos = pd.factorize(coluna('produto_id'), sort=True)
+    localizacao = df['localizacao']
+    if isinstance(localizacao.dtype, pd.CategoricalDtype):
+        codigos_local = coluna('localizacao', localizacao.cat.codes.to_numpy())
+        locais = localizacao.cat.categories
+    else:
+        codigos_local, locais = pd.factorize(coluna('localizacao'), sort=True)
+    n_locais = len(locais) + 1
+    combinado = codigos_produto.astype(np.int64) * n_locais + (codigos_local + 1)
+    del codigos_produto, codigos_local
+    codigos_chave, combinacoes = pd.factorize(combinado, sort=True)
+    del combinado
+    locais = np.concatenate(([np.nan], np.asarray(locais, dtype=object)))
+    chaves = _chaves(np.asarray(produtos)[combinacoes // n_locais], locais[combinacoes % n_locais])
+
+    # Matriz preenchida com np.bincount sobre a célula (chave, data) de cada
+    # linha; as somas em float64 do bincount viram float32 logo em seguida
+    n_chaves, n_datas = len(chaves), len(datas)
+    celula = codigos_chave * n_datas + codigos_data
+    registros = np.bincount(celula, minlength=n_chaves * n_datas).reshape(n_chaves, n_datas)
+    registrado = registros > 0
+    quantidade = np.bincount(
+        celula, weights=coluna('quantidade_estoque').astype(np.float64), minlength=n_chaves * n_datas
+    ).astype(np.float32).reshape(n_chaves, n_datas)
+    del celula
+    quantidade[~registrado] = np.nan
+
+    # Último mínimo registrado de cada chave (média, se houver registros
+    # repetidos na mesma data): só as linhas da última data com registro
+    linhas = np.arange(n_chaves)
+    ultima = n_datas - 1 - np.argmax(registrado[:, ::-1], axis=1)
+    registros_ultima = registros[linhas, ultima]
+    del registros, registrado
+    da_ultima = codigos_data == ultima[codigos_chave]
+    soma_minimo = np.bincount(
+        codigos_chave[da_ultima],
+        weights=coluna('estoque_minimo')[da_ultima].astype(np.float64),
+        minlength=n_chaves
+    )
+    estoque_minimo = soma_minimo / np.maximum(registros_ultima, 1)
+    del da_ultima, codigos_data
+
+    # Descrição do produto lida da primeira linha de cada chave
+    primeiras = pd.Series(codigos_chave).drop_duplicates()
+    primeira = primeiras.index.to_numpy()[np.argsort(primeiras.to_numpy())]
+    if not todas_validas:
+        primeira = np.flatnonzero(validas)[primeira]
+    descricao = pd.DataFrame({
+        nome: df[nome].iloc[primeira].to_numpy()
+        for nome in COLUNAS_DESCRICAO if nome in df.columns
+    })
+
+    return SerieEstoque(
+        chaves=chaves,
+        descricao=descricao,
+        datas=pd.DatetimeIndex(datas),
+        quantidade=quantidade,
+        estoque_minimo=estoque_minimo,
+    )
@@ -0,0 +1,166 @@
+"""
+Módulo para o snapshot colunar (Parquet) dos dados unificados
+"""
+import hashlib
+import json
+import logging
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+# Nome do arquivo de snapshot, gravado na mesma pasta dos CSVs
+NOME_SNAPSHOT = '.fcd_snapshot.parquet'
+
+# Incrementar sempre que o formato do DataFrame unificado mudar
+VERSAO_SNAPSHOT = 3
+
+_CHAVE_METADADOS = b'fcd_snapshot'
+_TAMANHO_BLOCO_HASH = 1024 * 1024
+
+
+def _hash_arquivo(caminho):
+    """
+    Calcula o hash SHA-256 do conteúdo de um arquivo, lendo em blocos.
+
+    Args:
+        caminho (str): Caminho do arquivo
+
+    Returns:
+        str: Hash hexadecimal do conteúdo
+    """
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(_TAMANHO_BLOCO_HASH), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def calcular_assinatura(caminho, com_hash=True):
+    """
+    Retorna a assinatura de um arquivo de origem (nome, tamanho, mtime e hash).
+
+    Args:
+        caminho (str): Caminho do arquivo
+        com_hash (bool): Se True, inclui o hash do conteúdo
+
+    Returns:
+        dict: Assinatura do arquivo
+    """
+    info = os.stat(caminho)
+    assinatura = {
+        'nome': os.path.basename(caminho),
+        'tamanho': info.st_size,
+        'mtime_ns': info.st_mtime_ns,
+    }
+    if com_hash:
+        assinatura['sha256'] = _hash_arquivo(caminho)
+    return assinatura
+
+
+def caminho_snapshot(fontes):
+    """
+    Retorna o caminho do snapshot correspondente aos arquivos de origem.
+
+    Args:
+        fontes (list): Caminhos dos arquivos de origem
+
+    Returns:
+        str: Caminho do arquivo de snapshot
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(fontes[0])), NOME_SNAPSHOT)
+
+
+def _fonte_inalterada(caminho, assinatura_salva):
+    """
+    Verifica se um arquivo de origem corresponde à assinatura salva.
+
+    Tamanho diferente invalida direto. Com mesmo tamanho e mesmo mtime o
+    arquivo é considerado inalterado; se apenas o mtime mudou, o hash do
+    conteúdo decide.
+    """
+    atual = calcular_assinatura(caminho, com_hash=False)
+    if atual['nome'] != assinatura_salva.get('nome'):
+        return False
+    if atual['tamanho'] != assinatura_salva.get('tamanho'):
+        return False
+    if atual['mtime_ns'] == assinatura_salva.get('mtime_ns'):
+        return True
+    return _hash_arquivo(caminho) == assinatura_salva.get('sha256')
+
+
+def carregar_snapshot(fontes):
+    """
+    Carrega o snapshot se ele ainda for válido para os arquivos de origem.
+
+    Args:
+        fontes (list): Caminhos dos arquivos de origem (produtos, estoque)
+
+    Returns:
+        pd.DataFrame ou None: DataFrame do snapshot, ou None se ausente/inválido
+    """
+    caminho = caminho_snapshot(fontes)
+    if not os.path.exists(caminho):
+        return None
+
+    try:
+        metadados = pq.read_schema(caminho).metadata or {}
+        info = json.loads(metadados.get(_CHAVE_METADADOS, b'{}'))
+
+        if info.get('versao') != VERSAO_SNAPSHOT:
+            return None
+
+        assinaturas = info.get('fontes', [])
+        if len(assinaturas) != len(fontes):
+            return None
+        for fonte, assinatura in zip(fontes, assinaturas):
+            if not _fonte_inalterada(fonte, assinatura):
+                return None
+
+        return pq.read_table(caminho).to_pandas()
+    except Exception as e:
+        # Snapshot corrompido ou ilegível: volta para os CSVs
+        logger.warning("Snapshot %s ignorado: %s", caminho, e)
+        return None
+
+
+def salvar_snapshot(df, fontes):
+    """
+    Grava o snapshot do DataFrame unificado com a assinatura das origens.
+
+    A gravação é atômica (arquivo temporário + rename). Falhas de escrita,
+    como em sistemas de arquivos somente leitura, são apenas registradas.
+
+    Args:
+        df (pd.DataFrame): DataFrame unificado
+        fontes (list): Caminhos dos arquivos de origem (produtos, estoque)
+
+    Returns:
+        bool: True se o snapshot foi gravado
+    """
+    caminho = caminho_snapshot(fontes)
+    caminho_tmp = f"{caminho}.{os.getpid()}.tmp"
+
+    try:
+        info = {
+            'versao': VERSAO_SNAPSHOT,
+            'fontes': [calcular_assinatura(fonte) for fonte in fontes],
+        }
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        metadados = dict(tabela.schema.metadata or {})
+        metadados[_CHAVE_METADADOS] = json.dumps(info).encode('utf-8')
+        tabela = tabela.replace_schema_metadata(metadados)
+
+        pq.write_table(tabela, caminho_tmp)
+        os.replace(caminho_tmp, caminho)
+        return True
+    except Exception as e:
+        logger.warning("Não foi possível gravar o snapshot %s: %s", caminho, e)
+        try:
+            if os.path.exists(caminho_tmp):
+                os.remove(caminho_tmp)
+        except OSError:
+            pass
+        return False